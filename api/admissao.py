@@ -0,0 +1,206 @@
+# api/admissao.py
+"""
+Controle de admissão por ferramenta.
+
+Cada ferramenta tem uma capacidade em unidades de peso. Uma requisição pesa
+ceil(tamanho da entrada / PY_PESO_MB), no mínimo 1 e no máximo a capacidade
+(um PDF enorme roda, mas sozinho). Se não houver vaga, a requisição espera
+numa fila FIFO limitada; com a fila cheia, ou passado PY_FILA_ESPERA_S, a
+resposta é 429 com Retry-After estimado pela duração média da ferramenta.
+
+Quem espera ocupa uma thread do threadpool do Starlette, então além da fila
+de cada ferramenta há um teto para todas juntas (PY_FILA_MAX_TOTAL): uploads
+enfileirados não podem tomar as threads de /jobs/{id}, /progress e /metrics.
+Jobs esperam sem prazo nas threads da fila de jobs e não entram nessa conta.
+
+Assim poucas compressões ou ajustes de diário simultâneos não esgotam a RAM:
+o excedente recebe 429 e o Node tenta de novo, em vez de o processo entrar em
+swap ou ser morto pelo OOM killer.
+
+Os limites valem por processo do uvicorn.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi import HTTPException
+
+from api import metricas
+from api.config import (
+    ADMISSAO_ATIVA,
+    FILA_ESPERA_S,
+    FILA_MAX,
+    FILA_MAX_TOTAL,
+    LIMITE_PADRAO,
+    LIMITES_FERRAMENTA,
+    PESO_MB,
+    RETRY_AFTER_S,
+)
+
+# Sentinela: espera sem prazo e sem limite de fila (jobs, que já passaram pela fila deles)
+SEM_PRAZO: Optional[float] = None
+
+# Requisições com prazo aguardando vaga, somando todas as ferramentas
+_esperando = 0
+_esperando_lock = threading.Lock()
+
+
+def _reservar_espera() -> bool:
+    global _esperando
+    with _esperando_lock:
+        if _esperando >= FILA_MAX_TOTAL:
+            return False
+        _esperando += 1
+        return True
+
+
+def _liberar_espera() -> None:
+    global _esperando
+    with _esperando_lock:
+        _esperando -= 1
+
+
+class Limitador:
+    def __init__(self, tool: str, capacidade: int, fila_max: int, espera_s: float):
+        self.tool = tool
+        self.capacidade = max(1, capacidade)
+        self.fila_max = fila_max
+        self.espera_s = espera_s
+        self.em_uso = 0
+        self._fila: deque = deque()
+        self._cond = threading.Condition()
+        # média móvel da duração por unidade de peso, em segundos
+        self._segundos_por_unidade: Optional[float] = None
+
+    def peso(self, tamanho_bytes: int) -> int:
+        unidades = math.ceil(tamanho_bytes / (PESO_MB * 1024 * 1024)) if PESO_MB > 0 else 1
+        return min(max(1, unidades), self.capacidade)
+
+    def retry_after(self) -> int:
+        """Segundos estimados até abrir vaga para quem está chegando agora."""
+        por_unidade = self._segundos_por_unidade
+        if por_unidade is None:
+            return RETRY_AFTER_S
+        pendente = self.em_uso + len(self._fila)
+        estimativa = por_unidade * pendente / self.capacidade
+        return int(min(300, max(1, math.ceil(estimativa))))
+
+    def _recusar(self, motivo: str, detalhe: str) -> HTTPException:
+        metricas.ADMISSAO_RECUSADAS.labels(self.tool, motivo).inc()
+        return HTTPException(
+            status_code=429,
+            detail=detalhe,
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    def entrar(self, peso: int, espera_s: Optional[float]) -> None:
+        """
+        Ocupa `peso` unidades, esperando a vez na fila se preciso.
+        espera_s=None espera indefinidamente (sem 429).
+        """
+        with self._cond:
+            if not self._fila and self.em_uso + peso <= self.capacidade:
+                self.em_uso += peso
+                self._publicar()
+                return
+
+            if espera_s is not None and (
+                len(self._fila) >= self.fila_max or not _reservar_espera()
+            ):
+                raise self._recusar(
+                    "fila_cheia", f"Ferramenta {self.tool} ocupada; tente novamente em instantes."
+                )
+
+            vez = object()
+            self._fila.append(vez)
+            self._publicar()
+            prazo = None if espera_s is None else time.monotonic() + espera_s
+            try:
+                while not (self._fila[0] is vez and self.em_uso + peso <= self.capacidade):
+                    restante = None if prazo is None else prazo - time.monotonic()
+                    if restante is not None and restante <= 0:
+                        raise self._recusar(
+                            "tempo_esgotado",
+                            f"Ferramenta {self.tool} ocupada; tempo de espera esgotado.",
+                        )
+                    self._cond.wait(restante)
+                self.em_uso += peso
+            finally:
+                if espera_s is not None:
+                    _liberar_espera()
+                self._fila.remove(vez)
+                self._publicar()
+                # o próximo da fila pode caber também
+                self._cond.notify_all()
+
+    def sair(self, peso: int, segundos: Optional[float] = None) -> None:
+        with self._cond:
+            self.em_uso -= peso
+            if segundos is not None:
+                amostra = segundos / peso
+                anterior = self._segundos_por_unidade
+                self._segundos_por_unidade = (
+                    amostra if anterior is None else 0.8 * anterior + 0.2 * amostra
+                )
+            self._publicar()
+            self._cond.notify_all()
+
+    def _publicar(self) -> None:
+        metricas.ADMISSAO_EM_USO.labels(self.tool).set(self.em_uso)
+        metricas.ADMISSAO_FILA.labels(self.tool).set(len(self._fila))
+
+
+_limitadores: Dict[str, Limitador] = {}
+_lock = threading.Lock()
+
+
+def limitador(tool: str) -> Limitador:
+    with _lock:
+        if tool not in _limitadores:
+            _limitadores[tool] = Limitador(
+                tool,
+                LIMITES_FERRAMENTA.get(tool, LIMITE_PADRAO),
+                FILA_MAX,
+                FILA_ESPERA_S,
+            )
+        return _limitadores[tool]
+
+
+@contextmanager
+def admitir(tool: str, tamanho_bytes: int = 0, espera_s: Optional[float] = FILA_ESPERA_S) -> Iterator[None]:
+    """
+    Executa o bloco dentro do limite da ferramenta:
+
+        with admissao.admitir("comprimir-pdf", len(pdf_bytes)):
+            ...
+
+    Levanta HTTPException 429 (com Retry-After) se não houver vaga a tempo.
+    Bloqueia a thread enquanto espera: em endpoints async, use executar()
+    via run_in_threadpool.
+    """
+    if not ADMISSAO_ATIVA:
+        yield
+        return
+
+    lim = limitador(tool)
+    peso = lim.peso(tamanho_bytes)
+    lim.entrar(peso, espera_s)
+    inicio = time.perf_counter()
+    sucesso = False
+    try:
+        yield
+        sucesso = True
+    finally:
+        # só execuções completas alimentam a estimativa do Retry-After
+        lim.sair(peso, time.perf_counter() - inicio if sucesso else None)
+
+
+def executar(tool: str, tamanho_bytes: int, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """fn(*args, **kwargs) dentro de admitir(); para uso com run_in_threadpool."""
+    with admitir(tool, tamanho_bytes):
+        return fn(*args, **kwargs)
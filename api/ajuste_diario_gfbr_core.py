@@ -10,6 +10,8 @@ import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
 
+from api.tempos import etapa
+
 # ================== CONFIGURAÇÕES / CONSTANTES ==================
 
 ABA_ESTORNOS = "Estornos"
@@ -320,63 +322,69 @@ def ajustar_diario_gfbr(
 
     backup_path: Optional[str] = None
     if criar_backup:
-        backup = caminho.with_suffix(".backup.xlsx")
-        shutil.copyfile(caminho, backup)
-        backup_path = str(backup)
+        with etapa("backup"):
+            backup = caminho.with_suffix(".backup.xlsx")
+            shutil.copyfile(caminho, backup)
+            backup_path = str(backup)
 
     # 0) Carrega DF ORIGINAL
-    xl = pd.ExcelFile(caminho, engine="openpyxl")
-    aba = aba_origem or xl.sheet_names[0]
-    df_original = pd.read_excel(caminho, sheet_name=aba, engine="openpyxl")
-    total_rows = len(df_original)
-
-    # 1) Ajusta pares Transitoria no DF ORIGINAL
-    df1 = ajustar_transitoria_pairs(df_original)
-
-    # 2) Estornos -> separa
-    df_rest, df_est = encontrar_pares(df1)
-
-    # 3) Limpeza (recebimentos e palavras) sobre df_rest
-    grupos = detectar_grupos(df_rest)
-    remover = []
-
-    grupos_recebimento = 0
-    grupos_palavra = 0
-
-    for gid, sub in grupos.groupby("__grupo_id"):
-        if grupo_recebimento(sub):
-            grupos_recebimento += 1
-            remover.extend(sub.index)
-        else:
-            if sub.apply(contem_remover_palavra, axis=1).any():
-                grupos_palavra += 1
+    with etapa("open") as e:
+        xl = pd.ExcelFile(caminho, engine="openpyxl")
+        aba = aba_origem or xl.sheet_names[0]
+        df_original = pd.read_excel(caminho, sheet_name=aba, engine="openpyxl")
+        total_rows = len(df_original)
+        e.itens = total_rows
+
+    with etapa("classify", itens=total_rows):
+        # 1) Ajusta pares Transitoria no DF ORIGINAL
+        df1 = ajustar_transitoria_pairs(df_original)
+
+        # 2) Estornos -> separa
+        df_rest, df_est = encontrar_pares(df1)
+
+        # 3) Limpeza (recebimentos e palavras) sobre df_rest
+        grupos = detectar_grupos(df_rest)
+        remover = []
+
+        grupos_recebimento = 0
+        grupos_palavra = 0
+
+        for gid, sub in grupos.groupby("__grupo_id"):
+            if grupo_recebimento(sub):
+                grupos_recebimento += 1
                 remover.extend(sub.index)
+            else:
+                if sub.apply(contem_remover_palavra, axis=1).any():
+                    grupos_palavra += 1
+                    remover.extend(sub.index)
 
-    df_final = grupos.loc[~grupos.index.isin(remover)].copy()
-    for d in (df_final, df_est):
-        d.drop(columns="__grupo_id", inplace=True, errors="ignore")
+        df_final = grupos.loc[~grupos.index.isin(remover)].copy()
+        for d in (df_final, df_est):
+            d.drop(columns="__grupo_id", inplace=True, errors="ignore")
 
     # 4) Escreve Estornos em aba própria
-    with pd.ExcelWriter(
-        caminho, engine="openpyxl", mode="a", if_sheet_exists="replace"
-    ) as w:
-        df_est.to_excel(w, sheet_name=ABA_ESTORNOS, index=False)
+    with etapa("write", itens=len(df_est)):
+        with pd.ExcelWriter(
+            caminho, engine="openpyxl", mode="a", if_sheet_exists="replace"
+        ) as w:
+            df_est.to_excel(w, sheet_name=ABA_ESTORNOS, index=False)
 
     # 5) Remove linhas na planilha física preservando formatação
     manter_rows_1based = set((df_final.index + 2).tolist())  # +2 por causa do header
     total_rows_original = len(df_original)
 
-    # IMPORTANTE: abrir como file-like para o openpyxl não checar a extensão
-    with open(caminho, "rb") as fh:
-        wb = load_workbook(fh)
+    with etapa("cleanup", itens=total_rows_original - len(df_final)):
+        # IMPORTANTE: abrir como file-like para o openpyxl não checar a extensão
+        with open(caminho, "rb") as fh:
+            wb = load_workbook(fh)
 
-    ws = wb[aba]
+        ws = wb[aba]
 
-    for r in range(total_rows_original + 1, 1, -1):
-        if r not in manter_rows_1based:
-            ws.delete_rows(r)
+        for r in range(total_rows_original + 1, 1, -1):
+            if r not in manter_rows_1based:
+                ws.delete_rows(r)
 
-    wb.save(caminho)
+        wb.save(caminho)
 
     rows_final = len(df_final)
     rows_removed = total_rows_original - rows_final
@@ -0,0 +1,55 @@
+# api/aquecimento.py
+"""
+Importação antecipada (warm-up) dos cores e medição do tempo de import.
+
+Os cores puxam pandas, numpy, PyMuPDF, pdfplumber, PyPDF2, python-docx e
+openpyxl. O integra_api.py não os importa mais no topo: cada endpoint carrega
+o seu core no primeiro uso. Quem quiser pagar esse custo na subida (em vez de
+na primeira requisição) lista os módulos em PY_WARMUP_MODULES.
+"""
+from __future__ import annotations
+
+import importlib
+import time
+from typing import Dict, Iterable
+
+from api.config import IMPORT_BUDGET_MS
+
+
+def medir_import(nome: str) -> float:
+    """Importa o módulo e devolve quanto tempo levou, em ms (0 se já estava carregado)."""
+    inicio = time.perf_counter()
+    importlib.import_module(nome)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def aquecer(modulos: Iterable[str], origem: str = "api") -> Dict[str, float]:
+    """
+    Importa cada módulo da lista, registra o tempo gasto e avisa quando o total
+    passa do orçamento PY_IMPORT_BUDGET_MS. Falhas de import não derrubam o
+    processo: o erro aparece de novo (e com contexto) no primeiro uso do endpoint.
+    """
+    tempos: Dict[str, float] = {}
+    for nome in modulos:
+        try:
+            tempos[nome] = medir_import(nome)
+        except Exception as e:  # noqa: BLE001
+            print(f"[aquecimento:{origem}] Falha ao importar {nome}: {e}")
+
+    total = sum(tempos.values())
+    if tempos:
+        detalhes = ", ".join(f"{n}={ms:.0f}ms" for n, ms in tempos.items())
+        print(f"[aquecimento:{origem}] {total:.0f}ms ({detalhes})")
+    verificar_orcamento(total, f"aquecimento:{origem}")
+    return tempos
+
+
+def verificar_orcamento(ms: float, etapa: str) -> bool:
+    """Avisa no log se `ms` estourou o orçamento de import configurado."""
+    if IMPORT_BUDGET_MS and ms > IMPORT_BUDGET_MS:
+        print(
+            f"[aquecimento] {etapa} levou {ms:.0f}ms, acima do orçamento de "
+            f"{IMPORT_BUDGET_MS}ms (PY_IMPORT_BUDGET_MS)."
+        )
+        return False
+    return True
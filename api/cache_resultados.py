@@ -0,0 +1,225 @@
+# api/cache_resultados.py
+"""
+Cache em disco dos resultados das ferramentas, endereçado pelo conteúdo.
+
+A chave é o SHA-256 de (ferramenta, SHA-256 do arquivo de entrada, parâmetros,
+configuração que altera a saída). Trocar, por exemplo, o motor de texto ou a
+compactação dos PDFs gera chaves novas em vez de servir o resultado antigo.
+Reenvios do mesmo PDF (retry do Node, clique duplo, novo download) devolvem o
+ZIP/XLSX/PDF já gerado, sem refazer extração e split.
+
+Layout:
+    <CACHE_DIR>/<chave>/meta.json    -> resultado JSON, nome do artefato, criado_em
+    <CACHE_DIR>/<chave>/<artefato>   -> arquivo gerado (opcional)
+
+A recência de uso (LRU) é o mtime do meta.json, atualizado a cada acerto.
+Entradas mais velhas que o TTL são descartadas e, se o total passar de
+CACHE_MAX_BYTES, as menos usadas recentemente saem primeiro.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from api.config import (
+    CACHE_ATIVO,
+    CACHE_DIR,
+    CACHE_MAX_BYTES,
+    CACHE_TTL_HORAS,
+    FERIAS_MODO_BLOCOS,
+    HOLERITES_FAIXA_PT,
+    HOLERITES_MODO_EXTRACAO,
+    MOTORES_TEXTO,
+    PDF_COMPACTO,
+    RELATORIO_MODO_BUSCA,
+    RELATORIO_PASSO_AMOSTRA,
+    ZIP_COMPRESSAO,
+)
+
+# Incrementar quando a saída de algum core mudar, para invalidar o que já existe
+VERSAO_CACHE = 4
+
+# Configuração que muda o conteúdo dos artefatos; entra em toda chave.
+# Ao criar uma opção PY_* que altere a saída de um core, incluí-la aqui.
+CONFIG_SAIDA: Dict[str, Any] = {
+    "pdf_compacto": PDF_COMPACTO,
+    "ferias_modo_blocos": FERIAS_MODO_BLOCOS,
+    "motores_texto": MOTORES_TEXTO,
+    "zip_compressao": ZIP_COMPRESSAO,
+    "holerites_modo_extracao": HOLERITES_MODO_EXTRACAO,
+    "holerites_faixa_pt": HOLERITES_FAIXA_PT,
+    "relatorio_modo_busca": RELATORIO_MODO_BUSCA,
+    "relatorio_passo_amostra": RELATORIO_PASSO_AMOSTRA,
+}
+
+
+def sha256_arquivo(caminho: Path | str, bloco: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        while True:
+            dados = f.read(bloco)
+            if not dados:
+                break
+            h.update(dados)
+    return h.hexdigest()
+
+
+def sha256_bytes(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()
+
+
+class CacheResultados:
+    def __init__(self, base_dir: Path, max_bytes: int, ttl_horas: float, ativo: bool = True):
+        self.base_dir = Path(base_dir)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_horas * 3600
+        self.ativo = ativo
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chave(tool: str, sha256_entrada: str, params: Dict[str, Any]) -> str:
+        bruto = json.dumps(
+            {
+                "v": VERSAO_CACHE,
+                "config": CONFIG_SAIDA,
+                "tool": tool,
+                "entrada": sha256_entrada,
+                "params": params,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        """
+        Devolve {"resultado": ..., "artefato": Path | None} ou None se não houver
+        entrada válida. Um acerto renova a posição da entrada no LRU.
+        """
+        if not self.ativo:
+            return None
+
+        pasta = self.base_dir / chave
+        meta_path = pasta / "meta.json"
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if self.ttl_s and time.time() - meta.get("criado_em", 0) > self.ttl_s:
+            self._remover(pasta)
+            return None
+
+        artefato = None
+        if meta.get("artefato"):
+            artefato = pasta / meta["artefato"]
+            if not artefato.is_file():
+                self._remover(pasta)
+                return None
+
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+        return {"resultado": meta.get("resultado"), "artefato": artefato}
+
+    def gravar(
+        self,
+        chave: str,
+        resultado: Optional[Dict[str, Any]] = None,
+        artefato: Path | bytes | None = None,
+        nome_artefato: Optional[str] = None,
+    ) -> None:
+        """
+        Guarda o resultado (e uma cópia do artefato). Falhas de gravação só
+        são registradas no log: o cache nunca derruba a requisição.
+        """
+        if not self.ativo:
+            return
+
+        destino = self.base_dir / chave
+        tmp = self.base_dir / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp.mkdir(parents=True)
+            nome = None
+            if isinstance(artefato, (bytes, bytearray)):
+                nome = Path(nome_artefato or "artefato.bin").name
+                (tmp / nome).write_bytes(artefato)
+            elif artefato is not None:
+                nome = Path(nome_artefato or Path(artefato).name).name
+                shutil.copyfile(artefato, tmp / nome)
+
+            meta = {"criado_em": time.time(), "resultado": resultado, "artefato": nome}
+            with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, default=str)
+
+            if destino.exists():
+                # outro processo gravou a mesma chave primeiro
+                shutil.rmtree(tmp, ignore_errors=True)
+            else:
+                os.replace(tmp, destino)
+        except OSError as e:
+            print(f"[cache] Erro ao gravar {chave}: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        self.limpar()
+
+    def limpar(self) -> None:
+        """Remove entradas expiradas e, acima do limite, as usadas há mais tempo."""
+        if not self.base_dir.is_dir():
+            return
+
+        with self._lock:
+            agora = time.time()
+            entradas = []
+            for pasta in self.base_dir.iterdir():
+                if not pasta.is_dir():
+                    continue
+                if pasta.name.startswith(".tmp-"):
+                    # sobra de gravação interrompida
+                    try:
+                        if agora - pasta.stat().st_mtime > 3600:
+                            shutil.rmtree(pasta, ignore_errors=True)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    ultimo_uso = (pasta / "meta.json").stat().st_mtime
+                    tamanho = sum(f.stat().st_size for f in pasta.iterdir() if f.is_file())
+                except OSError:
+                    # meta.json já removido (artefato estava em uso): termina a limpeza
+                    shutil.rmtree(pasta, ignore_errors=True)
+                    continue
+                entradas.append((ultimo_uso, tamanho, pasta))
+
+            total = sum(t for _, t, _ in entradas)
+            for ultimo_uso, tamanho, pasta in sorted(entradas, key=lambda e: e[0]):
+                expirada = self.ttl_s and agora - ultimo_uso > self.ttl_s
+                if not expirada and (not self.max_bytes or total <= self.max_bytes):
+                    continue
+                self._remover(pasta)
+                total -= tamanho
+
+    @staticmethod
+    def _remover(pasta: Path) -> None:
+        # o meta.json sai primeiro: a entrada deixa de ser válida mesmo que
+        # o artefato ainda esteja aberto (Windows) e não possa ser apagado agora
+        try:
+            (pasta / "meta.json").unlink()
+        except OSError:
+            pass
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+cache = CacheResultados(CACHE_DIR, CACHE_MAX_BYTES, CACHE_TTL_HORAS, CACHE_ATIVO)
@@ -0,0 +1,144 @@
+# api/cache_texto.py
+"""
+Cache persistente (SQLite) do texto extraído de cada página.
+
+O mesmo PDF costuma passar por mais de uma ferramenta (o PDF de férias vai
+para o relatório e para o separador por funcionário) e por retentativas. A
+chave é (SHA-256 do arquivo, motor de texto, página): na segunda passada
+sobre um PDF conhecido o texto vem daqui e o motor nem abre o arquivo.
+
+O cache entra por baixo de extracao_texto.abrir(), então todos os cores que
+leem texto por lá são atendidos sem mudança.
+
+Tabelas:
+    documentos (documento, motor, paginas, bytes, usado_em)
+    paginas    (documento, motor, pagina, texto)
+
+- Leitura: uma consulta carrega as páginas já conhecidas do documento.
+- Gravação: as páginas novas são gravadas numa transação só, ao fechar.
+- Limite: acima de PY_CACHE_TEXTO_MAX_MB, saem os documentos usados há
+  mais tempo (LRU por documento).
+
+O banco é compartilhado pelos processos do uvicorn e do worker_pool (modo
+WAL). Qualquer erro de SQLite só é registrado no log: sem cache, o texto é
+extraído normalmente.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from api.config import CACHE_TEXTO_ARQUIVO, CACHE_TEXTO_ATIVO, CACHE_TEXTO_MAX_BYTES
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    documento TEXT NOT NULL,
+    motor     TEXT NOT NULL,
+    paginas   INTEGER NOT NULL,
+    bytes     INTEGER NOT NULL DEFAULT 0,
+    usado_em  REAL NOT NULL,
+    PRIMARY KEY (documento, motor)
+);
+CREATE INDEX IF NOT EXISTS documentos_usado_em ON documentos (usado_em);
+CREATE TABLE IF NOT EXISTS paginas (
+    documento TEXT NOT NULL,
+    motor     TEXT NOT NULL,
+    pagina    INTEGER NOT NULL,
+    texto     TEXT NOT NULL,
+    PRIMARY KEY (documento, motor, pagina)
+);
+"""
+
+
+class CacheTexto:
+    def __init__(self, arquivo: Path, max_bytes: int, ativo: bool = True) -> None:
+        self.arquivo = Path(arquivo)
+        self.max_bytes = max_bytes
+        self.ativo = ativo
+        self._local = threading.local()
+
+    def _conexao(self) -> sqlite3.Connection:
+        # uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        con = getattr(self._local, "con", None)
+        if con is None:
+            self.arquivo.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(str(self.arquivo), timeout=10)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.executescript(_ESQUEMA)
+            self._local.con = con
+        return con
+
+    def carregar(self, documento: str, motor: str) -> tuple[Optional[int], Dict[int, str]]:
+        """(nº de páginas, {página: texto}) já conhecidos do documento."""
+        if not self.ativo:
+            return None, {}
+        try:
+            con = self._conexao()
+            with con:
+                linha = con.execute(
+                    "SELECT paginas FROM documentos WHERE documento = ? AND motor = ?",
+                    (documento, motor),
+                ).fetchone()
+                if linha is None:
+                    return None, {}
+                con.execute(
+                    "UPDATE documentos SET usado_em = ? WHERE documento = ? AND motor = ?",
+                    (time.time(), documento, motor),
+                )
+                textos = dict(con.execute(
+                    "SELECT pagina, texto FROM paginas WHERE documento = ? AND motor = ?",
+                    (documento, motor),
+                ))
+            return linha[0], textos
+        except sqlite3.Error as e:
+            print(f"[cache-texto] Erro ao ler {documento[:12]}: {e}")
+            return None, {}
+
+    def gravar(self, documento: str, motor: str, total_paginas: int, novos: Dict[int, str]) -> None:
+        if not self.ativo or not novos:
+            return
+        tamanho = sum(len(t.encode("utf-8")) for t in novos.values())
+        try:
+            con = self._conexao()
+            with con:
+                con.executemany(
+                    "INSERT OR REPLACE INTO paginas (documento, motor, pagina, texto) VALUES (?, ?, ?, ?)",
+                    [(documento, motor, pagina, texto) for pagina, texto in novos.items()],
+                )
+                con.execute(
+                    """
+                    INSERT INTO documentos (documento, motor, paginas, bytes, usado_em)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (documento, motor) DO UPDATE
+                    SET bytes = bytes + excluded.bytes, usado_em = excluded.usado_em
+                    """,
+                    (documento, motor, total_paginas, tamanho, time.time()),
+                )
+            self.limpar()
+        except sqlite3.Error as e:
+            print(f"[cache-texto] Erro ao gravar {documento[:12]}: {e}")
+
+    def limpar(self) -> None:
+        """Remove os documentos usados há mais tempo até caber em max_bytes."""
+        if not self.max_bytes:
+            return
+        con = self._conexao()
+        total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM documentos").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        with con:
+            for documento, motor, tamanho in con.execute(
+                "SELECT documento, motor, bytes FROM documentos ORDER BY usado_em"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                con.execute("DELETE FROM paginas WHERE documento = ? AND motor = ?", (documento, motor))
+                con.execute("DELETE FROM documentos WHERE documento = ? AND motor = ?", (documento, motor))
+                total -= tamanho
+
+
+cache_texto = CacheTexto(CACHE_TEXTO_ARQUIVO, CACHE_TEXTO_MAX_BYTES, CACHE_TEXTO_ATIVO)
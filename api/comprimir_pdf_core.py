@@ -1,10 +1,89 @@
 # arquivo sugerido: api/comprimir_pdf_core.py
 from __future__ import annotations
 
-from typing import Dict, Any
+import os
+import tempfile
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
 
 import fitz  # PyMuPDF
 
+from api import paralelo, progresso
+from api.config import COMPRIMIR_PAGINAS_POR_LOTE, COMPRIMIR_WORKERS
+from api.tempos import etapa
+
+# (largura, altura, JPEG) de uma página rasterizada
+PaginaJpeg = Tuple[int, int, bytes]
+
+
+def _rasterizar(page: "fitz.Page", jpeg_quality: int, dpi_scale: float) -> PaginaJpeg:
+    # Renderiza a página em tons de cinza com a escala configurada
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(dpi_scale, dpi_scale),
+        colorspace=fitz.csGRAY,
+    )
+    return pix.width, pix.height, pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+
+
+def _rasterizar_lote(
+    caminho: str, jpeg_quality: int, dpi_scale: float, inicio: int, fim: int
+) -> List[PaginaJpeg]:
+    """Roda num processo de paralelo.mapear_lotes: abre o PDF e rasteriza [inicio, fim)."""
+    with fitz.open(caminho) as doc:
+        return [_rasterizar(doc.load_page(idx), jpeg_quality, dpi_scale) for idx in range(inicio, fim)]
+
+
+def _paralelizar(total_paginas: int) -> bool:
+    return paralelo.vale_paralelizar(total_paginas, COMPRIMIR_PAGINAS_POR_LOTE, COMPRIMIR_WORKERS)
+
+
+def _comprimir_documento(
+    in_doc: "fitz.Document",
+    jpeg_quality: int,
+    dpi_scale: float,
+    caminho: Optional[str] = None,
+) -> "fitz.Document":
+    """
+    Rasteriza cada página em tons de cinza (JPEG) num novo documento. Com
+    PY_COMPRIMIR_WORKERS e o caminho do PDF, os lotes de páginas são
+    rasterizados em outros processos (que reabrem o arquivo) e as imagens
+    entram no documento novo na ordem das páginas.
+    """
+    out_doc = fitz.open()
+    total = in_doc.page_count
+
+    if caminho and _paralelizar(total):
+        lotes = paralelo.mapear_lotes(
+            _rasterizar_lote, total, COMPRIMIR_PAGINAS_POR_LOTE, COMPRIMIR_WORKERS,
+            caminho, jpeg_quality, dpi_scale,
+        )
+        paginas = (img for _, _, imagens in lotes for img in imagens)
+    else:
+        paginas = (_rasterizar(page, jpeg_quality, dpi_scale) for page in in_doc)
+
+    with closing(paginas):
+        for idx, (width_pt, height_pt, img_bytes) in enumerate(paginas):
+            # Cria nova página no PDF de saída e insere a imagem
+            new_page = out_doc.new_page(width=width_pt, height=height_pt)
+            rect = fitz.Rect(0, 0, width_pt, height_pt)
+            new_page.insert_image(rect, stream=img_bytes)
+            progresso.publicar("rasterize", idx + 1, total)
+
+    return out_doc
+
+
+def _metricas(original_size: int, compressed_size: int, total_paginas: int) -> Dict[str, Any]:
+    reduction_percent = (
+        (1 - compressed_size / original_size) * 100 if original_size else 0.0
+    )
+    return {
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "reduction_percent": reduction_percent,
+        "total_paginas": total_paginas,
+    }
+
 
 def comprimir_pdf_bytes(
     pdf_bytes: bytes,
@@ -17,37 +96,60 @@ def comprimir_pdf_bytes(
     """
 
     # Abre o PDF de entrada a partir de bytes
-    in_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    out_doc = fitz.open()
+    with etapa("open"):
+        in_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
 
-    for page in in_doc:
-        # Renderiza a página em tons de cinza com a escala configurada
-        pix = page.get_pixmap(
-            matrix=fitz.Matrix(dpi_scale, dpi_scale),
-            colorspace=fitz.csGRAY,
-        )
-        img_bytes = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+    # No modo paralelo os processos leem o PDF de um arquivo temporário
+    # (um só, aberto por todos), em vez de receber os bytes a cada lote
+    caminho_temp = None
+    if _paralelizar(in_doc.page_count):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(pdf_bytes)
+        caminho_temp = tmp.name
+    try:
+        with etapa("rasterize", itens=in_doc.page_count):
+            out_doc = _comprimir_documento(in_doc, jpeg_quality, dpi_scale, caminho_temp)
+    finally:
+        if caminho_temp:
+            os.unlink(caminho_temp)
 
-        # Cria nova página no PDF de saída e insere a imagem
-        width_pt, height_pt = pix.width, pix.height
-        new_page = out_doc.new_page(width=width_pt, height=height_pt)
-        rect = fitz.Rect(0, 0, width_pt, height_pt)
-        new_page.insert_image(rect, stream=img_bytes)
-
-    output_bytes = out_doc.tobytes()
+    with etapa("write"):
+        output_bytes = out_doc.tobytes()
+    total_paginas = out_doc.page_count
 
     in_doc.close()
     out_doc.close()
 
-    original_size = len(pdf_bytes)
-    compressed_size = len(output_bytes)
-    reduction_percent = (
-        (1 - compressed_size / original_size) * 100 if original_size else 0.0
-    )
-
     return {
-        "original_size": original_size,
-        "compressed_size": compressed_size,
-        "reduction_percent": reduction_percent,
+        **_metricas(len(pdf_bytes), len(output_bytes), total_paginas),
         "compressed_bytes": output_bytes,
     }
+
+
+def comprimir_pdf_arquivo(
+    input_path: Path | str,
+    output_path: Path | str,
+    jpeg_quality: int = 50,
+    dpi_scale: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    Mesma compressão de comprimir_pdf_bytes, mas lendo e gravando em disco:
+    o PDF nunca é mantido inteiro em memória como bytes/base64.
+    Devolve apenas as métricas de tamanho.
+    """
+    input_path = Path(input_path)
+    output_path = Path(output_path)
+
+    with etapa("open"):
+        in_doc = fitz.open(str(input_path))
+    with etapa("rasterize", itens=in_doc.page_count):
+        out_doc = _comprimir_documento(in_doc, jpeg_quality, dpi_scale, str(input_path))
+
+    with etapa("write"):
+        out_doc.save(str(output_path))
+    total_paginas = out_doc.page_count
+
+    in_doc.close()
+    out_doc.close()
+
+    return _metricas(input_path.stat().st_size, output_path.stat().st_size, total_paginas)
@@ -0,0 +1,271 @@
+# api/config.py
+"""
+Configurações do serviço Python lidas de variáveis de ambiente.
+
+Segue a mesma ideia do lado Node (process.env.PY_BASE_URL etc.):
+cada ajuste tem um valor padrão e pode ser sobrescrito pelo ambiente.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def env_str(nome: str, padrao: str) -> str:
+    valor = os.environ.get(nome)
+    return valor.strip() if valor and valor.strip() else padrao
+
+
+def env_int(nome: str, padrao: int) -> int:
+    try:
+        return int(os.environ.get(nome, "").strip())
+    except ValueError:
+        return padrao
+
+
+def env_lista(nome: str, padrao: str) -> list[str]:
+    """Lista separada por vírgulas (ex.: nomes de módulos)."""
+    return [item.strip() for item in env_str(nome, padrao).split(",") if item.strip()]
+
+
+def env_float(nome: str, padrao: float) -> float:
+    try:
+        return float(os.environ.get(nome, "").strip())
+    except ValueError:
+        return padrao
+
+
+def env_mapa_int(nome: str, padrao: str) -> dict[str, int]:
+    """Pares chave=valor separados por vírgula (ex.: "comprimir-pdf=2,ajuste-diario-gfbr=1")."""
+    mapa: dict[str, int] = {}
+    for item in env_lista(nome, padrao):
+        chave, _, valor = item.partition("=")
+        try:
+            mapa[chave.strip()] = int(valor)
+        except ValueError:
+            continue
+    return mapa
+
+
+def env_mapa(nome: str, padrao: str) -> dict[str, str]:
+    """Pares chave=valor de texto separados por vírgula (ex.: "ferias-funcionario=pymupdf")."""
+    mapa: dict[str, str] = {}
+    for item in env_lista(nome, padrao):
+        chave, _, valor = item.partition("=")
+        if chave.strip() and valor.strip():
+            mapa[chave.strip()] = valor.strip().lower()
+    return mapa
+
+
+# =========================
+# Fila de jobs assíncronos
+# =========================
+
+# Pasta onde cada job guarda seu job.json e os artefatos gerados
+JOBS_DIR = Path(env_str("PY_JOBS_DIR", str(Path(tempfile.gettempdir()) / "integra_jobs")))
+
+# Quantos jobs rodam ao mesmo tempo neste processo
+JOBS_MAX_CONCORRENTES = env_int("PY_JOBS_MAX_CONCORRENTES", 2)
+
+# Jobs finalizados há mais tempo que isso são apagados (em horas)
+JOBS_RETENCAO_HORAS = env_float("PY_JOBS_RETENCAO_HORAS", 24.0)
+
+
+# =========================
+# Pool de processos dos cores
+# =========================
+
+# Nº de processos; 0 executa os cores na própria thread da requisição
+WORKERS = env_int("PY_WORKERS", max(1, (os.cpu_count() or 2) - 1))
+
+# Recicla cada processo após N tarefas (libera memória fragmentada); 0 = nunca
+WORKER_MAX_TAREFAS = env_int("PY_WORKER_MAX_TAREFAS", 50)
+
+# Módulos importados quando cada processo sobe, separados por vírgula
+WORKER_WARM_IMPORTS = env_lista(
+    "PY_WORKER_WARM_IMPORTS",
+    "api.holerites_core,api.relatorio_ferias_core,"
+    "api.separador_ferias_funcionario_core,api.comprimir_pdf_core",
+)
+
+# Sobe os processos do pool junto com a API (paga o warm-up antes da 1ª requisição)
+WORKER_PREAQUECER = env_int("PY_WORKER_PREAQUECER", 0) == 1
+
+# =========================
+# Uploads
+# =========================
+
+# Tamanho de cada bloco copiado do upload para o disco
+UPLOAD_CHUNK_BYTES = env_int("PY_UPLOAD_CHUNK_BYTES", 1024 * 1024)
+
+# Tamanho máximo aceito por arquivo enviado (0 = sem limite)
+UPLOAD_MAX_BYTES = env_int("PY_UPLOAD_MAX_BYTES", 1024 * 1024 * 1024)
+
+# =========================
+# Imports e warm-up
+# =========================
+
+# Cores importados já na subida da API (por padrão nenhum: carregam no 1º uso)
+API_WARM_IMPORTS = env_lista("PY_WARMUP_MODULES", "")
+
+# Orçamento de tempo de import, em ms; acima disso a subida registra um aviso
+IMPORT_BUDGET_MS = env_int("PY_IMPORT_BUDGET_MS", 1000)
+
+# =========================
+# Cache de resultados
+# =========================
+
+CACHE_ATIVO = env_int("PY_CACHE_ATIVO", 1) == 1
+CACHE_DIR = Path(env_str("PY_CACHE_DIR", str(Path(tempfile.gettempdir()) / "integra_cache")))
+
+# Tamanho máximo somado das entradas (ZIP/XLSX/PDF + meta.json), em MB
+CACHE_MAX_BYTES = env_int("PY_CACHE_MAX_MB", 2048) * 1024 * 1024
+
+# Validade de cada entrada, em horas (0 = sem expiração)
+CACHE_TTL_HORAS = env_float("PY_CACHE_TTL_HORAS", 24.0)
+
+# =========================
+# Cache do texto das páginas (SQLite)
+# =========================
+
+CACHE_TEXTO_ATIVO = env_int("PY_CACHE_TEXTO_ATIVO", 1) == 1
+CACHE_TEXTO_ARQUIVO = Path(
+    env_str("PY_CACHE_TEXTO_ARQUIVO", str(Path(tempfile.gettempdir()) / "integra_texto.sqlite3"))
+)
+
+# Tamanho máximo do texto guardado; acima disso saem os PDFs usados há mais tempo
+CACHE_TEXTO_MAX_BYTES = env_int("PY_CACHE_TEXTO_MAX_MB", 256) * 1024 * 1024
+
+# =========================
+# Controle de admissão (limite por ferramenta)
+# =========================
+
+ADMISSAO_ATIVA = env_int("PY_ADMISSAO_ATIVA", 1) == 1
+
+# Capacidade de cada ferramenta, em unidades de peso (ver PY_PESO_MB)
+LIMITE_PADRAO = env_int("PY_LIMITE_PADRAO", max(2, WORKERS))
+
+# Capacidades específicas; as que mais consomem memória começam mais baixas
+LIMITES_FERRAMENTA = env_mapa_int("PY_LIMITES", "comprimir-pdf=2,ajuste-diario-gfbr=1")
+
+# Cada PY_PESO_MB de entrada conta como uma unidade (mínimo 1 por requisição)
+PESO_MB = env_float("PY_PESO_MB", 25.0)
+
+# Requisições aguardando vaga, por ferramenta; acima disso responde 429 na hora
+FILA_MAX = env_int("PY_FILA_MAX", 8)
+
+# Requisições aguardando vaga somando todas as ferramentas. Quem espera prende
+# uma thread do threadpool do Starlette (40 por padrão, o mesmo que serve os
+# endpoints síncronos como /jobs/{id}, /progress e /metrics); o total fica bem
+# abaixo disso para a espera nunca esgotar o pool
+FILA_MAX_TOTAL = env_int("PY_FILA_MAX_TOTAL", 16)
+
+# Tempo máximo de espera por vaga antes do 429, em segundos
+FILA_ESPERA_S = env_float("PY_FILA_ESPERA_S", 30.0)
+
+# Estimativa de duração usada no Retry-After até haver execuções medidas
+RETRY_AFTER_S = env_int("PY_RETRY_AFTER_S", 10)
+
+# =========================
+# Progresso ao vivo (SSE)
+# =========================
+
+# Pasta do progresso das requisições síncronas (?progress_id=...); jobs usam a pasta do job
+PROGRESSO_DIR = Path(env_str("PY_PROGRESSO_DIR", str(Path(tempfile.gettempdir()) / "integra_progresso")))
+
+# Intervalo mínimo entre gravações de progresso (e entre checagens de cancelamento)
+PROGRESSO_INTERVALO_S = env_float("PY_PROGRESSO_INTERVALO_S", 0.5)
+
+# =========================
+# Saída em ZIP dos separadores de PDF
+# =========================
+
+# "deflated" (padrão) ou "stored": os PDFs já são comprimidos por dentro, e
+# gravar sem deflate poupa CPU ao custo de um ZIP um pouco maior
+ZIP_COMPRESSAO = env_str("PY_ZIP_COMPRESSAO", "deflated")
+
+# 1 = grava os PDFs gerados no modo compacto (objetos idênticos fundidos,
+# streams comprimidos, object streams); ver api/pdf_compacto.py
+PDF_COMPACTO = env_int("PY_PDF_COMPACTO", 0) == 1
+
+# Processos para montar os PDFs por empresa em paralelo (relatório de férias e
+# holerites); 0 ou 1 = em série. Como no PY_HOLERITES_WORKERS, somam-se aos
+# do PY_WORKERS. No holerites em streaming (?streaming=true) não sobem
+# processos: é o nº de lotes montados ao mesmo tempo nos do PY_WORKERS
+ESCRITA_WORKERS = env_int("PY_ESCRITA_WORKERS", 0)
+
+# Com até tantas empresas os PDFs são montados em série (subir os processos
+# custaria mais que o ganho)
+ESCRITA_GRUPOS_EM_SERIE = env_int("PY_ESCRITA_GRUPOS_EM_SERIE", 8)
+
+# =========================
+# Extração de texto
+# =========================
+
+# Motor de texto por ferramenta (pypdf2, pdfplumber ou pymupdf), ex.:
+# "separador-pdf-relatorio-de-ferias=pymupdf". Ferramentas fora da lista usam
+# o motor de sempre (ver api/extracao_texto.py). Nos holerites só valem
+# pdfplumber (padrão) e pymupdf
+MOTORES_TEXTO = env_mapa("PY_MOTOR_TEXTO", "")
+
+# =========================
+# Relatório de férias
+# =========================
+
+# "completa" (padrão): lê o texto de todas as páginas. "fronteiras": o relatório
+# vem ordenado por empresa, então lê páginas de amostra e faz busca binária
+# entre elas para achar onde cada empresa começa (volta à leitura completa se
+# uma empresa aparecer em dois trechos separados ou se as páginas das pontas
+# de um trecho não forem da mesma empresa)
+RELATORIO_MODO_BUSCA = env_str("PY_RELATORIO_MODO_BUSCA", "completa")
+
+# Distância entre as páginas de amostra no modo "fronteiras"; empresas com
+# menos páginas que isso ainda são encontradas, desde que contíguas
+RELATORIO_PASSO_AMOSTRA = env_int("PY_RELATORIO_PASSO_AMOSTRA", 16)
+
+# =========================
+# Comprimir PDF
+# =========================
+
+# Processos para rasterizar as páginas em paralelo; 0 ou 1 = em série. Como no
+# PY_HOLERITES_WORKERS, somam-se aos do PY_WORKERS (e cada compressão
+# simultânea permitida por PY_LIMITES sobe os seus)
+COMPRIMIR_WORKERS = env_int("PY_COMPRIMIR_WORKERS", 0)
+
+# Páginas por lote entregue a cada processo; rasterizar é caro por página,
+# então lotes pequenos equilibram melhor a carga
+COMPRIMIR_PAGINAS_POR_LOTE = env_int("PY_COMPRIMIR_PAGINAS_POR_LOTE", 16)
+
+# =========================
+# Férias por funcionário
+# =========================
+
+# "fixo" (padrão): 2 páginas por funcionário; "ancoras": cada Aviso de Férias
+# abre o bloco de um funcionário, com quantas páginas tiver, e as páginas fora
+# de qualquer bloco são informadas em paginas_orfas
+FERIAS_MODO_BLOCOS = env_str("PY_FERIAS_MODO_BLOCOS", "fixo")
+
+# Processos para ler o texto e montar os PDFs dos funcionários em paralelo;
+# 0 ou 1 = em série. Como no PY_HOLERITES_WORKERS, somam-se aos do PY_WORKERS
+FERIAS_WORKERS = env_int("PY_FERIAS_WORKERS", 0)
+
+# Páginas por lote entregue a cada processo; PDFs com até um lote rodam em série
+FERIAS_PAGINAS_POR_LOTE = env_int("PY_FERIAS_PAGINAS_POR_LOTE", 200)
+
+# =========================
+# Holerites
+# =========================
+
+# "faixa": lê só o topo da página para achar a empresa; "pagina": página inteira (modo antigo)
+HOLERITES_MODO_EXTRACAO = env_str("PY_HOLERITES_MODO_EXTRACAO", "faixa")
+
+# Altura da faixa do topo, em pontos; 0 = calibra pela primeira página
+HOLERITES_FAIXA_PT = env_float("PY_HOLERITES_FAIXA_PT", 0.0)
+
+# Processos para classificar as páginas em paralelo (0 ou 1 = na própria thread).
+# Somam-se aos do PY_WORKERS: o core já roda dentro de um deles
+HOLERITES_WORKERS = env_int("PY_HOLERITES_WORKERS", 0)
+
+# Páginas por lote entregue a cada processo; PDFs com até um lote rodam em série
+HOLERITES_PAGINAS_POR_LOTE = env_int("PY_HOLERITES_PAGINAS_POR_LOTE", 200)
@@ -3,6 +3,8 @@ from pathlib import Path
 import re
 from typing import Iterable, List, Dict
 
+from api.tempos import etapa
+
 # Reaproveita a mesma lógica de sanitização do script original :contentReference[oaicite:9]{index=9}
 def sanitizar_nome(nome: str) -> str:
     """
@@ -59,7 +61,8 @@ def exportar_abas_para_pdf(
 
         wb = None
         try:
-            wb = excel.Workbooks.Open(str(caminho), ReadOnly=True)
+            with etapa("open", itens=1, somar=True):
+                wb = excel.Workbooks.Open(str(caminho), ReadOnly=True)
             nome_wb = sanitizar_nome(caminho.stem)
 
             # Itera apenas por Worksheets (abas de planilha) :contentReference[oaicite:10]{index=10}
@@ -77,14 +80,15 @@ def exportar_abas_para_pdf(
                     nome_pdf = f"{nome_wb} - {nome_aba}.pdf"
                     caminho_pdf = str(pasta_destino_path / nome_pdf)
 
-                    sh.ExportAsFixedFormat(
-                        Type=0,  # xlTypePDF
-                        Filename=caminho_pdf,
-                        Quality=0,  # xlQualityStandard
-                        IncludeDocProperties=True,
-                        IgnorePrintAreas=False,
-                        OpenAfterPublish=False,
-                    )
+                    with etapa("write", itens=1, somar=True):
+                        sh.ExportAsFixedFormat(
+                            Type=0,  # xlTypePDF
+                            Filename=caminho_pdf,
+                            Quality=0,  # xlQualityStandard
+                            IncludeDocProperties=True,
+                            IgnorePrintAreas=False,
+                            OpenAfterPublish=False,
+                        )
 
                     resultados.append(
                         {
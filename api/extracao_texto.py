@@ -0,0 +1,324 @@
+# api/extracao_texto.py
+"""
+Motores de extração de texto de PDF, escolhidos por ferramenta.
+
+Os cores que classificam páginas pelo texto (relatório de férias, férias por
+funcionário, importador Madre SCP) leem o texto através de um DocumentoTexto,
+sem saber qual biblioteca está por baixo:
+
+    with extracao_texto.abrir(pdf_path, motor_da_ferramenta("ferias-funcionario")) as doc:
+        for idx in range(len(doc)):
+            texto = doc.texto(idx)
+
+Motores disponíveis:
+  pypdf2      PdfReader.extract_text (padrão do relatório e das férias)
+  pdfplumber  page.extract_text (padrão do importador)
+  pymupdf     palavras do PyMuPDF remontadas em linhas; bem mais rápido
+
+A escolha é por ferramenta, em PY_MOTOR_TEXTO (ex.:
+"separador-pdf-relatorio-de-ferias=pymupdf,ferias-funcionario=pymupdf").
+
+Os holerites precisam da posição das palavras e leem a página direto da
+biblioteca: pdfplumber (padrão, com as páginas copiadas pelo PyPDF2) ou
+pymupdf (classifica e copia com o mesmo documento, bem mais rápido; a saída
+deve ser comparada antes). A escolha fica no mesmo PY_MOTOR_TEXTO
+("holerites-por-empresa=pymupdf").
+
+O texto de cada página passa pelo cache em SQLite (api/cache_texto.py),
+chaveado pelo hash do arquivo e pelo motor: um PDF já lido por qualquer
+ferramenta não é extraído de novo.
+
+Antes de trocar o motor de uma ferramenta, compare a classificação com PDFs
+reais; a saída precisa ser idêntica à do motor atual:
+
+    python -m api.extracao_texto ferias-funcionario arquivo1.pdf arquivo2.pdf
+
+A mesma comparação roda nos testes (tests/test_extracao_texto.py), com um
+PDF gerado no layout de cada ferramenta.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+from abc import ABC, abstractmethod
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from api.cache_resultados import sha256_arquivo
+from api.cache_texto import cache_texto
+from api.config import MOTORES_TEXTO
+
+# Motor usado quando PY_MOTOR_TEXTO não define a ferramenta (o de sempre)
+MOTOR_PADRAO: Dict[str, str] = {
+    "separador-pdf-relatorio-de-ferias": "pypdf2",
+    "ferias-funcionario": "pypdf2",
+    "importador-recebimentos-madre-scp": "pdfplumber",
+    "holerites-por-empresa": "pdfplumber",
+}
+
+# Ferramentas que leem as posições das palavras direto da biblioteca, sem
+# passar pelo DocumentoTexto: só aceitam estes motores, e a comparação chama
+# o classificador com (caminho, motor)
+MOTORES_PROPRIOS: Dict[str, List[str]] = {
+    "holerites-por-empresa": ["pymupdf", "pdfplumber"],
+}
+
+# Função de classificação de cada ferramenta, usada na comparação entre
+# motores: recebe um DocumentoTexto e devolve uma lista comparável
+CLASSIFICADORES: Dict[str, str] = {
+    "separador-pdf-relatorio-de-ferias": "api.relatorio_ferias_core:classificar_paginas",
+    "ferias-funcionario": "api.separador_ferias_funcionario_core:classificar_blocos",
+    "importador-recebimentos-madre-scp": "api.importador_recebimentos_madre_scp_core:registros_do_documento",
+    "holerites-por-empresa": "api.holerites_core:chaves_por_pagina",
+}
+
+# Distância máxima (pt) entre o topo das palavras da mesma linha (motor pymupdf)
+TOLERANCIA_LINHA = 3
+
+# Entra na chave do cache de texto: incrementar quando a saída de um motor mudar
+VERSAO_MOTOR: Dict[str, int] = {"pypdf2": 1, "pdfplumber": 1, "pymupdf": 1}
+
+
+def motor_da_ferramenta(tool: str) -> str:
+    return MOTORES_TEXTO.get(tool, MOTOR_PADRAO.get(tool, "pypdf2"))
+
+
+class DocumentoTexto(ABC):
+    """PDF aberto para leitura de texto, página a página."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def texto(self, idx: int) -> str:
+        """Texto da página idx ("" se a extração falhar)."""
+
+    def fechar(self) -> None:
+        pass
+
+    def __enter__(self) -> "DocumentoTexto":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+class DocumentoPyPDF2(DocumentoTexto):
+    def __init__(self, caminho: Path | str | None, reader=None) -> None:
+        from PyPDF2 import PdfReader
+
+        self.reader = reader if reader is not None else PdfReader(str(caminho))
+
+    def __len__(self) -> int:
+        return len(self.reader.pages)
+
+    def texto(self, idx: int) -> str:
+        try:
+            return self.reader.pages[idx].extract_text() or ""
+        except Exception:
+            return ""
+
+
+class DocumentoPdfplumber(DocumentoTexto):
+    def __init__(self, caminho: Path | str) -> None:
+        import pdfplumber
+
+        self._pdf = pdfplumber.open(str(caminho))  # pdfplumber espera caminho str
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def texto(self, idx: int) -> str:
+        page = self._pdf.pages[idx]
+        try:
+            return page.extract_text() or ""
+        except Exception:
+            return ""
+        finally:
+            # solta os objetos de layout da página já lida
+            page.close()
+
+    def fechar(self) -> None:
+        self._pdf.close()
+
+
+class DocumentoPyMuPDF(DocumentoTexto):
+    """
+    Remonta as linhas a partir das palavras (topo/esquerda), como o
+    pdfplumber faz: o get_text() simples do PyMuPDF quebra em blocos, e
+    trechos da mesma linha visual sairiam em linhas separadas.
+    """
+
+    def __init__(self, caminho: Path | str) -> None:
+        import fitz  # PyMuPDF
+
+        self._doc = fitz.open(str(caminho))
+
+    def __len__(self) -> int:
+        return self._doc.page_count
+
+    def texto(self, idx: int) -> str:
+        try:
+            words = self._doc.load_page(idx).get_text("words")
+        except Exception:
+            return ""
+        linhas: List[List[tuple]] = []
+        for w in sorted(words, key=lambda w: (w[1], w[0])):
+            if linhas and abs(w[1] - linhas[-1][0][1]) <= TOLERANCIA_LINHA:
+                linhas[-1].append(w)
+            else:
+                linhas.append([w])
+        return "\n".join(
+            " ".join(w[4] for w in sorted(linha, key=lambda w: w[0])) for linha in linhas
+        )
+
+    def fechar(self) -> None:
+        self._doc.close()
+
+
+class DocumentoEmCache(DocumentoTexto):
+    """
+    Atende do cache de texto o que já foi extraído e só abre o motor (lendo
+    o PDF) quando falta alguma página. As páginas novas são gravadas no
+    cache ao fechar, inclusive quando o processamento falha no meio.
+    """
+
+    def __init__(self, abrir_motor: Callable[[], DocumentoTexto], documento: str, motor: str) -> None:
+        self._abrir_motor = abrir_motor
+        self._doc: Optional[DocumentoTexto] = None
+        self.documento = documento
+        self.motor = motor
+        self._total, self._textos = cache_texto.carregar(documento, motor)
+        self._novos: Dict[int, str] = {}
+
+    def _motor(self) -> DocumentoTexto:
+        if self._doc is None:
+            self._doc = self._abrir_motor()
+        return self._doc
+
+    def __len__(self) -> int:
+        if self._total is None:
+            self._total = len(self._motor())
+        return self._total
+
+    def texto(self, idx: int) -> str:
+        if idx not in self._textos:
+            self._textos[idx] = self._novos[idx] = self._motor().texto(idx)
+        return self._textos[idx]
+
+    def fechar(self) -> None:
+        # o total de páginas vem do motor ainda aberto (ou já conhecido)
+        total = len(self) if self._novos else None
+        if self._doc is not None:
+            self._doc.fechar()
+            self._doc = None
+        if self._novos:
+            cache_texto.gravar(self.documento, self.motor, total, self._novos)
+            self._novos = {}
+
+
+MOTORES: Dict[str, Callable[..., DocumentoTexto]] = {
+    "pypdf2": DocumentoPyPDF2,
+    "pdfplumber": DocumentoPdfplumber,
+    "pymupdf": DocumentoPyMuPDF,
+}
+
+
+def abrir(
+    caminho: Path | str,
+    motor: str,
+    reader=None,
+    usar_cache: bool = True,
+    documento: Optional[str] = None,
+) -> DocumentoTexto:
+    """
+    Abre o PDF com o motor pedido. `reader` (PdfReader já aberto pelo core
+    para copiar páginas) é reaproveitado pelo motor pypdf2, sem reler o arquivo.
+    `documento` é o SHA-256 do arquivo quando o chamador já o tem (ex.: os
+    lotes lidos em outros processos): o PDF não é lido inteiro de novo só
+    para montar a chave do cache.
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de texto desconhecido: {motor} (opções: {', '.join(MOTORES)})")
+
+    def abrir_motor() -> DocumentoTexto:
+        if motor == "pypdf2":
+            return DocumentoPyPDF2(caminho, reader=reader)
+        return MOTORES[motor](caminho)
+
+    if not (usar_cache and cache_texto.ativo):
+        return abrir_motor()
+    return DocumentoEmCache(abrir_motor, documento or sha256_arquivo(caminho), f"{motor}:{VERSAO_MOTOR[motor]}")
+
+
+# =========================
+# Comparação entre motores
+# =========================
+
+def _classificador(tool: str) -> Callable[[DocumentoTexto], List[Any]]:
+    modulo, _, nome = CLASSIFICADORES[tool].partition(":")
+    return getattr(importlib.import_module(modulo), nome)
+
+
+def comparar_motores(tool: str, caminho: Path | str, motores: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Classifica o PDF com cada motor e compara com o motor atual da ferramenta.
+    Devolve, por motor: segundos, se a saída é idêntica e as diferenças
+    (posição, esperado, obtido), limitadas às 10 primeiras.
+    """
+    classificar = _classificador(tool)
+    referencia_motor = motor_da_ferramenta(tool)
+    resultados: Dict[str, Dict] = {}
+    referencia: Optional[List[Any]] = None
+    disponiveis = MOTORES_PROPRIOS.get(tool, list(MOTORES))
+
+    for motor in [referencia_motor] + [m for m in (motores or disponiveis) if m != referencia_motor]:
+        inicio = time.perf_counter()
+        if tool in MOTORES_PROPRIOS:
+            saida = classificar(caminho, motor)
+        else:
+            # sem o cache de texto: compara (e cronometra) a extração de verdade
+            with abrir(caminho, motor, usar_cache=False) as doc:
+                saida = classificar(doc)
+        segundos = time.perf_counter() - inicio
+
+        if referencia is None:
+            referencia = saida
+        diferencas = [
+            (i, esperado, obtido)
+            for i, (esperado, obtido) in enumerate(zip(referencia, saida))
+            if esperado != obtido
+        ]
+        if len(referencia) != len(saida):
+            diferencas.append((min(len(referencia), len(saida)), len(referencia), len(saida)))
+        resultados[motor] = {
+            "segundos": round(segundos, 3),
+            "identico": not diferencas,
+            "diferencas": diferencas[:10],
+        }
+    return resultados
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) < 2 or argv[0] not in CLASSIFICADORES:
+        print("uso: python -m api.extracao_texto <ferramenta> <pdf> [<pdf> ...]")
+        print("ferramentas: " + ", ".join(CLASSIFICADORES))
+        return 2
+
+    tool, arquivos = argv[0], argv[1:]
+    ok = True
+    for arquivo in arquivos:
+        print(f"{arquivo} (referência: {motor_da_ferramenta(tool)})")
+        for motor, r in comparar_motores(tool, arquivo).items():
+            status = "idêntico" if r["identico"] else "DIFERENTE"
+            print(f"  {motor:<11} {r['segundos']:>8.3f}s  {status}")
+            for posicao, esperado, obtido in r["diferencas"]:
+                print(f"      [{posicao}] {esperado!r} -> {obtido!r}")
+            ok = ok and r["identico"]
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -5,6 +5,9 @@ from pathlib import Path
 from io import BytesIO
 import zipfile
 
+from api.nomes_arquivos import RegistroNomes
+from api.tempos import etapa
+
 try:
     import rarfile  # type: ignore
     RAR_AVAILABLE = True
@@ -52,11 +55,15 @@ def unique_name_for_size(
     base_name: str,
     size: int,
     used_sizes_for_name: dict,
+    nomes: RegistroNomes,
 ) -> Path:
     """
     Gera um nome único em dest_dir, evitando sobrescrever arquivos com mesmo
     nome mas tamanho distinto, reaproveitando o arquivo se o tamanho coincidir.
     Lógica baseada no script original EXTRATOR DE ZIP-RAR.py. :contentReference[oaicite:7]{index=7}
+
+    Nomes e tamanhos vêm do registro da execução (semeado com a listagem de
+    dest_dir), sem consultar o disco a cada candidato.
     """
     name = base_name
     stem = Path(base_name).stem
@@ -67,18 +74,17 @@ def unique_name_for_size(
         # já temos um arquivo com esse nome e tamanho
         return dest_dir / name
     else:
-        if len(sizes) == 0 and not (dest_dir / name).exists():
+        if len(sizes) == 0 and name not in nomes:
             return dest_dir / name
         idx = 2
         while True:
             cand = f"{stem} ({idx}){suffix}"
-            cand_path = dest_dir / cand
-            if cand_path.exists():
-                if cand_path.stat().st_size == size:
-                    return cand_path
+            if cand in nomes:
+                if nomes.tamanho(cand) == size:
+                    return dest_dir / cand
                 idx += 1
             else:
-                return cand_path
+                return dest_dir / cand
 
 
 def add_record_for_written(
@@ -97,12 +103,13 @@ def save_file(
     data: bytes,
     dest_dir: Path,
     used_sizes_for_name: dict,
+    nomes: RegistroNomes,
     logs: list[str] | None = None,
 ):
     base_name = Path(member_name).name
     size = len(data)
-    out_path = unique_name_for_size(dest_dir, base_name, size, used_sizes_for_name)
-    if out_path.exists() and out_path.stat().st_size == size:
+    out_path = unique_name_for_size(dest_dir, base_name, size, used_sizes_for_name, nomes)
+    if nomes.tamanho(out_path.name) == size:
         # já existe um arquivo idêntico, não grava novamente
         return
 
@@ -111,6 +118,7 @@ def save_file(
         f.write(data)
 
     add_record_for_written(out_path, base_name, size, used_sizes_for_name)
+    nomes.ocupar(out_path.name, size)
     msg = f"[+] {out_path.name} ({size} bytes)"
     _log(msg, logs)
 
@@ -119,6 +127,7 @@ def extract_zipfile(
     zf: zipfile.ZipFile,
     dest_dir: Path,
     used_sizes_for_name: dict,
+    nomes: RegistroNomes,
     depth: int,
     logs: list[str],
 ):
@@ -145,16 +154,17 @@ def extract_zipfile(
             msg = f"[*] Encontrado compactado interno: {member_name} (profundidade {depth+1})"
             _log(msg, logs)
             process_archive_bytes(
-                member_name, data, dest_dir, used_sizes_for_name, depth + 1, logs
+                member_name, data, dest_dir, used_sizes_for_name, nomes, depth + 1, logs
             )
         else:
-            save_file(member_name, data, dest_dir, used_sizes_for_name, logs)
+            save_file(member_name, data, dest_dir, used_sizes_for_name, nomes, logs)
 
 
 def extract_rarfile(
     rf,
     dest_dir: Path,
     used_sizes_for_name: dict,
+    nomes: RegistroNomes,
     depth: int,
     logs: list[str],
 ):
@@ -186,10 +196,10 @@ def extract_rarfile(
             msg = f"[*] Encontrado compactado interno: {member_name} (profundidade {depth+1})"
             _log(msg, logs)
             process_archive_bytes(
-                member_name, data, dest_dir, used_sizes_for_name, depth + 1, logs
+                member_name, data, dest_dir, used_sizes_for_name, nomes, depth + 1, logs
             )
         else:
-            save_file(member_name, data, dest_dir, used_sizes_for_name, logs)
+            save_file(member_name, data, dest_dir, used_sizes_for_name, nomes, logs)
 
 
 def process_archive_bytes(
@@ -197,6 +207,7 @@ def process_archive_bytes(
     data: bytes,
     dest_dir: Path,
     used_sizes_for_name: dict,
+    nomes: RegistroNomes,
     depth: int,
     logs: list[str],
 ):
@@ -206,7 +217,7 @@ def process_archive_bytes(
     if ext == ".zip":
         try:
             with zipfile.ZipFile(bio, "r") as zf:
-                extract_zipfile(zf, dest_dir, used_sizes_for_name, depth, logs)
+                extract_zipfile(zf, dest_dir, used_sizes_for_name, nomes, depth, logs)
         except zipfile.BadZipFile:
             msg = f"[ERRO] Compactado interno .zip corrompido: {name}"
             _log(msg, logs)
@@ -222,7 +233,7 @@ def process_archive_bytes(
             import rarfile  # type: ignore
 
             with rarfile.RarFile(fileobj=bio) as rf:  # type: ignore[arg-type]
-                extract_rarfile(rf, dest_dir, used_sizes_for_name, depth, logs)
+                extract_rarfile(rf, dest_dir, used_sizes_for_name, nomes, depth, logs)
         except Exception as e:
             msg = f'[ERRO] RAR interno inválido "{name}": {e}'
             _log(msg, logs)
@@ -232,6 +243,7 @@ def process_zip_path(
     zip_path: Path,
     dest_dir: Path,
     used_sizes_for_name: dict,
+    nomes: RegistroNomes,
     logs: list[str],
     depth: int = 0,
 ):
@@ -240,7 +252,7 @@ def process_zip_path(
 
     try:
         with zipfile.ZipFile(zip_path, "r") as zf:
-            extract_zipfile(zf, dest_dir, used_sizes_for_name, depth, logs)
+            extract_zipfile(zf, dest_dir, used_sizes_for_name, nomes, depth, logs)
     except zipfile.BadZipFile:
         msg = "[ERRO] Arquivo .zip corrompido ou inválido."
         _log(msg, logs)
@@ -253,6 +265,7 @@ def process_rar_path(
     rar_path: Path,
     dest_dir: Path,
     used_sizes_for_name: dict,
+    nomes: RegistroNomes,
     logs: list[str],
     depth: int = 0,
 ):
@@ -271,7 +284,7 @@ def process_rar_path(
         import rarfile  # type: ignore
 
         with rarfile.RarFile(rar_path, "r") as rf:
-            extract_rarfile(rf, dest_dir, used_sizes_for_name, depth, logs)
+            extract_rarfile(rf, dest_dir, used_sizes_for_name, nomes, depth, logs)
     except Exception as e:
         msg = f"[ERRO] {e}"
         _log(msg, logs)
@@ -295,13 +308,18 @@ def processar_pasta_zip_rar(base_dir: Path, max_depth: int = MAX_DEPTH) -> dict:
     dest_dir = ensure_arquivos_dir(base_dir)
 
     used_sizes_for_name: dict[str, list[int]] = {}
+    # maiúsculas/minúsculas como no exists() que o registro substitui: seguem
+    # o sistema de arquivos (no Linux "A.pdf" e "a.pdf" são arquivos distintos)
+    nomes = RegistroNomes()
 
-    # registra arquivos já existentes em ARQUIVOS, se houver
+    # registra arquivos já existentes em ARQUIVOS, se houver (única listagem
+    # da pasta; daí em diante os nomes livres são decididos em memória)
     for existing in dest_dir.glob("*"):
         if existing.is_file():
             base_name = existing.name
             size = existing.stat().st_size
             add_record_for_written(existing, base_name, size, used_sizes_for_name)
+            nomes.ocupar(base_name, size)
 
     arquivos_antes = sum(len(v) for v in used_sizes_for_name.values())
 
@@ -324,14 +342,16 @@ def processar_pasta_zip_rar(base_dir: Path, max_depth: int = MAX_DEPTH) -> dict:
         }
 
     # processa todos os compactados
-    for a in archives:
-        if a.suffix.lower() == ".zip":
-            process_zip_path(a, dest_dir, used_sizes_for_name, logs, depth=0)
-        elif a.suffix.lower() == ".rar":
-            process_rar_path(a, dest_dir, used_sizes_for_name, logs, depth=0)
-
-    arquivos_depois = sum(len(v) for v in used_sizes_for_name.values())
-    total_novos = max(arquivos_depois - arquivos_antes, 0)
+    with etapa("extract") as e:
+        for a in archives:
+            if a.suffix.lower() == ".zip":
+                process_zip_path(a, dest_dir, used_sizes_for_name, nomes, logs, depth=0)
+            elif a.suffix.lower() == ".rar":
+                process_rar_path(a, dest_dir, used_sizes_for_name, nomes, logs, depth=0)
+
+        arquivos_depois = sum(len(v) for v in used_sizes_for_name.values())
+        total_novos = max(arquivos_depois - arquivos_antes, 0)
+        e.itens = total_novos
 
     resumo = {
         "dest_dir": str(dest_dir),
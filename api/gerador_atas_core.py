@@ -11,6 +11,8 @@ from typing import List, Dict, Any
 from docx.document import Document as _Document
 from docx.table import _Cell
 
+from api.tempos import etapa
+
 # =========================
 # Diretórios de trabalho
 # =========================
@@ -20,8 +22,11 @@ DATA_DIR = BASE_DIR / "data"
 MODELOS_DIR = DATA_DIR / "atas_modelos"
 SAIDA_DIR = DATA_DIR / "atas_geradas"
 
-MODELOS_DIR.mkdir(parents=True, exist_ok=True)
-SAIDA_DIR.mkdir(parents=True, exist_ok=True)
+
+def garantir_diretorios() -> None:
+    """Cria as pastas de modelos/saída no primeiro uso (não no import do módulo)."""
+    MODELOS_DIR.mkdir(parents=True, exist_ok=True)
+    SAIDA_DIR.mkdir(parents=True, exist_ok=True)
 
 # =========================
 # Utilidades de formatação
@@ -498,6 +503,7 @@ def aplicar_assinaturas_no_doc(
 
 
 def listar_modelos() -> List[Dict[str, str]]:
+    garantir_diretorios()
     modelos = []
     for p in sorted(MODELOS_DIR.glob("*.docx")):
         modelos.append({"id": p.name, "fileName": p.name, "displayName": p.stem})
@@ -603,18 +609,20 @@ def gerar_ata(
     # preenche LUCRO_... que não vieram da tela com "" (sem 0,00)
     completar_lucros_zerados(modelo_path, dados)
 
-    # gerar documento com placeholders substituídos
-    doc = preencher_documento(modelo_path, dados)
+    with etapa("fill"):
+        # gerar documento com placeholders substituídos
+        doc = preencher_documento(modelo_path, dados)
 
-    # remover linhas da tabela de lucros que não têm valor (ou são 0,00)
-    remover_linhas_lucros_sem_valor(doc, lucros)
+        # remover linhas da tabela de lucros que não têm valor (ou são 0,00)
+        remover_linhas_lucros_sem_valor(doc, lucros)
 
-    # assinaturas
-    aplicar_assinaturas_no_doc(doc, assinaturas_pf, assinaturas_pj)
+        # assinaturas
+        aplicar_assinaturas_no_doc(doc, assinaturas_pf, assinaturas_pj)
 
     nome_saida = montar_nome_arquivo_saida(modelo_path, dados)
     caminho_saida = SAIDA_DIR / nome_saida
     SAIDA_DIR.mkdir(parents=True, exist_ok=True)
-    doc.save(str(caminho_saida))
+    with etapa("write"):
+        doc.save(str(caminho_saida))
 
     return nome_saida
@@ -1,13 +1,40 @@
 # api/holerites_core.py
 
+from contextlib import closing, nullcontext
 from pathlib import Path
-from typing import Dict, List
-from zipfile import ZipFile, ZIP_DEFLATED
+from typing import Any, Dict, List, Optional
 import re
 
-import pdfplumber
+import fitz  # PyMuPDF
 from PyPDF2 import PdfReader, PdfWriter
 
+from api import paralelo, pdf_compacto, progresso
+from api.extracao_texto import MOTORES_PROPRIOS, motor_da_ferramenta
+from api.config import (
+    ESCRITA_GRUPOS_EM_SERIE,
+    ESCRITA_WORKERS,
+    HOLERITES_FAIXA_PT,
+    HOLERITES_MODO_EXTRACAO,
+    HOLERITES_PAGINAS_POR_LOTE,
+    HOLERITES_WORKERS,
+)
+from api.nomes_arquivos import RegistroNomes
+from api.saida_zip import SaidaZip
+from api.tempos import etapa
+
+# Distância máxima (pt) entre o topo das palavras para contarem como a mesma linha
+TOLERANCIA_LINHA = 4
+
+# A cada tantas páginas classificadas o cache de recursos do MuPDF é reduzido
+# à metade; sem isso ele cresce com o documento inteiro (até 256 MB)
+PAGINAS_POR_FAXINA = 50
+
+TOOL = "holerites-por-empresa"
+
+# Origem aberta em cada processo de escrita paralela: o mesmo processo monta
+# várias empresas e não precisa reabrir o PDF a cada uma
+_ORIGEM_ABERTA: Dict[tuple[str, str], "OrigemHolerites"] = {}
+
 
 def simplify_name(name: str) -> str:
     """Normaliza o nome da empresa, removendo acentos e caracteres especiais."""
@@ -20,18 +47,99 @@ def simplify_name(name: str) -> str:
     return name
 
 
+def _primeira_linha(palavras) -> str:
+    """Recebe (topo, x0, texto) de cada palavra e monta a linha mais alta da página."""
+    if not palavras:
+        return ""
+    min_top = min(p[0] for p in palavras)
+    same_line = [p for p in palavras if abs(p[0] - min_top) <= TOLERANCIA_LINHA]
+    same_line.sort(key=lambda p: p[1])
+    return " ".join(p[2].strip() for p in same_line if p[2].strip())
+
+
+class FaixaCabecalho:
+    """
+    Lê só a faixa do topo da página, onde fica o nome da empresa.
+
+    O recorte é feito pelo PyMuPDF antes da extração (clip), então o resto
+    da página nem é interpretado. Sem altura configurada, a faixa é calibrada
+    na primeira página: vai até o fim da primeira linha mais duas alturas de
+    linha de folga.
+    """
+
+    def __init__(self, altura_pt: float = 0.0):
+        self.altura = altura_pt if altura_pt > 0 else None
+
+    def calibrar(self, page: "fitz.Page") -> None:
+        words = page.get_text("words")
+        if not words:
+            return  # página sem texto: tenta calibrar na próxima
+        min_top = min(w[1] for w in words)
+        linha = [w for w in words if abs(w[1] - min_top) <= TOLERANCIA_LINHA]
+        fim_linha = max(w[3] for w in linha)
+        self.altura = min(page.rect.height, fim_linha + 2 * (fim_linha - min_top))
+
+    def calibrar_documento(self, doc: "fitz.Document") -> None:
+        """
+        Calibra de antemão na mesma página que o laço serial usaria (a primeira
+        não girada com texto), para os lotes paralelos lerem a mesma faixa.
+        """
+        for page in doc:
+            if self.altura is not None:
+                return
+            if not page.rotation:
+                self.calibrar(page)
+
+    def primeira_linha(self, page: "fitz.Page") -> str:
+        # páginas giradas trocam o sistema de coordenadas: ficam com a página inteira
+        if page.rotation:
+            return ""
+        if self.altura is None:
+            self.calibrar(page)
+            if self.altura is None:
+                return ""
+        clip = fitz.Rect(0, 0, page.rect.width, self.altura)
+        words = page.get_text("words", clip=clip)
+        return _primeira_linha([(w[1], w[0], w[4]) for w in words])
+
+
+def _candidato_empresa(linha: str) -> str | None:
+    candidate = re.sub(r"\s+", " ", (linha or "")).strip()
+    if candidate:
+        if re.match(r"^\d{1,6}\s+.+$", candidate):
+            return candidate
+        if len(candidate) >= 3:
+            return candidate
+    return None
+
+
+def extract_company_from_page(page: "fitz.Page") -> str:
+    """
+    Motor "pymupdf": usa a primeira linha da página inteira como base para o
+    nome da empresa. Fallback: primeira linha de texto extraído.
+    """
+    words = page.get_text("words")
+    candidate = _candidato_empresa(_primeira_linha([(w[1], w[0], w[4]) for w in words]))
+    if candidate:
+        return candidate
+
+    try:
+        for ln in (page.get_text() or "").splitlines():
+            s = ln.strip()
+            if s:
+                return s
+    except Exception:
+        pass
+
+    return "DESCONHECIDO"
+
+
 def extract_first_line_pdfplumber(page):
     """
     Extrai a primeira linha (topo/esquerda) da página usando pdfplumber.
     """
     words = page.extract_words(x_tolerance=1, y_tolerance=1, keep_blank_chars=False)
-    if not words:
-        return ""
-    min_top = min(w.get("top", 0) for w in words)
-    tol = 4
-    same_line = [w for w in words if abs(w.get("top", 0) - min_top) <= tol]
-    same_line.sort(key=lambda w: w.get("x0", 0))
-    return " ".join(w.get("text", "").strip() for w in same_line if w.get("text", "").strip())
+    return _primeira_linha([(w.get("top", 0), w.get("x0", 0), w.get("text", "")) for w in words])
 
 
 def extract_company_from_page_plumber(page):
@@ -39,12 +147,9 @@ def extract_company_from_page_plumber(page):
     Usa a primeira linha da página como base para o nome da empresa.
     Fallback: primeira linha de texto extraído.
     """
-    candidate = re.sub(r"\s+", " ", (extract_first_line_pdfplumber(page) or "")).strip()
+    candidate = _candidato_empresa(extract_first_line_pdfplumber(page))
     if candidate:
-        if re.match(r"^\d{1,6}\s+.+$", candidate):
-            return candidate
-        if len(candidate) >= 3:
-            return candidate
+        return candidate
 
     try:
         txt = page.extract_text() or ""
@@ -58,38 +163,314 @@ def extract_company_from_page_plumber(page):
     return "DESCONHECIDO"
 
 
+def motor_holerites() -> str:
+    """Motor da página inteira (PY_MOTOR_TEXTO, chave "holerites-por-empresa")."""
+    motor = motor_da_ferramenta(TOOL)
+    if motor not in MOTORES_PROPRIOS[TOOL]:
+        raise ValueError(
+            f"Motor de texto inválido para {TOOL}: {motor} (opções: {', '.join(MOTORES_PROPRIOS[TOOL])})"
+        )
+    return motor
+
+
+class OrigemHolerites:
+    """
+    O PDF de holerites aberto uma vez só, compartilhado pela classificação e
+    pela cópia das páginas.
+
+    Motor "pdfplumber" (padrão): o pdfplumber lê a página e o PdfReader
+    (PyPDF2) copia, os dois sobre o mesmo arquivo aberto. Nenhuma das duas
+    bibliotecas faz as duas coisas; o pdfplumber é fechado ao fim da
+    classificação, antes de o PdfReader começar, então só um dos grafos de
+    objetos fica em memória por vez.
+
+    Motor "pymupdf" (opcional, ver api/extracao_texto.py): o mesmo Document
+    do PyMuPDF classifica e copia, interpretando o PDF uma vez só.
+
+    No modo "faixa" o topo da página é lido pelo PyMuPDF nos dois motores;
+    o pdfplumber só abre se alguma página precisar da página inteira.
+    """
+
+    def __init__(
+        self,
+        caminho: Path | str,
+        motor: Optional[str] = None,
+        modo: Optional[str] = None,
+        altura_faixa: Optional[float] = None,
+    ) -> None:
+        self.caminho = str(caminho)
+        self.motor = motor or motor_holerites()
+        self.modo = modo or HOLERITES_MODO_EXTRACAO
+        altura = HOLERITES_FAIXA_PT if altura_faixa is None else altura_faixa
+        self.faixa = FaixaCabecalho(altura) if self.modo == "faixa" else None
+        self._arquivo = open(self.caminho, "rb")
+        self._fitz: Optional["fitz.Document"] = None
+        self._plumber = None
+        self._reader: Optional[PdfReader] = None
+
+    def __enter__(self) -> "OrigemHolerites":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+    def _documento_fitz(self) -> "fitz.Document":
+        if self._fitz is None:
+            self._fitz = fitz.open(self.caminho)
+        return self._fitz
+
+    def _pdf_plumber(self):
+        if self._plumber is None:
+            import pdfplumber
+
+            self._plumber = pdfplumber.open(self._arquivo)
+        return self._plumber
+
+    @property
+    def total(self) -> int:
+        if self.faixa or self.motor == "pymupdf":
+            return self._documento_fitz().page_count
+        return len(self._pdf_plumber().pages)
+
+    def calibrar_faixa(self) -> Optional[float]:
+        """Altura da faixa, calibrada de antemão para os lotes paralelos lerem a mesma."""
+        if self.faixa is None:
+            return None
+        self.faixa.calibrar_documento(self._documento_fitz())
+        return self.faixa.altura
+
+    def empresa(self, idx: int) -> Optional[str]:
+        """Nome bruto da empresa na página idx."""
+        company_raw = None
+        if self.faixa:
+            company_raw = _candidato_empresa(self.faixa.primeira_linha(self._documento_fitz().load_page(idx)))
+        if company_raw:
+            return company_raw
+        if self.motor == "pymupdf":
+            return extract_company_from_page(self._documento_fitz().load_page(idx))
+        page = self._pdf_plumber().pages[idx]
+        try:
+            return extract_company_from_page_plumber(page)
+        finally:
+            # solta os objetos de layout da página já classificada
+            page.close()
+
+    def fim_da_classificacao(self) -> None:
+        """Libera o que só a classificação usa antes de começar a cópia."""
+        if self._plumber is not None:
+            self._plumber.close()  # o arquivo é nosso: continua aberto
+            self._plumber = None
+        if self._fitz is not None and self.motor != "pymupdf":
+            self._fitz.close()
+            self._fitz = None
+
+    def _leitor(self) -> PdfReader:
+        if self._reader is None:
+            self._reader = PdfReader(self._arquivo)
+        return self._reader
+
+    def montar_writer(self, paginas: List[int]) -> PdfWriter:
+        """Motor "pdfplumber": as páginas do grupo num PdfWriter (a saída de sempre)."""
+        writer = PdfWriter()
+        reader = self._leitor()
+        for p in paginas:
+            writer.add_page(reader.pages[p])
+        return writer
+
+    def montar_bytes(self, paginas: List[int]) -> bytes:
+        """PDF serializado do grupo de páginas, no writer do motor."""
+        if self.motor == "pymupdf":
+            return montar_pdf(self._documento_fitz(), paginas)
+        return pdf_compacto.bytes_do_writer(self.montar_writer(paginas))
+
+    def adicionar_ao_zip(self, zip_saida: SaidaZip, nome: str, paginas: List[int]) -> None:
+        if self.motor == "pymupdf":
+            zip_saida.adicionar(nome, montar_pdf(self._documento_fitz(), paginas))
+        else:
+            zip_saida.adicionar_pdf(nome, self.montar_writer(paginas))
+
+    def fechar(self) -> None:
+        self.fim_da_classificacao()
+        if self._fitz is not None:
+            self._fitz.close()
+            self._fitz = None
+        self._reader = None
+        self._arquivo.close()
+
+
+def _classificar_paginas(origem: OrigemHolerites, indices: range):
+    """Gera (índice, chave da empresa) para cada página do intervalo."""
+    for idx in indices:
+        company_raw = origem.empresa(idx)
+        # segura o cache do MuPDF (fontes, imagens decodificadas) das páginas já lidas
+        if (idx + 1) % PAGINAS_POR_FAXINA == 0:
+            fitz.TOOLS.store_shrink(50)
+        yield idx, simplify_name(company_raw) if company_raw else f"DESCONHECIDO_PAG_{idx+1}"
+
+
+def _classificar_lote(
+    caminho: str, modo: str, motor: str, altura: float | None, inicio: int, fim: int
+) -> List[str]:
+    """Roda num processo de paralelo.mapear_lotes: abre o PDF e classifica [inicio, fim)."""
+    with OrigemHolerites(caminho, motor, modo, altura or 0.0) as origem:
+        return [key for _, key in _classificar_paginas(origem, range(inicio, fim))]
+
+
+def chaves_por_pagina(caminho: str, motor: str) -> List[str]:
+    """
+    Chave da empresa de cada página, em série, com o motor pedido. Usada na
+    comparação entre motores (python -m api.extracao_texto holerites-por-empresa).
+    """
+    with OrigemHolerites(caminho, motor) as origem:
+        return [key for _, key in _classificar_paginas(origem, range(origem.total))]
+
+
+def _faixas_contiguas(paginas: List[int]) -> List[tuple[int, int]]:
+    """[0, 1, 2, 5, 6] -> [(0, 2), (5, 6)]: cada faixa vira um único insert_pdf."""
+    faixas: List[tuple[int, int]] = []
+    for p in paginas:
+        if faixas and faixas[-1][1] == p - 1:
+            faixas[-1] = (faixas[-1][0], p)
+        else:
+            faixas.append((p, p))
+    return faixas
+
+
+def montar_pdf(doc: "fitz.Document", paginas: List[int]) -> bytes:
+    """Motor "pymupdf": copia as páginas do documento (já aberto) para um novo PDF, em memória."""
+    faixas = _faixas_contiguas(paginas)
+    with fitz.open() as saida:
+        for i, (de, ate) in enumerate(faixas):
+            # final=False mantém o mapa de objetos já copiados entre as faixas:
+            # fontes e imagens compartilhadas entram uma vez só no arquivo
+            saida.insert_pdf(doc, from_page=de, to_page=ate, final=i == len(faixas) - 1)
+        return saida.tobytes(**pdf_compacto.opcoes_salvar())
+
+
+def _montar_pdf_do_arquivo(caminho: str, motor: str, paginas: List[int]) -> bytes:
+    """Roda num processo de paralelo.mapear: montar_bytes a partir do caminho."""
+    origem = _ORIGEM_ABERTA.get((caminho, motor))
+    if origem is None:
+        for anterior in _ORIGEM_ABERTA.values():
+            anterior.fechar()
+        _ORIGEM_ABERTA.clear()
+        origem = _ORIGEM_ABERTA[(caminho, motor)] = OrigemHolerites(caminho, motor)
+    return origem.montar_bytes(paginas)
+
+
+def classificar_arquivo(caminho: str) -> Dict[str, List[int]]:
+    """
+    Só a classificação (páginas por empresa, na ordem do documento). Usada
+    pelo endpoint em streaming: roda no worker_pool, e o ZIP é montado na API
+    enquanto os PDFs ficam prontos (ver montar_pdfs_do_arquivo).
+    """
+    with etapa("open"):
+        origem = OrigemHolerites(caminho)
+    with origem:
+        return _classificar_documento(origem)
+
+
+def montar_pdfs_do_arquivo(caminho: str, grupos: List[List[int]]) -> List[bytes]:
+    """PDF de cada grupo de páginas, abrindo o arquivo só para esta chamada (worker_pool)."""
+    with OrigemHolerites(caminho) as origem, etapa("write", itens=len(grupos), somar=True):
+        return [origem.montar_bytes(paginas) for paginas in grupos]
+
+
 def split_pdf_holerites(input_pdf: Path, out_dir: Path, competencia: str) -> Path:
     """
-    Holerites: separa por empresa usando pdfplumber (primeira linha da página).
+    Holerites: separa por empresa usando a primeira linha da página.
     Gera um ZIP com um PDF por empresa.
     """
+    return separar_holerites(input_pdf, out_dir, competencia)["zip_path"]
+
+
+def separar_holerites(input_pdf: Path, out_dir: Path, competencia: str) -> Dict[str, Any]:
+    """
+    split_pdf_holerites devolvendo também o nº de páginas, para as métricas
+    da API não precisarem reabrir o PDF: {"zip_path", "total_paginas"}.
+
+    O arquivo é aberto uma vez só (OrigemHolerites) e serve à classificação
+    e à cópia das páginas nos arquivos por empresa.
+    """
     out_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = out_dir / f"{input_pdf.stem}_empresas_{competencia}.zip"
+    with etapa("open"):
+        origem = OrigemHolerites(input_pdf)
+    with origem:
+        company_pages = _classificar_documento(origem)
+        _gravar_zip(origem, company_pages, competencia, zip_path)
+    # cada página está em exatamente uma empresa
+    return {"zip_path": zip_path, "total_paginas": sum(len(p) for p in company_pages.values())}
 
-    reader = PdfReader(str(input_pdf))
+
+def _classificar_documento(origem: OrigemHolerites) -> Dict[str, List[int]]:
+    """Agrupa as páginas por empresa, na ordem do documento."""
     company_pages: Dict[str, List[int]] = {}
 
-    with pdfplumber.open(str(input_pdf)) as pdf:
-        for idx, page in enumerate(pdf.pages):
-            company_raw = extract_company_from_page_plumber(page)
-            key = simplify_name(company_raw) if company_raw else f"DESCONHECIDO_PAG_{idx+1}"
-            company_pages.setdefault(key, []).append(idx)
+    with etapa("extract") as e:
+        total = origem.total
+        if paralelo.vale_paralelizar(total, HOLERITES_PAGINAS_POR_LOTE, HOLERITES_WORKERS):
+            lotes = paralelo.mapear_lotes(
+                _classificar_lote,
+                total,
+                HOLERITES_PAGINAS_POR_LOTE,
+                HOLERITES_WORKERS,
+                origem.caminho,
+                origem.modo,
+                origem.motor,
+                origem.calibrar_faixa(),
+            )
+            for inicio, fim, chaves in lotes:
+                for idx, key in enumerate(chaves, start=inicio):
+                    company_pages.setdefault(key, []).append(idx)
+                progresso.publicar("extract", fim, total, empresa=chaves[-1])
+        else:
+            for idx, key in _classificar_paginas(origem, range(total)):
+                company_pages.setdefault(key, []).append(idx)
+                progresso.publicar("extract", idx + 1, total, empresa=key)
+        e.itens = total
 
-    created_paths: List[Path] = []
+    origem.fim_da_classificacao()
+    return company_pages
 
-    for key, pages in company_pages.items():
-        writer = PdfWriter()
-        for p in pages:
-            writer.add_page(reader.pages[p])
 
-        out_path = out_dir / f"{key} {competencia}.pdf"
-        with open(out_path, "wb") as f:
-            writer.write(f)
+def _gravar_zip(
+    origem: OrigemHolerites,
+    company_pages: Dict[str, List[int]],
+    competencia: str,
+    destino: Path,
+) -> List[str]:
+    """
+    Monta um PDF por empresa e grava no ZIP, na ordem do documento. Com
+    PY_ESCRITA_WORKERS os PDFs são montados em outros processos (que reabrem
+    o arquivo); o ZIP continua sendo gravado aqui, na mesma ordem e com os
+    mesmos nomes da montagem em série.
+    """
+    grupos = list(company_pages.items())
+    pdfs = None
+    if paralelo.vale_paralelizar(len(grupos), ESCRITA_GRUPOS_EM_SERIE, ESCRITA_WORKERS):
+        pdfs = paralelo.mapear(
+            _montar_pdf_do_arquivo,
+            [(origem.caminho, origem.motor, pages) for _, pages in grupos],
+            ESCRITA_WORKERS,
+        )
 
-        created_paths.append(out_path)
+    # cada PDF por empresa vai direto para o ZIP, sem passar pelo disco
+    nomes = RegistroNomes()
+    with SaidaZip(destino) as zip_saida, closing(pdfs) if pdfs else nullcontext():
+        with etapa("write", itens=len(grupos)):
+            for key, pages in grupos:
+                nome = nomes.reservar(f"{key} {competencia}", ".pdf")
+                try:
+                    if pdfs is None:
+                        origem.adicionar_ao_zip(zip_saida, nome, pages)
+                    else:
+                        zip_saida.adicionar(nome, next(pdfs))
+                except Exception as e:
+                    raise RuntimeError(f"Erro ao gerar {nome}: {e}") from e
+                progresso.publicar("write", len(zip_saida.nomes), len(grupos), arquivo=nome)
 
-    zip_path = out_dir / f"{input_pdf.stem}_empresas_{competencia}.zip"
-    with ZipFile(zip_path, "w", compression=ZIP_DEFLATED) as zf:
-        for p in created_paths:
-            zf.write(p, arcname=p.name)
+        with etapa("zip", itens=len(zip_saida.nomes)):
+            zip_saida.fechar()
 
-    return zip_path
+    return zip_saida.nomes
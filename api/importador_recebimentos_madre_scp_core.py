@@ -16,6 +16,9 @@ except ImportError as exc:
         "Instale: pdfplumber, pandas, XlsxWriter."
     ) from exc
 
+from api import extracao_texto, progresso
+from api.tempos import etapa
+
 # Configurações de parsing (baseadas no script original) :contentReference[oaicite:11]{index=11}
 ACCOUNT_REGEX = re.compile(r"\bSCO_[A-Z0-9_]+\b")
 DATE_REGEX = re.compile(r"\d{2}/\d{2}/\d{4}")
@@ -38,36 +41,45 @@ def extrair_registros(pdf_path: Path) -> list[str]:
     Percorre as páginas do PDF e costura linhas de cada lançamento.
     Retorna uma lista de strings, cada uma representando um lançamento bruto.:contentReference[oaicite:14]{index=14}
     """
+    motor = extracao_texto.motor_da_ferramenta("importador-recebimentos-madre-scp")
+    with extracao_texto.abrir(pdf_path, motor) as doc:
+        return registros_do_documento(doc)
+
+
+def registros_do_documento(doc: extracao_texto.DocumentoTexto) -> list[str]:
+    """Lançamentos brutos do documento já aberto (também usado na comparação entre motores)."""
     registros: list[str] = []
-    with pdfplumber.open(str(pdf_path)) as pdf:  # pdfplumber espera caminho str
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            text = text.replace("\xa0", " ")
-            linhas = text.split("\n")
-
-            buffer = ""
-            for linha in linhas:
-                linha = clean_spaces(linha)
-                if TOTAL_CLIENTE_REGEX.search(linha):
-                    buffer = ""
-                    continue
-
-                # nova data -> flush anterior, se estiver completo
-                if re.match(r"^\d{2}/\d{2}/\d{4}\b", linha) and buffer:
-                    if len(MONEY_REGEX.findall(buffer)) >= 6:
-                        registros.append(buffer.strip())
-                    buffer = linha
-                else:
-                    buffer += (" " if buffer else "") + linha
-
-                # flush automático se já tem 6+ valores monetários
+    total = len(doc)
+    for idx in range(total):
+        text = doc.texto(idx)
+        text = text.replace("\xa0", " ")
+        linhas = text.split("\n")
+
+        buffer = ""
+        for linha in linhas:
+            linha = clean_spaces(linha)
+            if TOTAL_CLIENTE_REGEX.search(linha):
+                buffer = ""
+                continue
+
+            # nova data -> flush anterior, se estiver completo
+            if re.match(r"^\d{2}/\d{2}/\d{4}\b", linha) and buffer:
                 if len(MONEY_REGEX.findall(buffer)) >= 6:
                     registros.append(buffer.strip())
-                    buffer = ""
+                buffer = linha
+            else:
+                buffer += (" " if buffer else "") + linha
 
-            # flush final da página
+            # flush automático se já tem 6+ valores monetários
             if len(MONEY_REGEX.findall(buffer)) >= 6:
                 registros.append(buffer.strip())
+                buffer = ""
+
+        # flush final da página
+        if len(MONEY_REGEX.findall(buffer)) >= 6:
+            registros.append(buffer.strip())
+
+        progresso.publicar("extract", idx + 1, total, registros=len(registros))
     return registros  # :contentReference[oaicite:15]{index=15}
 
 
@@ -312,20 +324,25 @@ def processar_importador_recebimentos_madre_scp(
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    registros = extrair_registros(pdf_path)
+    with etapa("extract") as e:
+        registros = extrair_registros(pdf_path)
+        e.itens = len(registros)
     if not registros:
         raise RuntimeError("Nenhum lançamento encontrado. Verifique se o PDF é o esperado.")
 
-    df = parsear_registros(registros)
-    if df.empty:
-        raise RuntimeError("Não foi possível parsear os lançamentos.")
+    with etapa("classify") as e:
+        df = parsear_registros(registros)
+        if df.empty:
+            raise RuntimeError("Não foi possível parsear os lançamentos.")
 
-    df = expandir_campos_cliente(df)
+        df = expandir_campos_cliente(df)
+        e.itens = len(df)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     excel_path = output_dir / f"Contas_Recebidas_{timestamp}.xlsx"
 
-    excel_path, summary, df_final = salvar_excel(df, excel_path)
+    with etapa("write"):
+        excel_path, summary, df_final = salvar_excel(df, excel_path)
 
     totais = {
         "vl_baixa": float(summary["Vl. baixa (num)"].sum())
@@ -1,61 +1,133 @@
 # api/integra_api.py
 
+import time
+
+_INICIO_IMPORT = time.perf_counter()
+
+from contextlib import closing, contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import asyncio
+import base64
+import hashlib
+import json
+import os
 import tempfile
 import shutil
 
-# no topo de api/integra_api.py
-from typing import List, Dict, Any
-from pydantic import BaseModel
-
-from api.gerador_atas_core import (
-    listar_modelos,
-    obter_campos_modelo,
-    gerar_ata as gerar_ata_core,
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
+from starlette.routing import Match
+
+from api import admissao, aquecimento, jobs, metricas, progresso, tempos, worker_pool
+from api.cache_resultados import cache, sha256_arquivo, sha256_bytes
+from api.config import (
+    API_WARM_IMPORTS,
+    ESCRITA_WORKERS,
+    HOLERITES_PAGINAS_POR_LOTE,
+    PROGRESSO_INTERVALO_S,
+    WORKER_PREAQUECER,
 )
+from api.nomes_arquivos import RegistroNomes
+from api.saida_zip import SaidaZip
+from api.streaming import CanoBytes
+from api.uploads import nome_seguro, salvar_corpo, salvar_upload
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-
-# Importações dos módulos internos (sem circular)
-from api.relatorio_ferias_core import split_pdf_relatorio_ferias
-from api.holerites_core import split_pdf_holerites
-from api.separador_ferias_funcionario_core import processar_ferias_por_funcionario
-
-# imports (no topo de integra_api.py, se ainda não existirem)
-import base64
-from pydantic import BaseModel
-
-from api.comprimir_pdf_core import comprimir_pdf_bytes
-
-from pathlib import Path
-from pydantic import BaseModel
-from fastapi import HTTPException
-
-from api.extrator_zip_rar_core import processar_pasta_zip_rar
-
-# imports no topo do arquivo integra_api.py
-from typing import List, Optional
-from pydantic import BaseModel
-
-from api.excel_abas_pdf_core import exportar_abas_para_pdf
-
-from pydantic import BaseModel
-from api.separador_csv_baixa_automatica_core import processar_baixa_automatica_arquivo
+# Os cores (pandas, PyMuPDF, pdfplumber, PyPDF2, python-docx, openpyxl...) NÃO são
+# importados aqui: cada endpoint despacha "api.<core>:<funcao>" para o worker_pool,
+# que importa o módulo só no processo que executa. Assim a API sobe rápido e só
+# paga o import da ferramenta que for de fato usada (ver api/aquecimento.py).
 
 app = FastAPI(title="Integração Python API")
 
-from typing import Optional
-from api.importador_recebimentos_madre_scp_core import (
-    processar_importador_recebimentos_madre_scp,
-)
-from pydantic import BaseModel
 
-from typing import Optional
-from pydantic import BaseModel
-from api.ajuste_diario_gfbr_core import ajustar_diario_gfbr
+def _copiar_do_cache(artefato: Path, destino: Path) -> Optional[Path]:
+    """
+    Coloca o artefato em cache onde o chamador espera o arquivo gerado.
+    Devolve None se a entrada sumiu entre o obter() e a cópia (despejada
+    pelo LRU ou apagada por outro processo): o chamador trata como miss.
+    """
+    try:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(artefato, destino)
+    except OSError as e:
+        print(f"[cache] Entrada indisponível ({artefato}): {e}")
+        return None
+    return destino
+
+
+# Todo endpoint aceita ?timings=true: a resposta ganha o campo "timings" com as
+# etapas do core (ver api/tempos.py). Respostas binárias usam o header Server-Timing.
+def _com_timings(timings: bool, executar: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    if not timings:
+        return executar(*args)
+    with tempos.coletar() as etapas:
+        resposta = executar(*args)
+    resposta["timings"] = etapas
+    return resposta
+
+
+# Endpoints de PDF aceitam ?progress_id=<id escolhido pelo cliente>: o andamento
+# sai em GET /progress/{id}/events (SSE) e POST /progress/{id}/cancel interrompe.
+@contextmanager
+def _progresso_requisicao(progress_id: Optional[str]) -> Iterator[None]:
+    if not progress_id:
+        yield
+        return
+
+    pasta = progresso.pasta_requisicao(progress_id)
+    if pasta is None:
+        raise HTTPException(status_code=400, detail="progress_id inválido.")
+    progresso.limpar_antigos()
+    # um id reaproveitado não herda o cancelamento nem o status da execução anterior
+    if not progresso.iniciar_requisicao(pasta):
+        raise HTTPException(status_code=409, detail="progress_id já está em uso por outra requisição.")
+
+    canal = progresso.Canal(pasta)
+    try:
+        with progresso.usar_canal(canal):
+            yield
+    except progresso.Cancelado:
+        canal.finalizar(progresso.STATUS_CANCELADO)
+        raise HTTPException(status_code=409, detail="Processamento cancelado.")
+    except HTTPException as e:
+        canal.finalizar(progresso.STATUS_ERRO, str(e.detail))
+        raise
+    except Exception as e:
+        canal.finalizar(progresso.STATUS_ERRO, str(e))
+        raise
+    else:
+        canal.finalizar(progresso.STATUS_CONCLUIDO)
+    finally:
+        # só depois do status final: uma nova execução com o mesmo id não o perde
+        progresso.encerrar_requisicao(pasta)
+
+
+_CAMPOS_CAMINHO = ("input_pdf_path", "pdf_path", "input_xlsx_path", "input_path")
+
+
+def _tamanho_entrada(params: BaseModel) -> int:
+    """Bytes de entrada da requisição, usados como peso no controle de admissão."""
+    base64_pdf = getattr(params, "file_base64", None)
+    if base64_pdf:
+        return len(base64_pdf) * 3 // 4
+
+    caminhos = [getattr(params, campo, None) for campo in _CAMPOS_CAMINHO]
+    caminhos.extend(getattr(params, "arquivos", None) or [])
+    total = 0
+    for caminho in caminhos:
+        if not caminho:
+            continue
+        try:
+            total += os.path.getsize(caminho)
+        except OSError:
+            pass
+    return total
+
 # =========================
 # MODELO DE ENTRADA (FÉRIAS)
 # =========================
@@ -69,9 +141,7 @@ class SeparadorParams(BaseModel):
 # ENDPOINT: RELATÓRIO DE FÉRIAS
 # =========================
 
-@app.post("/api/separador-pdf-relatorio-de-ferias/processar")
-def processar_separador(params: SeparadorParams):
-
+def _executar_separador(params: SeparadorParams) -> Dict[str, Any]:
     input_pdf = Path(params.input_pdf_path)
     if not input_pdf.is_file():
         raise HTTPException(status_code=400, detail="Arquivo PDF de entrada não encontrado.")
@@ -82,52 +152,247 @@ def processar_separador(params: SeparadorParams):
 
     out_dir = Path(params.output_dir) if params.output_dir else input_pdf.parent / "output"
 
+    tool = "separador-pdf-relatorio-de-ferias"
+    chave = cache.chave(tool, sha256_arquivo(input_pdf), {"competencia": competencia})
+    # mesmo nome que o core daria ao ZIP
+    zip_path = out_dir / f"{input_pdf.stem}_empresas_{competencia}.zip"
+    em_cache = cache.obter(chave)
+    if em_cache and not _copiar_do_cache(em_cache["artefato"], zip_path):
+        em_cache = None
+    metricas.registrar_cache(tool, em_cache is not None)
+    if em_cache:
+        return {"ok": True, "zip_path": str(zip_path)}
+
     try:
-        zip_path = split_pdf_relatorio_ferias(input_pdf, out_dir, competencia)
+        with metricas.medir_ferramenta(tool) as m:
+            m.entrada(input_pdf)
+            resultado = worker_pool.executar(
+                "api.relatorio_ferias_core:separar_relatorio_ferias",
+                input_pdf,
+                out_dir,
+                competencia,
+            )
+            zip_path = resultado["zip_path"]
+            m.contar("paginas", resultado["total_paginas"])
+            m.saida(zip_path)
+    except progresso.Cancelado:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao processar PDF: {e}")
 
+    cache.gravar(chave, artefato=Path(zip_path))
     return {"ok": True, "zip_path": str(zip_path)}
 
+@app.post("/api/separador-pdf-relatorio-de-ferias/processar")
+def processar_separador(
+    params: SeparadorParams,
+    timings: bool = False,
+    progress_id: Optional[str] = None,
+):
+    with admissao.admitir("separador-pdf-relatorio-de-ferias", _tamanho_entrada(params)):
+        with _progresso_requisicao(progress_id):
+            return _com_timings(timings, _executar_separador, params)
+
 # =========================
 # ENDPOINT: HOLERITES (UPLOAD)
 # =========================
 
+def _executar_holerites(
+    pdf_path: Path,
+    out_dir: Path,
+    competencia: str,
+    sha256: Optional[str] = None,
+) -> Path:
+    tool = "holerites-por-empresa"
+    chave = cache.chave(tool, sha256 or sha256_arquivo(pdf_path), {"competencia": competencia})
+    em_cache = cache.obter(chave)
+    zip_path = None
+    if em_cache:
+        zip_path = _copiar_do_cache(
+            em_cache["artefato"],
+            out_dir / f"{pdf_path.stem}_empresas_{competencia}.zip",
+        )
+    metricas.registrar_cache(tool, zip_path is not None)
+    if zip_path:
+        return zip_path
+
+    with metricas.medir_ferramenta(tool) as m:
+        m.entrada(pdf_path)
+        resultado = worker_pool.executar(
+            "api.holerites_core:separar_holerites",
+            pdf_path,
+            out_dir,
+            competencia,
+        )
+        zip_path = resultado["zip_path"]
+        m.contar("paginas", resultado["total_paginas"])
+        m.saida(zip_path)
+
+    cache.gravar(chave, artefato=Path(zip_path))
+    return zip_path
+
+def _lotes_de_empresas(company_pages: Dict[str, List[int]], paginas_por_lote: int) -> List[List[tuple]]:
+    """Empresas consecutivas agrupadas até somar ~paginas_por_lote páginas."""
+    lotes: List[List[tuple]] = []
+    paginas = paginas_por_lote
+    for key, pages in company_pages.items():
+        if paginas >= paginas_por_lote:
+            lotes.append([])
+            paginas = 0
+        lotes[-1].append((key, pages))
+        paginas += len(pages)
+    return lotes
+
+def _zip_holerites_pelo_pool(pdf_path: Path, competencia: str, destino) -> int:
+    """
+    Classificação e montagem dos PDFs rodam no worker_pool (lote a lote,
+    reabrindo o arquivo); aqui, no processo da API, só o ZIP é montado e
+    escrito em `destino` à medida que cada lote volta. Com PY_ESCRITA_WORKERS
+    até tantos lotes são montados ao mesmo tempo, e o ZIP sai na mesma ordem.
+    Devolve o nº de páginas do PDF (contado na classificação).
+    """
+    caminho = str(pdf_path)
+    company_pages = worker_pool.executar("api.holerites_core:classificar_arquivo", caminho)
+    total = len(company_pages)
+    lotes = _lotes_de_empresas(company_pages, HOLERITES_PAGINAS_POR_LOTE)
+    pdfs_dos_lotes = worker_pool.mapear(
+        "api.holerites_core:montar_pdfs_do_arquivo",
+        [(caminho, [pages for _, pages in lote]) for lote in lotes],
+        max(1, ESCRITA_WORKERS),
+    )
+    nomes = RegistroNomes()
+    with SaidaZip(destino) as zip_saida, closing(pdfs_dos_lotes):
+        for lote, pdfs in zip(lotes, pdfs_dos_lotes):
+            for (key, _), dados in zip(lote, pdfs):
+                nome = nomes.reservar(f"{key} {competencia}", ".pdf")
+                zip_saida.adicionar(nome, dados)
+                progresso.publicar("write", len(zip_saida.nomes), total, arquivo=nome)
+        with tempos.etapa("zip", itens=len(zip_saida.nomes)):
+            zip_saida.fechar()
+    # cada página está em exatamente uma empresa
+    return sum(len(pages) for pages in company_pages.values())
+
+async def _holerites_em_stream(
+    pdf: UploadFile,
+    competencia: str,
+    progress_id: Optional[str],
+) -> StreamingResponse:
+    """
+    ?streaming=true: o ZIP vai saindo em blocos enquanto os PDFs por empresa
+    ficam prontos. O upload é gravado em disco em blocos (pasta temporária
+    apagada ao fim da geração), e o processamento pesado roda no worker_pool;
+    a thread do streaming só monta o ZIP.
+    Sem header Server-Timing (ele sairia antes do processamento terminar):
+    as etapas ficam na linha "[timings]" do log.
+    """
+    tool = "holerites-por-empresa"
+    tmpdir_path = Path(tempfile.mkdtemp())
+    entregue = False
+    try:
+        pdf_path = tmpdir_path / nome_seguro(pdf.filename, "holerites.pdf")
+        hasher = hashlib.sha256()
+        tamanho = await salvar_upload(pdf, pdf_path, hasher=hasher)
+
+        nome_zip = f"{pdf_path.stem}_empresas_{competencia}.zip"
+        headers = {"Content-Disposition": f'attachment; filename=\"{nome_zip}\"'}
+
+        chave = cache.chave(tool, hasher.hexdigest(), {"competencia": competencia})
+        em_cache = cache.obter(chave)
+        arquivo_cache = None
+        if em_cache:
+            try:
+                arquivo_cache = open(em_cache["artefato"], "rb")
+            except OSError:
+                # entrada removida entre o obter() e a abertura: segue como miss
+                pass
+        metricas.registrar_cache(tool, arquivo_cache is not None)
+        if arquivo_cache is not None:
+            return StreamingResponse(arquivo_cache, media_type="application/zip", headers=headers)
+
+        def gerar(cano: CanoBytes) -> None:
+            try:
+                with admissao.admitir(tool, tamanho), _progresso_requisicao(progress_id):
+                    with metricas.medir_ferramenta(tool) as m:
+                        m.entrada(pdf_path)
+                        m.contar("paginas", _zip_holerites_pelo_pool(pdf_path, competencia, cano))
+                        m.saida(cano.total)
+            finally:
+                # a geração sempre termina (fim, erro ou cliente desconectado)
+                shutil.rmtree(tmpdir_path, ignore_errors=True)
+
+        entregue = True
+        corpo = await CanoBytes().iniciar(gerar)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print("Erro ao processar holerites:", e)
+        raise HTTPException(status_code=500, detail="Erro interno ao processar o PDF.")
+    finally:
+        # até a thread de geração assumir, a pasta é responsabilidade daqui
+        if not entregue:
+            shutil.rmtree(tmpdir_path, ignore_errors=True)
+
+    return StreamingResponse(corpo, media_type="application/zip", headers=headers)
+
 @app.post("/processar-holerites-por-empresa")
 async def processar_holerites_por_empresa(
     pdf: UploadFile = File(...),
     competencia: str = Form(...),
     background_tasks: BackgroundTasks = None,
+    timings: bool = False,
+    progress_id: Optional[str] = None,
+    streaming: bool = False,
 ):
 
     competencia = competencia.strip()
     if not competencia:
         raise HTTPException(status_code=400, detail="Competência obrigatória.")
 
-    try:
-        tmpdir = tempfile.mkdtemp()
-        tmpdir_path = Path(tmpdir)
+    if streaming:
+        return await _holerites_em_stream(pdf, competencia, progress_id)
+
+    tmpdir_path = Path(tempfile.mkdtemp())
 
-        pdf_filename = pdf.filename or "holerites.pdf"
+    try:
+        # grava o upload em blocos: a memória não cresce com o tamanho do PDF
+        pdf_filename = nome_seguro(pdf.filename, "holerites.pdf")
         pdf_path = tmpdir_path / pdf_filename
-        with open(pdf_path, "wb") as f:
-            f.write(await pdf.read())
+        hasher = hashlib.sha256()
+        await salvar_upload(pdf, pdf_path, hasher=hasher)
 
         out_dir = tmpdir_path / "output"
-        zip_path = split_pdf_holerites(pdf_path, out_dir, competencia)
+        with tempos.coletar() as etapas, _progresso_requisicao(progress_id):
+            zip_path = await run_in_threadpool(
+                admissao.executar,
+                "holerites-por-empresa",
+                pdf_path.stat().st_size,
+                _executar_holerites,
+                pdf_path,
+                out_dir,
+                competencia,
+                hasher.hexdigest(),
+            )
 
         zip_file = open(zip_path, "rb")
 
         if background_tasks:
             background_tasks.add_task(shutil.rmtree, tmpdir_path, ignore_errors=True)
 
+        headers = {"Content-Disposition": f'attachment; filename=\"{zip_path.name}\"'}
+        if timings:
+            headers["Server-Timing"] = tempos.server_timing(etapas)
+
         return StreamingResponse(
             zip_file,
             media_type="application/zip",
-            headers={"Content-Disposition": f'attachment; filename=\"{zip_path.name}\"'},
+            headers=headers,
         )
 
+    except HTTPException:
+        shutil.rmtree(tmpdir_path, ignore_errors=True)
+        raise
     except Exception as e:
+        shutil.rmtree(tmpdir_path, ignore_errors=True)
         print("Erro ao processar holerites:", e)
         raise HTTPException(status_code=500, detail="Erro interno ao processar o PDF.")
 
@@ -142,21 +407,64 @@ class FeriasFuncionarioResponse(BaseModel):
   pasta_saida: str
   zip_path: str
   arquivos: list[str]
-
-@app.post("/api/ferias-funcionario/processar", response_model=FeriasFuncionarioResponse)
-def ferias_funcionario_processar(payload: FeriasFuncionarioRequest):
-  """
-  Endpoint chamado pelo Node.js para processar o PDF de férias por funcionário.
-  """
-  result = processar_ferias_por_funcionario(Path(payload.pdf_path))
+  paginas_orfas: list[int] = []
+  timings: Optional[List[Dict[str, Any]]] = None
+
+def _executar_ferias_funcionario(payload: FeriasFuncionarioRequest) -> Dict[str, Any]:
+  with metricas.medir_ferramenta("ferias-funcionario") as m:
+    # o core apaga o PDF de entrada ao final: mede antes
+    m.entrada(payload.pdf_path)
+    result = worker_pool.executar(
+      "api.separador_ferias_funcionario_core:processar_ferias_por_funcionario",
+      Path(payload.pdf_path),
+    )
+    m.contar("paginas", result.get("total_paginas"))
+    m.saida(result.get("zip_path"))
   return {
     "ok": True,
     **result,
   }
 
+@app.post(
+  "/api/ferias-funcionario/processar",
+  response_model=FeriasFuncionarioResponse,
+  response_model_exclude_unset=True,
+)
+def ferias_funcionario_processar(
+  payload: FeriasFuncionarioRequest,
+  timings: bool = False,
+  progress_id: Optional[str] = None,
+):
+  """
+  Endpoint chamado pelo Node.js para processar o PDF de férias por funcionário.
+  """
+  with admissao.admitir("ferias-funcionario", _tamanho_entrada(payload)):
+    with _progresso_requisicao(progress_id):
+      return _com_timings(timings, _executar_ferias_funcionario, payload)
+
 # PARA RODAR:
 # uvicorn api.integra_api:app --host 127.0.0.1 --port 8001
 
+@app.on_event("startup")
+def aquecer_api():
+    aquecimento.verificar_orcamento(
+        (time.perf_counter() - _INICIO_IMPORT) * 1000, "import do integra_api"
+    )
+    if API_WARM_IMPORTS:
+        aquecimento.aquecer(API_WARM_IMPORTS, origem="api")
+    if WORKER_PREAQUECER:
+        worker_pool.preaquecer()
+
+@app.on_event("startup")
+def recuperar_jobs():
+    # jobs que ficaram pendentes/em execução quando a API caiu
+    jobs.store.recuperar_interrompidos()
+
+@app.on_event("shutdown")
+def encerrar_worker_pool():
+    worker_pool.encerrar()
+    metricas.processo_encerrado()
+
 class LucroItem(BaseModel):
     ano: int
     valor: str
@@ -181,30 +489,41 @@ class GerarAtaParams(BaseModel):
 
 @app.get("/api/gerador-atas/modelos")
 def api_gerador_atas_modelos():
+    from api.gerador_atas_core import listar_modelos
+
     modelos = listar_modelos()
     return {"ok": True, "modelos": modelos}
 
 
 @app.get("/api/gerador-atas/modelos/{modelo_id}")
 def api_gerador_atas_campos(modelo_id: str):
+    from api.gerador_atas_core import obter_campos_modelo
+
     campos = obter_campos_modelo(modelo_id)
     return {"ok": True, **campos}
 
 
-@app.post("/api/gerador-atas/gerar")
-def api_gerador_atas_gerar(params: GerarAtaParams):
-    file_name = gerar_ata_core(
-        modelo_id=params.modelo_id,
-        campos=params.campos,
-        lucros=[l.dict() for l in params.lucros],
-        assinaturas_pf=[s.dict() for s in params.assinaturasPF],
-        assinaturas_pj=[s.dict() for s in params.assinaturasPJ],
-    )
+def _executar_gerador_atas(params: GerarAtaParams) -> Dict[str, Any]:
+    from api.gerador_atas_core import gerar_ata as gerar_ata_core
+
+    with metricas.medir_ferramenta("gerador-atas"):
+        file_name = gerar_ata_core(
+            modelo_id=params.modelo_id,
+            campos=params.campos,
+            lucros=[l.dict() for l in params.lucros],
+            assinaturas_pf=[s.dict() for s in params.assinaturasPF],
+            assinaturas_pj=[s.dict() for s in params.assinaturasPJ],
+        )
     return {
         "ok": True,
         "fileName": file_name,
     }
 
+@app.post("/api/gerador-atas/gerar")
+def api_gerador_atas_gerar(params: GerarAtaParams, timings: bool = False):
+    with admissao.admitir("gerador-atas"):
+        return _com_timings(timings, _executar_gerador_atas, params)
+
 # modelo Pydantic
 class ComprimirPdfParams(BaseModel):
   file_name: str
@@ -212,20 +531,60 @@ class ComprimirPdfParams(BaseModel):
   jpeg_quality: int = 50
   dpi_scale: float = 1.0
 
-# endpoint FastAPI
-@app.post("/api/comprimir-pdf/processar")
-def processar_comprimir_pdf(params: ComprimirPdfParams):
+def _executar_comprimir_pdf(params: ComprimirPdfParams) -> Dict[str, Any]:
   pdf_bytes = base64.b64decode(params.file_base64)
 
-  resultado = comprimir_pdf_bytes(
-      pdf_bytes=pdf_bytes,
-      jpeg_quality=params.jpeg_quality,
-      dpi_scale=params.dpi_scale,
+  tool = "comprimir-pdf"
+  chave = cache.chave(
+    tool,
+    sha256_bytes(pdf_bytes),
+    {"jpeg_quality": params.jpeg_quality, "dpi_scale": params.dpi_scale},
   )
+  em_cache = cache.obter(chave)
+  comprimido = None
+  if em_cache:
+    try:
+      comprimido = em_cache["artefato"].read_bytes()
+    except OSError:
+      # entrada removida entre o obter() e a leitura: segue como miss
+      pass
+  metricas.registrar_cache(tool, comprimido is not None)
+  if comprimido is not None:
+    return {**em_cache["resultado"], "compressed_bytes": comprimido}
+
+  with metricas.medir_ferramenta(tool) as m:
+    resultado = worker_pool.executar(
+        "api.comprimir_pdf_core:comprimir_pdf_bytes",
+        pdf_bytes=pdf_bytes,
+        jpeg_quality=params.jpeg_quality,
+        dpi_scale=params.dpi_scale,
+    )
+    m.entrada(resultado["original_size"])
+    m.saida(resultado["compressed_size"])
+    m.contar("paginas", resultado.get("total_paginas"))
+
+  cache.gravar(
+    chave,
+    resultado={k: v for k, v in resultado.items() if k != "compressed_bytes"},
+    artefato=resultado["compressed_bytes"],
+    nome_artefato="comprimido.pdf",
+  )
+  return resultado
+
+# endpoint FastAPI
+@app.post("/api/comprimir-pdf/processar")
+def processar_comprimir_pdf(
+  params: ComprimirPdfParams,
+  timings: bool = False,
+  progress_id: Optional[str] = None,
+):
+  with admissao.admitir("comprimir-pdf", _tamanho_entrada(params)):
+    with _progresso_requisicao(progress_id):
+      resultado = _com_timings(timings, _executar_comprimir_pdf, params)
 
   compressed_base64 = base64.b64encode(resultado["compressed_bytes"]).decode("ascii")
 
-  return {
+  resposta = {
       "ok": True,
       "file_name": params.file_name,
       "original_size": resultado["original_size"],
@@ -233,24 +592,131 @@ def processar_comprimir_pdf(params: ComprimirPdfParams):
       "reduction_percent": resultado["reduction_percent"],
       "compressed_base64": compressed_base64,
   }
+  if timings:
+    resposta["timings"] = resultado["timings"]
+  return resposta
+
+# variante binária: recebe o PDF como multipart (campo "pdf") ou como corpo
+# application/octet-stream e devolve o application/pdf direto, sem base64.
+# As métricas vão nos headers X-Original-Size / X-Compressed-Size / X-Reduction-Percent.
+@app.post("/api/comprimir-pdf/processar-binario")
+async def processar_comprimir_pdf_binario(
+  request: Request,
+  file_name: Optional[str] = None,
+  jpeg_quality: int = 50,
+  dpi_scale: float = 1.0,
+  timings: bool = False,
+  progress_id: Optional[str] = None,
+):
+  tmpdir_path = Path(tempfile.mkdtemp())
+  entrada = tmpdir_path / "entrada.pdf"
+  hasher = hashlib.sha256()
+
+  try:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+      form = await request.form()
+      pdf = form.get("pdf")
+      if pdf is None or isinstance(pdf, str):
+        raise HTTPException(status_code=400, detail='Envie o PDF no campo "pdf".')
+      try:
+        jpeg_quality = int(form.get("jpeg_quality", jpeg_quality))
+        dpi_scale = float(form.get("dpi_scale", dpi_scale))
+      except ValueError:
+        raise HTTPException(status_code=400, detail="jpeg_quality/dpi_scale inválidos.")
+      file_name = file_name or pdf.filename
+      await salvar_upload(pdf, entrada, hasher=hasher)
+    else:
+      await salvar_corpo(request, entrada, hasher=hasher)
+
+    if entrada.stat().st_size == 0:
+      raise HTTPException(status_code=400, detail="PDF vazio.")
+
+    file_name = nome_seguro(file_name, "comprimido.pdf")
+    saida = tmpdir_path / "saida.pdf"
+
+    tool = "comprimir-pdf"
+    chave = cache.chave(
+      tool,
+      hasher.hexdigest(),
+      {"jpeg_quality": jpeg_quality, "dpi_scale": dpi_scale},
+    )
+    em_cache = cache.obter(chave)
+    if em_cache and not _copiar_do_cache(em_cache["artefato"], saida):
+      em_cache = None
+    metricas.registrar_cache(tool, em_cache is not None)
+    etapas: tempos.Etapas = []
+    if em_cache:
+      resultado = em_cache["resultado"]
+    else:
+      with metricas.medir_ferramenta(tool) as m, _progresso_requisicao(progress_id):
+        etapas = m.etapas
+        resultado = await run_in_threadpool(
+          admissao.executar,
+          tool,
+          entrada.stat().st_size,
+          worker_pool.executar,
+          "api.comprimir_pdf_core:comprimir_pdf_arquivo",
+          entrada,
+          saida,
+          jpeg_quality=jpeg_quality,
+          dpi_scale=dpi_scale,
+        )
+        m.entrada(resultado["original_size"])
+        m.saida(resultado["compressed_size"])
+        m.contar("paginas", resultado.get("total_paginas"))
+      cache.gravar(chave, resultado=resultado, artefato=saida, nome_artefato="comprimido.pdf")
+  except HTTPException:
+    shutil.rmtree(tmpdir_path, ignore_errors=True)
+    raise
+  except Exception as e:
+    shutil.rmtree(tmpdir_path, ignore_errors=True)
+    print("Erro ao comprimir PDF:", e)
+    raise HTTPException(status_code=500, detail="Erro interno ao comprimir o PDF.")
+
+  headers = {
+    "X-Original-Size": str(resultado["original_size"]),
+    "X-Compressed-Size": str(resultado["compressed_size"]),
+    "X-Reduction-Percent": f'{resultado["reduction_percent"]:.2f}',
+  }
+  if timings:
+    headers["Server-Timing"] = tempos.server_timing(etapas)
+
+  return FileResponse(
+    saida,
+    media_type="application/pdf",
+    filename=file_name,
+    headers=headers,
+    background=BackgroundTask(shutil.rmtree, tmpdir_path, ignore_errors=True),
+  )
 
 class ExtratorZipRarParams(BaseModel):
     base_dir: str
     max_depth: int = 5
 
-@app.post("/api/extrator-zip-rar/process")
-def api_extrator_zip_rar(params: ExtratorZipRarParams):
+def _executar_extrator_zip_rar(params: ExtratorZipRarParams) -> Dict[str, Any]:
     base_dir = Path(params.base_dir)
 
     if not base_dir.exists() or not base_dir.is_dir():
         raise HTTPException(status_code=400, detail="Diretório base inválido.")
 
-    resultado = processar_pasta_zip_rar(base_dir=base_dir, max_depth=params.max_depth)
+    with metricas.medir_ferramenta("extrator-zip-rar") as m:
+        resultado = worker_pool.executar(
+            "api.extrator_zip_rar_core:processar_pasta_zip_rar",
+            base_dir=base_dir,
+            max_depth=params.max_depth,
+        )
+        m.contar("arquivos", resultado.get("total_new_files"))
 
     return {
         "ok": True,
         "resultado": resultado,
     }
+
+@app.post("/api/extrator-zip-rar/process")
+def api_extrator_zip_rar(params: ExtratorZipRarParams, timings: bool = False):
+    with admissao.admitir("extrator-zip-rar"):
+        return _com_timings(timings, _executar_extrator_zip_rar, params)
     
 class ExcelAbasPdfParams(BaseModel):
     arquivos: List[str]
@@ -267,53 +733,114 @@ class ExcelAbasPdfResultado(BaseModel):
 class ExcelAbasPdfResponse(BaseModel):
     ok: bool
     resultados: List[ExcelAbasPdfResultado]
+    timings: Optional[List[Dict[str, Any]]] = None
+
+def _executar_excel_abas_pdf(params: ExcelAbasPdfParams) -> Dict[str, Any]:
+    # roda na própria thread: quem trabalha é o Excel via COM, não o Python
+    from api.excel_abas_pdf_core import exportar_abas_para_pdf
+
+    with metricas.medir_ferramenta("excel-abas-pdf") as m:
+        resultados = exportar_abas_para_pdf(
+            caminhos_arquivos=params.arquivos,
+            pasta_destino=params.pasta_destino,
+        )
+        m.contar("abas", sum(1 for r in resultados if r.get("sucesso")))
+    return {"ok": True, "resultados": resultados}
 
-@app.post("/api/excel-abas-pdf/processar", response_model=ExcelAbasPdfResponse)
-def processar_excel_abas_pdf(params: ExcelAbasPdfParams):
+@app.post(
+    "/api/excel-abas-pdf/processar",
+    response_model=ExcelAbasPdfResponse,
+    response_model_exclude_unset=True,
+)
+def processar_excel_abas_pdf(params: ExcelAbasPdfParams, timings: bool = False):
     """
     Endpoint que recebe caminhos de arquivos Excel e uma pasta de destino,
     chama o core e devolve os resultados de cada aba gerada.
     """
-    resultados = exportar_abas_para_pdf(
-        caminhos_arquivos=params.arquivos,
-        pasta_destino=params.pasta_destino,
-    )
-    return ExcelAbasPdfResponse(ok=True, resultados=resultados)
+    with admissao.admitir("excel-abas-pdf", _tamanho_entrada(params)):
+        return ExcelAbasPdfResponse(**_com_timings(timings, _executar_excel_abas_pdf, params))
 
 class ParametrosImportadorRecebimentosMadreScp(BaseModel):
     pdf_path: str
     output_dir: Optional[str] = None
 
-@app.post("/api/importador-recebimentos-madre-scp/processar")
-def processar_importador_recebimentos_madre_scp_endpoint(
+def _executar_importador_recebimentos_madre_scp(
     params: ParametrosImportadorRecebimentosMadreScp,
-):
-    resultado = processar_importador_recebimentos_madre_scp(
-        pdf_path=params.pdf_path,
-        output_dir=params.output_dir,
-    )
+) -> Dict[str, Any]:
+    tool = "importador-recebimentos-madre-scp"
+    pdf_path = Path(params.pdf_path)
+    output_dir = Path(params.output_dir) if params.output_dir else pdf_path.parent
+
+    chave = cache.chave(tool, sha256_arquivo(pdf_path), {})
+    em_cache = cache.obter(chave)
+    excel_path = None
+    if em_cache:
+        # mesmo padrão de nome do core, com o horário desta execução
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        excel_path = _copiar_do_cache(
+            em_cache["artefato"], output_dir / f"Contas_Recebidas_{timestamp}.xlsx"
+        )
+    metricas.registrar_cache(tool, excel_path is not None)
+    if excel_path:
+        resultado = {
+            **em_cache["resultado"],
+            "output_excel_path": str(excel_path),
+            "output_excel_name": excel_path.name,
+        }
+        return {"ok": True, "resultado": resultado}
+
+    with metricas.medir_ferramenta(tool) as m:
+        m.entrada(params.pdf_path)
+        resultado = worker_pool.executar(
+            "api.importador_recebimentos_madre_scp_core:processar_importador_recebimentos_madre_scp",
+            pdf_path=params.pdf_path,
+            output_dir=params.output_dir,
+        )
+        m.contar("registros", resultado.get("total_registros"))
+        m.saida(resultado.get("output_excel_path"))
+
+    cache.gravar(chave, resultado=resultado, artefato=Path(resultado["output_excel_path"]))
     return {
         "ok": True,
         "resultado": resultado,
     }
+
+@app.post("/api/importador-recebimentos-madre-scp/processar")
+def processar_importador_recebimentos_madre_scp_endpoint(
+    params: ParametrosImportadorRecebimentosMadreScp,
+    timings: bool = False,
+    progress_id: Optional[str] = None,
+):
+    with admissao.admitir("importador-recebimentos-madre-scp", _tamanho_entrada(params)):
+        with _progresso_requisicao(progress_id):
+            return _com_timings(timings, _executar_importador_recebimentos_madre_scp, params)
     
 class ParametrosAjusteDiarioGfbr(BaseModel):
   input_xlsx_path: str
   aba_origem: Optional[str] = None
   criar_backup: bool = True
 
-@app.post("/api/ajuste-diario-gfbr/processar")
-def processar_ajuste_diario_gfbr(params: ParametrosAjusteDiarioGfbr):
-  resumo = ajustar_diario_gfbr(
-      input_xlsx_path=params.input_xlsx_path,
-      aba_origem=params.aba_origem,
-      criar_backup=params.criar_backup,
-  )
+def _executar_ajuste_diario_gfbr(params: ParametrosAjusteDiarioGfbr) -> Dict[str, Any]:
+  with metricas.medir_ferramenta("ajuste-diario-gfbr") as m:
+    m.entrada(params.input_xlsx_path)
+    resumo = worker_pool.executar(
+        "api.ajuste_diario_gfbr_core:ajustar_diario_gfbr",
+        input_xlsx_path=params.input_xlsx_path,
+        aba_origem=params.aba_origem,
+        criar_backup=params.criar_backup,
+    )
+    m.contar("linhas", resumo.get("total_rows"))
+    m.saida(params.input_xlsx_path)
   return {
       "ok": True,
       "resumo": resumo,
   }
 
+@app.post("/api/ajuste-diario-gfbr/processar")
+def processar_ajuste_diario_gfbr(params: ParametrosAjusteDiarioGfbr, timings: bool = False):
+  with admissao.admitir("ajuste-diario-gfbr", _tamanho_entrada(params)):
+    return _com_timings(timings, _executar_ajuste_diario_gfbr, params)
+
 class ParametrosSeparadorCSVBaixaAutomatica(BaseModel):
   input_path: str
   output_dir: str
@@ -322,17 +849,331 @@ class ParametrosSeparadorCSVBaixaAutomatica(BaseModel):
   max_linhas_por_arquivo: int = 50
   csv_sep: str = ";"
 
-@app.post("/api/separador-csv-baixa-automatica/processar")
-def processar_separador_csv_baixa_automatica(params: ParametrosSeparadorCSVBaixaAutomatica):
-  resultado = processar_baixa_automatica_arquivo(
-    input_path=params.input_path,
-    output_dir=params.output_dir,
-    sheet_name=params.sheet_name,
-    year_source_column=params.year_source_column,
-    max_linhas_por_arquivo=params.max_linhas_por_arquivo,
-    csv_sep=params.csv_sep,
-  )
+def _executar_separador_csv_baixa_automatica(
+  params: ParametrosSeparadorCSVBaixaAutomatica,
+) -> Dict[str, Any]:
+  with metricas.medir_ferramenta("separador-csv-baixa-automatica") as m:
+    m.entrada(params.input_path)
+    resultado = worker_pool.executar(
+      "api.separador_csv_baixa_automatica_core:processar_baixa_automatica_arquivo",
+      input_path=params.input_path,
+      output_dir=params.output_dir,
+      sheet_name=params.sheet_name,
+      year_source_column=params.year_source_column,
+      max_linhas_por_arquivo=params.max_linhas_por_arquivo,
+      csv_sep=params.csv_sep,
+    )
+    m.contar("linhas", sum(resultado.get("resumo_por_ano", {}).values()))
   return {
     "ok": resultado.get("ok", False),
     "resultado": resultado,
-  }
\ No newline at end of file
+  }
+
+@app.post("/api/separador-csv-baixa-automatica/processar")
+def processar_separador_csv_baixa_automatica(
+  params: ParametrosSeparadorCSVBaixaAutomatica,
+  timings: bool = False,
+):
+  with admissao.admitir("separador-csv-baixa-automatica", _tamanho_entrada(params)):
+    return _com_timings(timings, _executar_separador_csv_baixa_automatica, params)
+
+# =========================
+# JOBS ASSÍNCRONOS
+# =========================
+# POST /jobs/{tool}            -> aceita os mesmos parâmetros do endpoint síncrono e devolve o id
+# GET  /jobs/{id}              -> estado (pendente/executando/concluido/erro) e resultado
+# GET  /jobs/{id}/artifact     -> arquivo gerado (ZIP/XLSX/PDF), quando houver
+# GET  /jobs/{id}/events       -> progresso ao vivo (Server-Sent Events)
+# POST /jobs/{id}/cancel       -> interrompe o job (pendente ou em execução)
+
+class HoleritesJobParams(BaseModel):
+    input_pdf_path: str
+    competencia: str
+
+
+def _job_separador(params: SeparadorParams, pasta_job: Path):
+    resultado = _executar_separador(params)
+    return resultado, Path(resultado["zip_path"])
+
+
+def _job_holerites(params: HoleritesJobParams, pasta_job: Path):
+    input_pdf = Path(params.input_pdf_path)
+    if not input_pdf.is_file():
+        raise HTTPException(status_code=400, detail="Arquivo PDF de entrada não encontrado.")
+    competencia = params.competencia.strip()
+    if not competencia:
+        raise HTTPException(status_code=400, detail="Competência obrigatória.")
+
+    zip_path = _executar_holerites(input_pdf, pasta_job / "output", competencia)
+    return {"ok": True, "zip_path": str(zip_path)}, zip_path
+
+
+def _job_ferias_funcionario(params: FeriasFuncionarioRequest, pasta_job: Path):
+    resultado = _executar_ferias_funcionario(params)
+    return resultado, Path(resultado["zip_path"])
+
+
+def _job_comprimir_pdf(params: ComprimirPdfParams, pasta_job: Path):
+    resultado = _executar_comprimir_pdf(params)
+    saida = pasta_job / (Path(params.file_name).name or "comprimido.pdf")
+    saida.write_bytes(resultado.pop("compressed_bytes"))
+    return {"ok": True, "file_name": params.file_name, **resultado}, saida
+
+
+def _job_extrator_zip_rar(params: ExtratorZipRarParams, pasta_job: Path):
+    return _executar_extrator_zip_rar(params), None
+
+
+def _job_excel_abas_pdf(params: ExcelAbasPdfParams, pasta_job: Path):
+    return _executar_excel_abas_pdf(params), None
+
+
+def _job_importador_recebimentos_madre_scp(
+    params: ParametrosImportadorRecebimentosMadreScp, pasta_job: Path
+):
+    resultado = _executar_importador_recebimentos_madre_scp(params)
+    return resultado, Path(resultado["resultado"]["output_excel_path"])
+
+
+def _job_ajuste_diario_gfbr(params: ParametrosAjusteDiarioGfbr, pasta_job: Path):
+    return _executar_ajuste_diario_gfbr(params), Path(params.input_xlsx_path)
+
+
+def _job_separador_csv_baixa_automatica(
+    params: ParametrosSeparadorCSVBaixaAutomatica, pasta_job: Path
+):
+    return _executar_separador_csv_baixa_automatica(params), None
+
+
+# tool -> (modelo de parâmetros, função executora)
+JOB_TOOLS = {
+    "separador-pdf-relatorio-de-ferias": (SeparadorParams, _job_separador),
+    "holerites-por-empresa": (HoleritesJobParams, _job_holerites),
+    "ferias-funcionario": (FeriasFuncionarioRequest, _job_ferias_funcionario),
+    "comprimir-pdf": (ComprimirPdfParams, _job_comprimir_pdf),
+    "extrator-zip-rar": (ExtratorZipRarParams, _job_extrator_zip_rar),
+    "excel-abas-pdf": (ExcelAbasPdfParams, _job_excel_abas_pdf),
+    "importador-recebimentos-madre-scp": (
+        ParametrosImportadorRecebimentosMadreScp,
+        _job_importador_recebimentos_madre_scp,
+    ),
+    "ajuste-diario-gfbr": (ParametrosAjusteDiarioGfbr, _job_ajuste_diario_gfbr),
+    "separador-csv-baixa-automatica": (
+        ParametrosSeparadorCSVBaixaAutomatica,
+        _job_separador_csv_baixa_automatica,
+    ),
+}
+
+
+def _job_publico(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove do retorno o que não interessa ao cliente (params com base64 etc.)."""
+    publico = {k: v for k, v in job.items() if k not in ("params", "artefato", "processo")}
+    publico["tem_artefato"] = bool(job.get("artefato"))
+    return publico
+
+
+def _executar_job(tool: str, executora, params: BaseModel, pasta_job: Path, timings: bool):
+    # o job já esperou a vez na fila de jobs: aguarda a vaga da ferramenta sem 429
+    with admissao.admitir(tool, _tamanho_entrada(params), espera_s=admissao.SEM_PRAZO):
+        if not timings:
+            return executora(params, pasta_job)
+        with tempos.coletar() as etapas:
+            resultado, artefato = executora(params, pasta_job)
+    return {**resultado, "timings": etapas}, artefato
+
+
+@app.post("/jobs/{tool}", status_code=202)
+def criar_job(tool: str, payload: Dict[str, Any], timings: bool = False):
+    if tool not in JOB_TOOLS:
+        raise HTTPException(status_code=404, detail=f"Ferramenta desconhecida: {tool}")
+
+    modelo, executora = JOB_TOOLS[tool]
+    try:
+        params = modelo(**payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+    # os params ficam gravados no job.json; o base64 do PDF não precisa ir junto
+    params_registro = params.dict(exclude={"file_base64"})
+
+    job = jobs.fila.submeter(
+        tool,
+        params_registro,
+        lambda _params, pasta_job: _executar_job(tool, executora, params, pasta_job, timings),
+    )
+    return {"ok": True, "job_id": job["id"], "status": job["status"]}
+
+
+@app.get("/jobs/{job_id}")
+def consultar_job(job_id: str):
+    job = jobs.store.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return {"ok": True, **_job_publico(job)}
+
+
+@app.get("/jobs/{job_id}/artifact")
+def baixar_artefato_job(job_id: str):
+    job = jobs.store.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    if job["status"] != jobs.STATUS_CONCLUIDO:
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído ({job['status']}).")
+
+    artefato = Path(job["artefato"]) if job.get("artefato") else None
+    if artefato is None or not artefato.is_file():
+        raise HTTPException(status_code=404, detail="Job não gerou artefato para download.")
+
+    return FileResponse(artefato, filename=artefato.name)
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancelar_job(job_id: str):
+    job = jobs.fila.cancelar(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return {"ok": True, **_job_publico(job)}
+
+
+@app.get("/jobs/{job_id}/events")
+async def eventos_job(job_id: str, request: Request):
+    if jobs.store.obter(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+
+    def estado_final() -> Optional[Dict[str, Any]]:
+        job = jobs.store.obter(job_id)
+        if job is None or job["status"] not in jobs.STATUS_FINAIS:
+            return None
+        return _job_publico(job)
+
+    return _resposta_sse(request, jobs.store.pasta(job_id), estado_final)
+
+# =========================
+# PROGRESSO (SSE)
+# =========================
+
+def _evento_sse(evento: str, dados: Dict[str, Any]) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False, default=str)}\n\n"
+
+
+def _resposta_sse(
+    request: Request,
+    pasta: Path,
+    estado_final: Callable[[], Optional[Dict[str, Any]]],
+) -> StreamingResponse:
+    """Acompanha o progresso.json da pasta até estado_final() devolver algo."""
+
+    async def eventos():
+        ultimo = None
+        ultimo_envio = time.monotonic()
+        while not await request.is_disconnected():
+            atual = progresso.ler(pasta)
+            if atual and atual != ultimo and "status" not in atual:
+                ultimo = atual
+                ultimo_envio = time.monotonic()
+                yield _evento_sse("progress", atual)
+
+            final = estado_final()
+            if final is not None:
+                yield _evento_sse("status", final)
+                return
+
+            if time.monotonic() - ultimo_envio > 15:
+                # comentário SSE: mantém a conexão viva atrás de proxies
+                ultimo_envio = time.monotonic()
+                yield ": ping\n\n"
+            await asyncio.sleep(PROGRESSO_INTERVALO_S)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _pasta_progresso(progress_id: str) -> Path:
+    pasta = progresso.pasta_requisicao(progress_id)
+    if pasta is None:
+        raise HTTPException(status_code=400, detail="progress_id inválido.")
+    return pasta
+
+
+@app.get("/progress/{progress_id}/events")
+async def eventos_progresso(progress_id: str, request: Request):
+    pasta = _pasta_progresso(progress_id)
+
+    def estado_final() -> Optional[Dict[str, Any]]:
+        atual = progresso.ler(pasta)
+        return atual if atual and "status" in atual else None
+
+    return _resposta_sse(request, pasta, estado_final)
+
+
+@app.post("/progress/{progress_id}/cancel", status_code=202)
+def cancelar_progresso(progress_id: str):
+    progresso.pedir_cancelamento(_pasta_progresso(progress_id))
+    return {"ok": True, "progress_id": progress_id}
+
+# =========================
+# MÉTRICAS (PROMETHEUS)
+# =========================
+
+def _rota_de(request: Request) -> str:
+    """Template da rota (ex.: /jobs/{job_id}) para não explodir a cardinalidade."""
+    for rota in app.router.routes:
+        match, _ = rota.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(rota, "path", "desconhecida")
+    return "desconhecida"
+
+
+@app.middleware("http")
+async def medir_requisicoes(request: Request, call_next):
+    rota = _rota_de(request)
+    if rota == "/metrics":
+        return await call_next(request)
+
+    metodo = request.method
+    bytes_entrada = int(request.headers.get("content-length") or 0)
+    em_andamento = metricas.HTTP_EM_ANDAMENTO.labels(rota)
+    inicio = time.perf_counter()
+    em_andamento.inc()
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        em_andamento.dec()
+        metricas.registrar_requisicao(
+            rota, metodo, 500, time.perf_counter() - inicio, bytes_entrada, 0
+        )
+        raise
+
+    # a latência e os bytes de saída só fecham quando o corpo termina de ser
+    # enviado (ZIPs e PDFs saem em streaming)
+    corpo = response.body_iterator
+
+    async def corpo_medido():
+        enviados = 0
+        try:
+            async for bloco in corpo:
+                enviados += len(bloco)
+                yield bloco
+        finally:
+            em_andamento.dec()
+            metricas.registrar_requisicao(
+                rota,
+                metodo,
+                response.status_code,
+                time.perf_counter() - inicio,
+                bytes_entrada,
+                enviados,
+            )
+
+    response.body_iterator = corpo_medido()
+    return response
+
+
+@app.get("/metrics")
+def exportar_metricas():
+    conteudo, content_type = metricas.exportar()
+    return Response(content=conteudo, media_type=content_type)
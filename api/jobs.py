@@ -0,0 +1,285 @@
+# api/jobs.py
+"""
+Fila de jobs assíncronos para as ferramentas pesadas da API.
+
+Cada job vive numa pasta própria dentro de JOBS_DIR:
+
+    <JOBS_DIR>/<job_id>/job.json     -> estado, parâmetros, resultado ou erro
+    <JOBS_DIR>/<job_id>/progresso.json -> andamento publicado pelo core (api/progresso.py)
+    <JOBS_DIR>/<job_id>/...          -> artefatos gerados (ZIP, XLSX, PDF)
+
+Como o estado fica em disco, qualquer processo do uvicorn consegue
+responder ao GET /jobs/{id}, mesmo que o job tenha sido aceito por outro.
+
+O job.json guarda o processo que aceitou o job (host e pid). Se a API cai
+ou é reiniciada com jobs pendentes ou em execução, eles ficariam nesse
+estado para sempre; na subida, recuperar_interrompidos() marca como erro
+os jobs cujo processo não existe mais.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from api import progresso
+from api.config import JOBS_DIR, JOBS_MAX_CONCORRENTES, JOBS_RETENCAO_HORAS
+
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+STATUS_CANCELADO = "cancelado"
+
+STATUS_FINAIS = {STATUS_CONCLUIDO, STATUS_ERRO, STATUS_CANCELADO}
+
+# Função que executa o job: recebe os parâmetros e a pasta do job e devolve
+# (resultado serializável em JSON, caminho do artefato ou None).
+ExecutorJob = Callable[[Dict[str, Any], Path], Tuple[Dict[str, Any], Optional[Path]]]
+
+
+ERRO_INTERROMPIDO = "Interrompido por reinício da API."
+
+_HOST = socket.gethostname()
+
+
+def _agora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _processo_vivo(pid: int) -> bool:
+    if os.name == "nt":
+        # no Windows os.kill(pid, 0) encerraria o processo
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        codigo = ctypes.c_ulong()
+        try:
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo))
+        finally:
+            kernel32.CloseHandle(handle)
+        return codigo.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # existe, mas é de outro usuário
+    return True
+
+
+class JobStore:
+    """Persistência simples dos jobs em arquivos JSON."""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self._lock = threading.Lock()
+
+    def pasta(self, job_id: str) -> Path:
+        return self.base_dir / job_id
+
+    def _arquivo(self, job_id: str) -> Path:
+        return self.pasta(job_id) / "job.json"
+
+    def _gravar(self, job: Dict[str, Any]) -> None:
+        destino = self._arquivo(job["id"])
+        tmp = destino.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, default=str)
+        os.replace(tmp, destino)
+
+    def criar(self, tool: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        self.pasta(job_id).mkdir(parents=True, exist_ok=True)
+        job = {
+            "id": job_id,
+            "tool": tool,
+            "status": STATUS_PENDENTE,
+            "params": params,
+            "criado_em": _agora(),
+            "iniciado_em": None,
+            "finalizado_em": None,
+            "resultado": None,
+            "erro": None,
+            "artefato": None,
+            # o job roda na fila deste processo (ver recuperar_interrompidos)
+            "processo": {"host": _HOST, "pid": os.getpid()},
+        }
+        with self._lock:
+            self._gravar(job)
+        return job
+
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # job_id vem da URL: aceita apenas o formato gerado por uuid4().hex
+        if not job_id or not job_id.isalnum():
+            return None
+        try:
+            with open(self._arquivo(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def atualizar(self, job_id: str, **campos: Any) -> Dict[str, Any]:
+        with self._lock:
+            job = self.obter(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            job.update(campos)
+            self._gravar(job)
+            return job
+
+    def atualizar_se(self, job_id: str, status_atual: str, **campos: Any) -> bool:
+        """Atualiza só se o job ainda estiver em `status_atual` (troca atômica de estado)."""
+        with self._lock:
+            job = self.obter(job_id)
+            if job is None or job["status"] != status_atual:
+                return False
+            job.update(campos)
+            self._gravar(job)
+            return True
+
+    def recuperar_interrompidos(self) -> int:
+        """
+        Marca como erro os jobs pendentes/em execução cujo processo morreu
+        (chamar na subida). Jobs de outra máquina que compartilhe JOBS_DIR
+        ficam como estão: não há como saber se o processo dela está vivo.
+        """
+        if not self.base_dir.is_dir():
+            return 0
+        recuperados = 0
+        for pasta in self.base_dir.iterdir():
+            job = self.obter(pasta.name)
+            if job is None or job.get("status") in STATUS_FINAIS:
+                continue
+            dono = job.get("processo") or {}
+            if dono.get("host", _HOST) != _HOST:
+                continue
+            pid = dono.get("pid")
+            # o próprio pid só aparece aqui se foi reaproveitado de um processo morto
+            if pid and pid != os.getpid() and _processo_vivo(pid):
+                continue
+            if self.atualizar_se(
+                job["id"],
+                job["status"],
+                status=STATUS_ERRO,
+                erro=ERRO_INTERROMPIDO,
+                finalizado_em=_agora(),
+            ):
+                recuperados += 1
+        if recuperados:
+            print(f"[jobs] {recuperados} job(s) interrompido(s) marcado(s) como erro.")
+        return recuperados
+
+    def limpar_expirados(self, horas: float) -> int:
+        """Remove jobs finalizados há mais de `horas` horas."""
+        if horas <= 0 or not self.base_dir.is_dir():
+            return 0
+        limite = time.time() - horas * 3600
+        removidos = 0
+        for pasta in self.base_dir.iterdir():
+            arq = pasta / "job.json"
+            try:
+                if not arq.is_file() or arq.stat().st_mtime > limite:
+                    continue
+                job = self.obter(pasta.name)
+                if job and job.get("status") not in STATUS_FINAIS:
+                    continue
+            except OSError:
+                continue
+            shutil.rmtree(pasta, ignore_errors=True)
+            removidos += 1
+        return removidos
+
+
+class FilaJobs:
+    """Executa jobs em segundo plano, limitado a `max_concorrentes` por vez."""
+
+    def __init__(self, store: JobStore, max_concorrentes: int = 2):
+        self.store = store
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concorrentes),
+            thread_name_prefix="job",
+        )
+
+    def submeter(self, tool: str, params: Dict[str, Any], executar: ExecutorJob) -> Dict[str, Any]:
+        self.store.limpar_expirados(JOBS_RETENCAO_HORAS)
+        job = self.store.criar(tool, params)
+        self._executor.submit(self._rodar, job["id"], params, executar)
+        return job
+
+    def cancelar(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Pede o cancelamento. Job pendente é cancelado na hora; em execução,
+        o core para na próxima publicação de progresso.
+        """
+        job = self.store.obter(job_id)
+        if job is None or job["status"] in STATUS_FINAIS:
+            return job
+        progresso.pedir_cancelamento(self.store.pasta(job_id))
+        self.store.atualizar_se(
+            job_id,
+            STATUS_PENDENTE,
+            status=STATUS_CANCELADO,
+            erro="Cancelado antes de iniciar.",
+            finalizado_em=_agora(),
+        )
+        return self.store.obter(job_id)
+
+    def _rodar(self, job_id: str, params: Dict[str, Any], executar: ExecutorJob) -> None:
+        if not self.store.atualizar_se(
+            job_id, STATUS_PENDENTE, status=STATUS_EXECUTANDO, iniciado_em=_agora()
+        ):
+            return  # cancelado enquanto aguardava na fila
+
+        pasta = self.store.pasta(job_id)
+        try:
+            with progresso.usar_canal(progresso.Canal(pasta)):
+                resultado, artefato = executar(params, pasta)
+        except progresso.Cancelado as e:
+            print(f"[jobs] Job {job_id} cancelado.")
+            self.store.atualizar(
+                job_id,
+                status=STATUS_CANCELADO,
+                erro=str(e),
+                finalizado_em=_agora(),
+            )
+            return
+        except Exception as e:  # noqa: BLE001
+            # HTTPException carrega a mensagem em .detail
+            erro = getattr(e, "detail", None) or str(e) or e.__class__.__name__
+            print(f"[jobs] Erro no job {job_id}: {erro}")
+            traceback.print_exc()
+            self.store.atualizar(
+                job_id,
+                status=STATUS_ERRO,
+                erro=str(erro),
+                finalizado_em=_agora(),
+            )
+            return
+
+        self.store.atualizar(
+            job_id,
+            status=STATUS_CONCLUIDO,
+            resultado=resultado,
+            artefato=str(artefato) if artefato else None,
+            finalizado_em=_agora(),
+        )
+
+    def encerrar(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+store = JobStore(JOBS_DIR)
+fila = FilaJobs(store, JOBS_MAX_CONCORRENTES)
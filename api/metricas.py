@@ -0,0 +1,238 @@
+# api/metricas.py
+"""
+Métricas no formato Prometheus, expostas em GET /metrics.
+
+Por rota HTTP:
+  integra_http_request_duration_seconds   histograma de latência (até o fim do corpo)
+  integra_http_requests_in_flight         requisições em andamento
+  integra_http_errors_total               respostas >= 400 (e exceções) por status
+  integra_http_request_bytes_total        bytes recebidos
+  integra_http_response_bytes_total       bytes enviados
+
+Por ferramenta (core):
+  integra_tool_duration_seconds           duração do processamento
+  integra_tool_input_bytes_total          bytes do arquivo de entrada
+  integra_tool_output_bytes_total         bytes do artefato gerado
+  integra_tool_items_total                itens processados (paginas, linhas, arquivos...)
+  integra_tool_items_per_second           vazão por execução (paginas/s, linhas/s, arquivos/s)
+  integra_cache_lookups_total             acertos/falhas do cache de resultados
+
+Controle de admissão (api/admissao.py):
+  integra_admission_in_use                unidades de peso ocupadas por ferramenta
+  integra_admission_queue                 requisições aguardando vaga
+  integra_admission_rejected_total        respostas 429 (fila_cheia/tempo_esgotado)
+
+Cada execução de ferramenta também registra no log as etapas do core
+("[timings] {...}", ver api/tempos.py).
+
+Vários processos do uvicorn: defina PROMETHEUS_MULTIPROC_DIR (pasta vazia,
+limpa a cada subida) antes de iniciar a API. Cada processo grava seus valores
+lá e o /metrics agrega todos, então os contadores ficam corretos qualquer que
+seja o processo que responder ao scrape.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from api import tempos
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import REGISTRY, multiprocess
+
+MULTIPROCESSO = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+_BUCKETS_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+_BUCKETS_VAZAO = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+HTTP_LATENCIA = Histogram(
+    "integra_http_request_duration_seconds",
+    "Latência das requisições HTTP, até o envio do último byte.",
+    ["rota", "metodo"],
+    buckets=_BUCKETS_LATENCIA,
+)
+HTTP_EM_ANDAMENTO = Gauge(
+    "integra_http_requests_in_flight",
+    "Requisições HTTP em andamento.",
+    ["rota"],
+    multiprocess_mode="livesum",
+)
+HTTP_ERROS = Counter(
+    "integra_http_errors_total",
+    "Respostas HTTP com status >= 400 (exceções contam como 500).",
+    ["rota", "status"],
+)
+HTTP_BYTES_ENTRADA = Counter(
+    "integra_http_request_bytes_total",
+    "Bytes recebidos no corpo das requisições.",
+    ["rota"],
+)
+HTTP_BYTES_SAIDA = Counter(
+    "integra_http_response_bytes_total",
+    "Bytes enviados no corpo das respostas.",
+    ["rota"],
+)
+
+TOOL_DURACAO = Histogram(
+    "integra_tool_duration_seconds",
+    "Duração do processamento de cada ferramenta.",
+    ["tool"],
+    buckets=_BUCKETS_LATENCIA,
+)
+TOOL_BYTES_ENTRADA = Counter(
+    "integra_tool_input_bytes_total",
+    "Bytes dos arquivos de entrada processados.",
+    ["tool"],
+)
+TOOL_BYTES_SAIDA = Counter(
+    "integra_tool_output_bytes_total",
+    "Bytes dos artefatos gerados.",
+    ["tool"],
+)
+TOOL_ITENS = Counter(
+    "integra_tool_items_total",
+    "Itens processados por ferramenta (paginas, linhas, arquivos...).",
+    ["tool", "unidade"],
+)
+TOOL_VAZAO = Histogram(
+    "integra_tool_items_per_second",
+    "Vazão de cada execução, em itens por segundo.",
+    ["tool", "unidade"],
+    buckets=_BUCKETS_VAZAO,
+)
+
+CACHE_CONSULTAS = Counter(
+    "integra_cache_lookups_total",
+    "Consultas ao cache de resultados (acerto/falha) por ferramenta.",
+    ["tool", "resultado"],
+)
+
+
+ADMISSAO_EM_USO = Gauge(
+    "integra_admission_in_use",
+    "Unidades de peso em uso por ferramenta.",
+    ["tool"],
+    multiprocess_mode="livesum",
+)
+ADMISSAO_FILA = Gauge(
+    "integra_admission_queue",
+    "Requisições aguardando vaga na ferramenta.",
+    ["tool"],
+    multiprocess_mode="livesum",
+)
+ADMISSAO_RECUSADAS = Counter(
+    "integra_admission_rejected_total",
+    "Requisições recusadas com 429 pelo controle de admissão.",
+    ["tool", "motivo"],
+)
+
+
+def exportar() -> tuple[bytes, str]:
+    """Conteúdo do /metrics (agregando os processos, se multiprocesso)."""
+    if MULTIPROCESSO:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def processo_encerrado() -> None:
+    """Descarta os gauges "live" deste processo (chamar no shutdown)."""
+    if MULTIPROCESSO:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def registrar_requisicao(
+    rota: str,
+    metodo: str,
+    status: int,
+    segundos: float,
+    bytes_entrada: int,
+    bytes_saida: int,
+) -> None:
+    HTTP_LATENCIA.labels(rota, metodo).observe(segundos)
+    if bytes_entrada:
+        HTTP_BYTES_ENTRADA.labels(rota).inc(bytes_entrada)
+    if bytes_saida:
+        HTTP_BYTES_SAIDA.labels(rota).inc(bytes_saida)
+    if status >= 400:
+        HTTP_ERROS.labels(rota, str(status)).inc()
+
+
+def registrar_cache(tool: str, acerto: bool) -> None:
+    CACHE_CONSULTAS.labels(tool, "acerto" if acerto else "falha").inc()
+
+
+class MedicaoFerramenta:
+    """Acumula o que uma execução processou; registrado ao sair de medir_ferramenta."""
+
+    def __init__(self) -> None:
+        self.itens: Dict[str, int] = {}
+        self.bytes_entrada = 0
+        self.bytes_saida = 0
+        self.etapas: tempos.Etapas = []
+
+    def contar(self, unidade: str, quantidade: Optional[int]) -> None:
+        if quantidade:
+            self.itens[unidade] = self.itens.get(unidade, 0) + int(quantidade)
+
+    def entrada(self, caminho_ou_bytes) -> None:
+        self.bytes_entrada += _tamanho(caminho_ou_bytes)
+
+    def saida(self, caminho_ou_bytes) -> None:
+        self.bytes_saida += _tamanho(caminho_ou_bytes)
+
+
+def _tamanho(caminho_ou_bytes) -> int:
+    if caminho_ou_bytes is None:
+        return 0
+    if isinstance(caminho_ou_bytes, (bytes, bytearray)):
+        return len(caminho_ou_bytes)
+    if isinstance(caminho_ou_bytes, int):
+        return caminho_ou_bytes
+    try:
+        return os.path.getsize(caminho_ou_bytes)
+    except OSError:
+        return 0
+
+
+@contextmanager
+def medir_ferramenta(tool: str) -> Iterator[MedicaoFerramenta]:
+    """
+    Mede uma execução de ferramenta:
+
+        with metricas.medir_ferramenta("holerites-por-empresa") as m:
+            ...
+            m.contar("paginas", n)
+            m.entrada(pdf_path)
+
+    Só execuções bem-sucedidas entram na duração/vazão (erros já contam no HTTP).
+    """
+    medicao = MedicaoFerramenta()
+    inicio = time.perf_counter()
+    with tempos.coletar() as etapas:
+        medicao.etapas = etapas
+        yield medicao
+    segundos = time.perf_counter() - inicio
+
+    tempos.registrar_log(tool, segundos * 1000, etapas)
+
+    TOOL_DURACAO.labels(tool).observe(segundos)
+    if medicao.bytes_entrada:
+        TOOL_BYTES_ENTRADA.labels(tool).inc(medicao.bytes_entrada)
+    if medicao.bytes_saida:
+        TOOL_BYTES_SAIDA.labels(tool).inc(medicao.bytes_saida)
+    for unidade, quantidade in medicao.itens.items():
+        TOOL_ITENS.labels(tool, unidade).inc(quantidade)
+        if segundos > 0:
+            TOOL_VAZAO.labels(tool, unidade).observe(quantidade / segundos)
@@ -0,0 +1,87 @@
+# api/nomes_arquivos.py
+"""
+Reserva de nomes de arquivo em memória, durante uma execução.
+
+Os separadores e o extrator de ZIP/RAR não podem sobrescrever um arquivo
+de mesmo nome; o padrão antigo era testar `Path.exists()` com "base",
+"base 2", "base 3"... até achar um livre. Com muitos homônimos isso vira
+O(n²) chamadas de stat, e no compartilhamento de rede cada uma custa caro.
+
+Aqui a pasta é listada uma vez só (ou nenhuma, quando os arquivos vão só
+para dentro de um ZIP) e os nomes são reservados num dicionário; um
+contador por nome base continua de onde parou:
+
+    nomes = RegistroNomes.da_pasta(pasta)            # uma listagem
+    nome = nomes.reservar("FERIAS - JOAO", ".pdf")   # "FERIAS - JOAO 2.pdf"
+
+Maiúsculas/minúsculas seguem o sistema de arquivos, como o exists()
+antigo: no Windows "A.pdf" e "a.pdf" são o mesmo arquivo, no Linux não
+(os.path.normcase). O parâmetro `ignorar_caixa` força um dos dois.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# Sufixo dos homônimos: "base 2.pdf", "base 3.pdf", ...
+FORMATO_PADRAO = "{base} {n}{ext}"
+
+# O sistema de arquivos local trata "A.pdf" e "a.pdf" como o mesmo nome?
+CAIXA_IGNORADA = os.path.normcase("A") == os.path.normcase("a")
+
+
+class RegistroNomes:
+    def __init__(self, existentes: Iterable[str] = (), ignorar_caixa: Optional[bool] = None) -> None:
+        if ignorar_caixa is None:
+            ignorar_caixa = CAIXA_IGNORADA
+        self._chave = str.casefold if ignorar_caixa else str
+        # nome (normalizado por _chave) -> tamanho em bytes, quando conhecido
+        self._ocupados: Dict[str, Optional[int]] = {}
+        # próximo n a tentar para cada (base, ext)
+        self._proximo: Dict[tuple[str, str], int] = {}
+        for nome in existentes:
+            self.ocupar(nome)
+
+    @classmethod
+    def da_pasta(cls, pasta: Path, ignorar_caixa: Optional[bool] = None) -> "RegistroNomes":
+        """Registro semeado com os arquivos que já estão na pasta (uma listagem só)."""
+        registro = cls(ignorar_caixa=ignorar_caixa)
+        try:
+            with os.scandir(pasta) as entradas:
+                for entrada in entradas:
+                    if entrada.is_file():
+                        registro.ocupar(entrada.name, entrada.stat().st_size)
+        except FileNotFoundError:
+            pass
+        return registro
+
+    def __contains__(self, nome: str) -> bool:
+        return self._chave(nome) in self._ocupados
+
+    def __len__(self) -> int:
+        return len(self._ocupados)
+
+    def ocupar(self, nome: str, tamanho: Optional[int] = None) -> None:
+        self._ocupados[self._chave(nome)] = tamanho
+
+    def tamanho(self, nome: str) -> Optional[int]:
+        """Tamanho registrado do arquivo (None se livre ou desconhecido)."""
+        return self._ocupados.get(self._chave(nome))
+
+    def reservar(self, base: str, ext: str = "") -> str:
+        """
+        Primeiro nome livre entre base+ext e "base n"+ext com n = 2, 3, ...;
+        já fica reservado. O contador guarda onde a busca parou, então cada
+        reserva custa O(1) mesmo com milhares de homônimos.
+        """
+        chave = (self._chave(base), self._chave(ext))
+        n = self._proximo.get(chave, 1)
+        while True:
+            nome = f"{base}{ext}" if n == 1 else FORMATO_PADRAO.format(base=base, n=n, ext=ext)
+            n += 1
+            if nome not in self:
+                break
+        self._proximo[chave] = n
+        self.ocupar(nome)
+        return nome
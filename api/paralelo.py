@@ -0,0 +1,90 @@
+# api/paralelo.py
+"""
+Paralelismo dentro de um core: divide um laço por páginas (ou por grupo de
+páginas, como os PDFs por empresa) em tarefas e roda cada uma num processo
+à parte.
+
+É diferente do worker_pool: lá cada requisição vai inteira para um processo;
+aqui uma única requisição grande é repartida. O pool é criado só para a
+chamada (spawn, como o worker_pool) e encerrado ao final, então cada
+processo abre o arquivo por conta própria: os lotes recebem caminho e
+intervalo de páginas, nunca o documento já aberto.
+
+    for inicio, fim, resultado in mapear_lotes(fn, total, lote, workers, caminho):
+        ...
+    for pdf_bytes in mapear(fn, [(caminho, paginas) for paginas in grupos], workers):
+        ...
+
+Os resultados saem na ordem das tarefas, qualquer que seja a ordem em que
+terminam, então a junção fica igual à do laço serial.
+"""
+from __future__ import annotations
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+
+def lotes(total: int, tamanho: int) -> List[Tuple[int, int]]:
+    """Intervalos [inicio, fim) cobrindo range(total) em pedaços de `tamanho`."""
+    tamanho = max(1, tamanho)
+    return [(i, min(i + tamanho, total)) for i in range(0, total, tamanho)]
+
+
+def vale_paralelizar(total: int, tamanho: int, workers: int) -> bool:
+    """Só compensa com 2+ processos e 2+ lotes (subir um processo custa o import do core)."""
+    return workers > 1 and total > max(1, tamanho)
+
+
+def mapear(
+    fn: Callable[..., Any],
+    tarefas: Sequence[tuple],
+    workers: int,
+    em_voo: Optional[int] = None,
+) -> Iterator[Any]:
+    """
+    Chama fn(*tarefa) para cada tarefa em processos separados e devolve os
+    resultados na ordem das tarefas. fn precisa ser uma função de nível de
+    módulo, e argumentos/resultado precisam ser serializáveis.
+
+    No máximo `em_voo` tarefas (padrão: 2 por processo) ficam submetidas ou
+    com o resultado esperando a vez: com centenas de tarefas que devolvem
+    PDFs inteiros, a memória continua limitada. Se quem consome parar no
+    meio (ex.: progresso.Cancelado), as tarefas que ainda não começaram são
+    descartadas.
+    """
+    workers = max(1, min(workers, len(tarefas)))
+    em_voo = max(1, em_voo or 2 * workers)
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        restantes = iter(tarefas)
+        pendentes = deque(pool.submit(fn, *tarefa) for tarefa in islice(restantes, em_voo))
+        while pendentes:
+            resultado = pendentes.popleft().result()
+            for tarefa in islice(restantes, 1):
+                pendentes.append(pool.submit(fn, *tarefa))
+            yield resultado
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def mapear_lotes(
+    fn: Callable[..., Any],
+    total: int,
+    tamanho: int,
+    workers: int,
+    *args: Any,
+) -> Iterator[Tuple[int, int, Any]]:
+    """
+    Chama fn(*args, inicio, fim) para cada lote de páginas e devolve
+    (inicio, fim, resultado) na ordem dos lotes (ver mapear).
+    """
+    intervalos = lotes(total, tamanho)
+    resultados = mapear(fn, [(*args, inicio, fim) for inicio, fim in intervalos], workers)
+    for (inicio, fim), resultado in zip(intervalos, resultados):
+        yield inicio, fim, resultado
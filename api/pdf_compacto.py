@@ -0,0 +1,51 @@
+# api/pdf_compacto.py
+"""
+Modo compacto de gravação dos PDFs gerados pelos separadores.
+
+Cada PDF por empresa/funcionário leva de novo as fontes, logos e XObjects
+usados em todas as páginas, às vezes duplicados dentro do próprio arquivo.
+Com PY_PDF_COMPACTO=1 a saída passa pelo PyMuPDF com:
+
+  garbage=4      remove objetos não usados e funde objetos idênticos
+  deflate=True   comprime os content streams que vieram sem compressão
+  use_objstms=1  agrupa os objetos em object streams (xref menor)
+
+O PyPDF2 3.0.1 usado no projeto não tem deduplicação de objetos
+(compress_identical_objects veio depois), então os PDFs montados com
+PdfWriter são reabertos no PyMuPDF para compactar; o holerites no motor
+pymupdf, que já monta com o PyMuPDF, grava compacto direto.
+"""
+from __future__ import annotations
+
+import io
+from typing import Any, Dict, Optional
+
+from api.config import PDF_COMPACTO
+
+OPCOES_COMPACTAS: Dict[str, Any] = {"garbage": 4, "deflate": True, "use_objstms": 1}
+OPCOES_PADRAO: Dict[str, Any] = {"garbage": 1}
+
+
+def ativo(compacto: Optional[bool] = None) -> bool:
+    return PDF_COMPACTO if compacto is None else compacto
+
+
+def opcoes_salvar(compacto: Optional[bool] = None) -> Dict[str, Any]:
+    """Opções de Document.save/tobytes do PyMuPDF para o modo configurado."""
+    return OPCOES_COMPACTAS if ativo(compacto) else OPCOES_PADRAO
+
+
+def compactar(dados: bytes) -> bytes:
+    """Regrava um PDF já serializado (ex.: por um PdfWriter) no modo compacto."""
+    import fitz  # PyMuPDF; import local: só carrega quando o modo compacto está ligado
+
+    with fitz.open(stream=dados, filetype="pdf") as doc:
+        return doc.tobytes(**OPCOES_COMPACTAS)
+
+
+def bytes_do_writer(writer, compacto: Optional[bool] = None) -> bytes:
+    """Serializa um PdfWriter (PyPDF2), compactando se o modo estiver ligado."""
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    dados = buffer.getvalue()
+    return compactar(dados) if ativo(compacto) else dados
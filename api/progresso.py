@@ -0,0 +1,227 @@
+# api/progresso.py
+"""
+Progresso ao vivo dos cores e cancelamento.
+
+Os laços página a página dos cores publicam o andamento:
+
+    progresso.publicar("extract", idx + 1, total, empresa=key)
+
+Sem canal ativo (chamada sem job nem progress_id) a publicação não faz nada.
+Com canal, o estado vai para <pasta>/progresso.json (no máximo a cada
+PROGRESSO_INTERVALO_S, e sempre na última página). É um arquivo porque o
+core roda num processo do worker_pool e o SSE pode ser servido por qualquer
+processo do uvicorn, igual ao job.json.
+
+Cancelar = criar <pasta>/cancelar. O core percebe na próxima publicação e
+levanta Cancelado, interrompendo o processamento no meio do laço.
+
+O progress_id é escolhido pelo cliente e pode ser reaproveitado: cada
+requisição marca a pasta com <pasta>/em_andamento enquanto roda, e ao
+começar apaga o cancelamento e o estado final da execução anterior. Cada
+publicação renova a marca; uma marca sem renovação há mais de uma hora é
+de uma execução que morreu, e só então a pasta pode ser reaproveitada ou
+limpa.
+
+Eventos (GET /jobs/{id}/events ou GET /progress/{id}/events, text/event-stream):
+    event: progress  {"etapa", "feitos", "total", "percentual", "eta_s", ...}
+    event: status    estado final (concluido / erro / cancelado)
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from api.config import PROGRESSO_DIR, PROGRESSO_INTERVALO_S
+
+ARQUIVO = "progresso.json"
+FLAG_CANCELAR = "cancelar"
+FLAG_EM_ANDAMENTO = "em_andamento"
+
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+STATUS_CANCELADO = "cancelado"
+
+
+class Cancelado(Exception):
+    """O cliente pediu o cancelamento do processamento."""
+
+    def __init__(self, mensagem: str = "Processamento cancelado.") -> None:
+        super().__init__(mensagem)
+
+
+class Canal:
+    """Destino do progresso de uma execução (picklable: vai junto para o worker)."""
+
+    def __init__(self, pasta: Path | str) -> None:
+        self.pasta = Path(pasta)
+        self._ultima_escrita = 0.0
+        self._inicio_etapa: Dict[str, tuple[float, int]] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"pasta": str(self.pasta)}
+
+    def __setstate__(self, estado: Dict[str, Any]) -> None:
+        self.__init__(estado["pasta"])
+
+    @property
+    def arquivo(self) -> Path:
+        return self.pasta / ARQUIVO
+
+    def cancelado(self) -> bool:
+        return (self.pasta / FLAG_CANCELAR).exists()
+
+    def publicar(self, etapa: str, feitos: int, total: Optional[int] = None, **extra: Any) -> None:
+        agora = time.monotonic()
+        inicio, feitos_inicio = self._inicio_etapa.setdefault(etapa, (agora, feitos))
+        ultima = total is not None and feitos >= total
+        if not ultima and agora - self._ultima_escrita < PROGRESSO_INTERVALO_S:
+            return
+        self._ultima_escrita = agora
+
+        if self.cancelado():
+            raise Cancelado()
+
+        estado: Dict[str, Any] = {"etapa": etapa, "feitos": feitos, "total": total}
+        if total:
+            estado["percentual"] = round(feitos * 100 / total, 1)
+            ritmo = (feitos - feitos_inicio) / (agora - inicio) if agora > inicio else 0
+            if ritmo > 0:
+                estado["eta_s"] = round((total - feitos) / ritmo, 1)
+        estado.update(extra)
+        self.gravar(estado)
+        self._renovar_marca()
+
+    def _renovar_marca(self) -> None:
+        # requisição com progress_id: mostra que a execução continua viva
+        # (pastas de job não têm a marca, e o utime só falha sem efeito)
+        try:
+            os.utime(self.pasta / FLAG_EM_ANDAMENTO)
+        except OSError:
+            pass
+
+    def gravar(self, estado: Dict[str, Any]) -> None:
+        estado = {**estado, "atualizado_em": time.time()}
+        tmp = self.pasta / f"{ARQUIVO}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(estado, f, ensure_ascii=False, default=str)
+            os.replace(tmp, self.arquivo)
+        except OSError as e:
+            # progresso é informativo: nunca derruba o processamento
+            print(f"[progresso] Erro ao gravar {self.arquivo}: {e}")
+
+    def finalizar(self, status: str, erro: Optional[str] = None) -> None:
+        self.gravar({"status": status, "erro": erro})
+
+
+_canal: ContextVar[Optional[Canal]] = ContextVar("integra_progresso", default=None)
+
+
+def canal_atual() -> Optional[Canal]:
+    return _canal.get()
+
+
+@contextmanager
+def usar_canal(canal: Optional[Canal]) -> Iterator[Optional[Canal]]:
+    token = _canal.set(canal)
+    try:
+        yield canal
+    finally:
+        _canal.reset(token)
+
+
+def publicar(etapa: str, feitos: int, total: Optional[int] = None, **extra: Any) -> None:
+    """Publica o andamento no canal ativo (no-op sem canal)."""
+    canal = _canal.get()
+    if canal is not None:
+        canal.publicar(etapa, feitos, total, **extra)
+
+
+def ler(pasta: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(pasta / ARQUIVO, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def pedir_cancelamento(pasta: Path) -> None:
+    pasta.mkdir(parents=True, exist_ok=True)
+    (pasta / FLAG_CANCELAR).touch()
+
+
+# =========================
+# Progresso de requisições síncronas (?progress_id=...)
+# =========================
+
+_ID_VALIDO = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def pasta_requisicao(progress_id: str) -> Optional[Path]:
+    """Pasta do progress_id informado pelo cliente (None se o id for inválido)."""
+    if not progress_id or not _ID_VALIDO.match(progress_id):
+        return None
+    return PROGRESSO_DIR / progress_id
+
+
+def _em_andamento(pasta: Path, horas: float) -> bool:
+    """A marca existe e foi renovada nas últimas `horas` (ver Canal.publicar)."""
+    try:
+        return time.time() - (pasta / FLAG_EM_ANDAMENTO).stat().st_mtime < horas * 3600
+    except OSError:
+        return False
+
+
+def iniciar_requisicao(pasta: Path, horas: float = 1.0) -> bool:
+    """
+    Reserva a pasta do progress_id para uma nova execução e apaga o que
+    sobrou da anterior (pedido de cancelamento, estado final). Devolve False
+    se outra requisição com o mesmo id ainda está em andamento; uma marca
+    sem renovação há mais de `horas` é de uma execução que morreu sem finalizar.
+    """
+    pasta.mkdir(parents=True, exist_ok=True)
+    marca = pasta / FLAG_EM_ANDAMENTO
+    try:
+        # O_EXCL: duas requisições simultâneas com o mesmo id não passam juntas
+        os.close(os.open(marca, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        if _em_andamento(pasta, horas):
+            return False
+        marca.touch()
+
+    for nome in (FLAG_CANCELAR, ARQUIVO):
+        try:
+            (pasta / nome).unlink()
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def encerrar_requisicao(pasta: Path) -> None:
+    try:
+        (pasta / FLAG_EM_ANDAMENTO).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def limpar_antigos(horas: float = 1.0) -> None:
+    if not PROGRESSO_DIR.is_dir():
+        return
+    limite = time.time() - horas * 3600
+    for pasta in PROGRESSO_DIR.iterdir():
+        try:
+            if not pasta.is_dir() or pasta.stat().st_mtime >= limite:
+                continue
+        except OSError:
+            continue
+        # execução longa: a pasta pode estar parada, mas a marca é renovada
+        if _em_andamento(pasta, horas):
+            continue
+        shutil.rmtree(pasta, ignore_errors=True)
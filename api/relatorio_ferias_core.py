@@ -1,12 +1,23 @@
 # api/relatorio_ferias_core.py
 
+from contextlib import closing, nullcontext
 from pathlib import Path
-from typing import Dict, List
-from zipfile import ZipFile, ZIP_DEFLATED
+from typing import Any, Dict, List, Optional
 import re
 
 from PyPDF2 import PdfReader, PdfWriter
 
+from api import extracao_texto, paralelo, pdf_compacto, progresso
+from api.config import (
+    ESCRITA_GRUPOS_EM_SERIE,
+    ESCRITA_WORKERS,
+    RELATORIO_MODO_BUSCA,
+    RELATORIO_PASSO_AMOSTRA,
+)
+from api.nomes_arquivos import RegistroNomes
+from api.saida_zip import SaidaZip
+from api.tempos import etapa
+
 def simplify_name(name: str) -> str:
     """Normaliza o nome da empresa, removendo acentos e caracteres especiais."""
     import unicodedata
@@ -39,39 +50,155 @@ def extract_company_from_page_text(text: str) -> str:
 
     return first_line or "DESCONHECIDO"
 
-def split_pdf_relatorio_ferias(input_pdf: Path, out_dir: Path, competencia: str) -> Path:
-    """
-    Relatório de férias: separa por empresa usando extração de texto normal.
-    """
-    out_dir.mkdir(parents=True, exist_ok=True)
+TOOL = "separador-pdf-relatorio-de-ferias"
 
-    reader = PdfReader(str(input_pdf))
-    company_pages: Dict[str, List[int]] = {}
+def classificar_paginas(doc: extracao_texto.DocumentoTexto) -> List[str]:
+    """Empresa de cada página (usado na comparação entre motores de texto)."""
+    return [extract_company_from_page_text(doc.texto(idx)) for idx in range(len(doc))]
 
-    for idx, page in enumerate(reader.pages):
-        try:
-            text = page.extract_text() or ""
-        except Exception:
-            text = ""
-        company = extract_company_from_page_text(text)
+def _varredura_completa(doc: extracao_texto.DocumentoTexto, lidas: Dict[int, str]) -> Dict[str, List[int]]:
+    """Lê todas as páginas; as que já estão em `lidas` (da busca) não são extraídas de novo."""
+    company_pages: Dict[str, List[int]] = {}
+    total = len(doc)
+    for idx in range(total):
+        if idx not in lidas:
+            lidas[idx] = extract_company_from_page_text(doc.texto(idx))
+        company = lidas[idx]
         company_pages.setdefault(company, []).append(idx)
+        progresso.publicar("extract", idx + 1, total, empresa=company)
+    return company_pages
 
-    created_files: List[Path] = []
+def _busca_fronteiras(doc: extracao_texto.DocumentoTexto, passo: int, lidas: Dict[int, str]) -> Optional[Dict[str, List[int]]]:
+    """
+    Acha os trechos contíguos de cada empresa lendo só algumas páginas:
+    uma amostra a cada `passo` páginas e, onde duas amostras vizinhas
+    divergem, busca binária pela página em que a empresa muda. Lê
+    O(k·log n) páginas para k empresas em vez de n. A empresa de cada
+    página lida fica em `lidas`.
+
+    Cada trecho é conferido nas pontas: as duas primeiras e as duas últimas
+    páginas têm de ser da mesma empresa. Isso pega uma troca A/B/A junto de
+    uma fronteira, que a busca binária pularia. Devolve None quando a
+    conferência falha ou uma empresa aparece em dois trechos separados: o
+    relatório não está ordenado e a busca não é confiável. Uma empresa
+    inteira entre duas amostras da mesma outra empresa, longe de qualquer
+    fronteira, não é vista; por isso o modo pressupõe o relatório ordenado.
+    """
+    total = len(doc)
+    if total == 0:
+        return {}
+
+    def empresa(idx: int) -> str:
+        if idx not in lidas:
+            lidas[idx] = extract_company_from_page_text(doc.texto(idx))
+        return lidas[idx]
+
+    amostras = list(range(0, total, max(1, passo)))
+    if amostras[-1] != total - 1:
+        amostras.append(total - 1)
+
+    inicios = [0]  # primeira página de cada trecho
+    for a, b in zip(amostras, amostras[1:]):
+        inicio = a
+        # pode haver mais de uma troca entre duas amostras: repete a busca
+        # a partir de cada fronteira encontrada até alcançar a empresa de b
+        while empresa(inicio) != empresa(b):
+            lo, hi = inicio, b
+            while hi - lo > 1:
+                meio = (lo + hi) // 2
+                if empresa(meio) == empresa(inicio):
+                    lo = meio
+                else:
+                    hi = meio
+            inicios.append(hi)
+            inicio = hi
+        progresso.publicar("extract", b + 1, total, empresa=empresa(b))
 
-    for company, pages in company_pages.items():
-        writer = PdfWriter()
-        for p in pages:
-            writer.add_page(reader.pages[p])
+    company_pages: Dict[str, List[int]] = {}
+    for n, inicio in enumerate(inicios):
+        fim = inicios[n + 1] if n + 1 < len(inicios) else total
+        company = empresa(inicio)
+        if company in company_pages:
+            return None
+        # páginas dos dois lados de cada fronteira
+        pontas = {inicio + 1, fim - 2, fim - 1} & set(range(inicio, fim))
+        if any(empresa(idx) != company for idx in pontas):
+            return None
+        company_pages[company] = list(range(inicio, fim))
+    return company_pages
+
+def montar_writer(reader: PdfReader, paginas: List[int]) -> PdfWriter:
+    writer = PdfWriter()
+    for p in paginas:
+        writer.add_page(reader.pages[p])
+    return writer
+
+# PdfReader aberto em cada processo de escrita paralela (ver _montar_pdf_do_arquivo)
+_ORIGEM_ABERTA: Dict[str, PdfReader] = {}
+
+def _montar_pdf_do_arquivo(caminho: str, paginas: List[int]) -> bytes:
+    """Roda num processo de paralelo.mapear: reabre o PDF (uma vez por processo) e serializa o grupo."""
+    reader = _ORIGEM_ABERTA.get(caminho)
+    if reader is None:
+        _ORIGEM_ABERTA.clear()
+        reader = _ORIGEM_ABERTA[caminho] = PdfReader(caminho)
+    return pdf_compacto.bytes_do_writer(montar_writer(reader, paginas))
 
-        out_path = out_dir / f"{simplify_name(company)} {competencia}.pdf"
-        with open(out_path, "wb") as f:
-            writer.write(f)
+def split_pdf_relatorio_ferias(input_pdf: Path, out_dir: Path, competencia: str) -> Path:
+    """
+    Relatório de férias: separa por empresa usando extração de texto normal.
+    """
+    return separar_relatorio_ferias(input_pdf, out_dir, competencia)["zip_path"]
 
-        created_files.append(out_path)
+def separar_relatorio_ferias(input_pdf: Path, out_dir: Path, competencia: str) -> Dict[str, Any]:
+    """
+    split_pdf_relatorio_ferias devolvendo também o nº de páginas, para as
+    métricas da API não precisarem reabrir o PDF: {"zip_path", "total_paginas"}.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
 
+    with etapa("open"):
+        reader = PdfReader(str(input_pdf))
+        doc = extracao_texto.abrir(input_pdf, extracao_texto.motor_da_ferramenta(TOOL), reader=reader)
+
+    with etapa("extract") as e, doc:
+        company_pages = None
+        lidas: Dict[int, str] = {}
+        if RELATORIO_MODO_BUSCA == "fronteiras":
+            company_pages = _busca_fronteiras(doc, RELATORIO_PASSO_AMOSTRA, lidas)
+            if company_pages is None:
+                print(f"[relatorio-ferias] Empresas fora de ordem em {input_pdf.name}; lendo todas as páginas.")
+        if company_pages is None:
+            company_pages = _varredura_completa(doc, lidas)
+        # itens = páginas cujo texto foi extraído de fato
+        e.itens = len(lidas)
+        total_paginas = len(doc)
+
+    # com PY_ESCRITA_WORKERS os PDFs por empresa são montados em outros
+    # processos; o ZIP é gravado aqui, na ordem do documento
+    grupos = list(company_pages.items())
+    pdfs = None
+    if paralelo.vale_paralelizar(len(grupos), ESCRITA_GRUPOS_EM_SERIE, ESCRITA_WORKERS):
+        pdfs = paralelo.mapear(_montar_pdf_do_arquivo, [(str(input_pdf), pages) for _, pages in grupos], ESCRITA_WORKERS)
+
+    # cada PDF por empresa vai direto para o ZIP, sem passar pelo disco
     zip_path = out_dir / f"{input_pdf.stem}_empresas_{competencia}.zip"
-    with ZipFile(zip_path, "w", compression=ZIP_DEFLATED) as zf:
-        for f in created_files:
-            zf.write(f, arcname=f.name)
-
-    return zip_path
+    # nomes diferentes podem virar o mesmo após simplify_name ("A & B" e "A E B")
+    nomes = RegistroNomes()
+    with SaidaZip(zip_path) as zip_saida, closing(pdfs) if pdfs else nullcontext():
+        with etapa("write", itens=len(grupos)):
+            for company, pages in grupos:
+                nome = nomes.reservar(f"{simplify_name(company)} {competencia}", ".pdf")
+                try:
+                    if pdfs is None:
+                        zip_saida.adicionar_pdf(nome, montar_writer(reader, pages))
+                    else:
+                        zip_saida.adicionar(nome, next(pdfs))
+                except Exception as e:
+                    raise RuntimeError(f"Erro ao gerar {nome}: {e}") from e
+                progresso.publicar("write", len(zip_saida.nomes), len(grupos), arquivo=nome)
+
+        with etapa("zip", itens=len(zip_saida.nomes)):
+            zip_saida.fechar()
+
+    return {"zip_path": zip_path, "total_paginas": total_paginas}
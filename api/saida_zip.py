@@ -0,0 +1,107 @@
+# api/saida_zip.py
+"""
+Saída em ZIP dos separadores de PDF, sem arquivos intermediários.
+
+Antes cada PDF gerado (por empresa, por funcionário) era gravado em disco,
+relido para dentro do ZIP e, no caso das férias, apagado na faxina: o dobro
+de I/O e sobras na pasta quando algo falhava no meio. Aqui cada PDF é
+serializado direto numa entrada do ZIP:
+
+    with SaidaZip(zip_path) as saida:
+        saida.adicionar_pdf("EMPRESA 01-2025.pdf", writer)   # PyPDF2.PdfWriter
+        saida.adicionar("OUTRA 01-2025.pdf", pdf_bytes)      # ex.: PyMuPDF tobytes()
+
+O destino pode ser um caminho ou qualquer stream binário gravável (inclusive
+sem seek, como a resposta HTTP em streaming): o zipfile usa data descriptors
+quando não consegue voltar no arquivo. Se o bloco levantar exceção, o ZIP
+parcial gravado em caminho é apagado.
+
+PDFs já vêm comprimidos por dentro; PY_ZIP_COMPRESSAO=stored grava as
+entradas sem deflate (economiza CPU, ZIP um pouco maior).
+
+Com o modo compacto (PY_PDF_COMPACTO=1, api/pdf_compacto.py), adicionar_pdf
+serializa o writer em memória e o compacta antes de gravar a entrada.
+"""
+from __future__ import annotations
+
+import time
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from api import pdf_compacto
+from api.config import ZIP_COMPRESSAO
+
+_COMPRESSOES = {"stored": zipfile.ZIP_STORED, "deflated": zipfile.ZIP_DEFLATED}
+
+
+def compressao_zip(nome: Optional[str] = None) -> int:
+    """Constante do zipfile para o nome informado (padrão: PY_ZIP_COMPRESSAO)."""
+    return _COMPRESSOES.get((nome or ZIP_COMPRESSAO).lower(), zipfile.ZIP_DEFLATED)
+
+
+class _ContadorPosicao:
+    """
+    Entrada do ZIP com tell(): o PdfWriter anota a posição de cada objeto
+    para a tabela xref, e a entrada do zipfile não sabe informar a posição.
+    """
+
+    def __init__(self, destino: BinaryIO) -> None:
+        self._destino = destino
+        self._posicao = 0
+
+    def write(self, dados: bytes) -> int:
+        self._destino.write(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+
+class SaidaZip:
+    def __init__(
+        self,
+        destino: Union[Path, str, BinaryIO],
+        compressao: Optional[str] = None,
+        compacto: Optional[bool] = None,
+    ) -> None:
+        self.caminho = Path(destino) if isinstance(destino, (str, Path)) else None
+        self.compressao = compressao_zip(compressao)
+        self.compacto = pdf_compacto.ativo(compacto)
+        self._zf = zipfile.ZipFile(
+            str(self.caminho) if self.caminho else destino, "w", compression=self.compressao
+        )
+        self.nomes: list[str] = []
+
+    def __enter__(self) -> "SaidaZip":
+        return self
+
+    def __exit__(self, tipo, valor, tb) -> None:
+        self.fechar()
+        if tipo is not None and self.caminho is not None:
+            self.caminho.unlink(missing_ok=True)
+
+    def adicionar(self, nome: str, dados: bytes) -> None:
+        self._zf.writestr(self._info(nome), dados)
+        self.nomes.append(nome)
+
+    def adicionar_pdf(self, nome: str, writer) -> None:
+        """Serializa o PdfWriter (PyPDF2) direto na entrada `nome`."""
+        if self.compacto:
+            self.adicionar(nome, pdf_compacto.bytes_do_writer(writer, compacto=True))
+            return
+        with self._zf.open(self._info(nome), "w", force_zip64=True) as entrada:
+            writer.write(_ContadorPosicao(entrada))
+        self.nomes.append(nome)
+
+    def _info(self, nome: str) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(nome, date_time=time.localtime()[:6])
+        info.compress_type = self.compressao
+        info.external_attr = 0o644 << 16  # mesma permissão que zf.write daria
+        return info
+
+    def fechar(self) -> None:
+        """Grava o diretório central; depois disso o ZIP está completo."""
+        self._zf.close()
+
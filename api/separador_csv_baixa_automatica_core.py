@@ -8,6 +8,8 @@ import math
 
 import pandas as pd
 
+from api.tempos import etapa
+
 
 # Mesma ideia do script original:
 # - sheet_name padrão "BAIXAS"
@@ -120,12 +122,14 @@ def processar_baixa_automatica_arquivo(
   engine = "openpyxl" if input_path.suffix.lower() in {".xlsx", ".xlsm"} else None
 
   try:
-    df = pd.read_excel(
-      input_path,
-      sheet_name=sheet_name,
-      engine=engine,
-      dtype=object
-    )
+    with etapa("open") as e:
+      df = pd.read_excel(
+        input_path,
+        sheet_name=sheet_name,
+        engine=engine,
+        dtype=object
+      )
+      e.itens = len(df)
   except Exception as e:  # noqa: BLE001
     _log(f"Erro ao ler Excel: {e}")
     return {
@@ -148,10 +152,11 @@ def processar_baixa_automatica_arquivo(
     }
 
   try:
-    anos_series, col_usada = _try_year_from_col(df, year_source_column)
-    df["__ANO__"] = anos_series
-    df = df.dropna(subset=["__ANO__"])
-    df["__ANO__"] = df["__ANO__"].astype("Int64")
+    with etapa("classify", itens=len(df)):
+      anos_series, col_usada = _try_year_from_col(df, year_source_column)
+      df["__ANO__"] = anos_series
+      df = df.dropna(subset=["__ANO__"])
+      df["__ANO__"] = df["__ANO__"].astype("Int64")
     _log(f"Coluna usada para ano: {col_usada}")
   except ValueError as e:
     _log(str(e))
@@ -176,28 +181,30 @@ def processar_baixa_automatica_arquivo(
   arquivos_gerados: List[Dict] = []
   resumo_por_ano: Dict[str, int] = {}
 
-  for ano, df_ano in df.groupby("__ANO__", dropna=True):
-    ano_int = int(ano)
-    df_ano = df_ano.drop(columns=["__ANO__"])
-    df_ano = _format_columns(df_ano)
+  with etapa("write") as etapa_write:
+    for ano, df_ano in df.groupby("__ANO__", dropna=True):
+      ano_int = int(ano)
+      df_ano = df_ano.drop(columns=["__ANO__"])
+      df_ano = _format_columns(df_ano)
 
-    partes = _chunk_dataframe(df_ano, max_linhas_por_arquivo)
+      partes = _chunk_dataframe(df_ano, max_linhas_por_arquivo)
 
-    for idx, pedaco in enumerate(partes, start=1):
-      out_name = f"{input_path.stem}__{ano_int}__parte-{idx:02d}.csv"
-      out_path = output_dir_path / out_name
+      for idx, pedaco in enumerate(partes, start=1):
+        out_name = f"{input_path.stem}__{ano_int}__parte-{idx:02d}.csv"
+        out_path = output_dir_path / out_name
 
-      pedaco.to_csv(out_path, sep=csv_sep, index=False, encoding="utf-8-sig")
+        pedaco.to_csv(out_path, sep=csv_sep, index=False, encoding="utf-8-sig")
 
-      n_linhas = len(pedaco)
-      arquivos_gerados.append({
-        "arquivo": out_name,
-        "ano": ano_int,
-        "linhas": n_linhas,
-      })
-      resumo_por_ano[str(ano_int)] = resumo_por_ano.get(str(ano_int), 0) + n_linhas
+        n_linhas = len(pedaco)
+        arquivos_gerados.append({
+          "arquivo": out_name,
+          "ano": ano_int,
+          "linhas": n_linhas,
+        })
+        resumo_por_ano[str(ano_int)] = resumo_por_ano.get(str(ano_int), 0) + n_linhas
 
-      _log(f"Gerado {out_name} ({n_linhas} linhas)")
+        _log(f"Gerado {out_name} ({n_linhas} linhas)")
+    etapa_write.itens = len(arquivos_gerados)
 
   if not arquivos_gerados:
     _log("Nenhum arquivo gerado para este Excel.")
@@ -3,12 +3,18 @@
 from __future__ import annotations
 
 import re
-import zipfile
+from contextlib import closing
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterator, List, Dict
 
 from PyPDF2 import PdfReader, PdfWriter  # requer PyPDF2 instalado
 
+from api import extracao_texto, paralelo, pdf_compacto, progresso
+from api.config import FERIAS_MODO_BLOCOS, FERIAS_PAGINAS_POR_LOTE, FERIAS_WORKERS
+from api.nomes_arquivos import RegistroNomes
+from api.saida_zip import SaidaZip
+from api.tempos import etapa
+
 
 def extrair_texto(pagina) -> str:
     """Wrapper seguro para extrair texto de uma página de PDF."""
@@ -18,54 +24,157 @@ def extrair_texto(pagina) -> str:
         return ""
 
 
+# Todas as âncoras numa expressão só, aplicada uma vez por página. Cada
+# alternativa fica dentro de um lookahead: as ocorrências podem se sobrepor
+# (ex.: "NOME COMPLETO :" dentro do trecho de um "Ilmo Sr(a).") e cada âncora
+# acha a mesma primeira ocorrência que acharia numa busca separada.
+# "aviso" só vale no começo da página (título do Aviso de Férias).
+ANCORAS = re.compile(
+    r"(?=(?:"
+    r"\A\s*(?P<aviso>AVISO\s+DE\s+F[ÉE]RIAS)"
+    r"|EMPRESA\s*:\s*(?P<empresa>[^\n]+)"
+    r"|NOME\s+COMPLETO\s*:\s*(?P<nome_completo>[^\n]+)"
+    r"|Ilmo\s*Sr\(a\)\.\s*(?P<ilmo>[\s\S]+?)\s+Código\s*:"
+    r"))",
+    flags=re.IGNORECASE,
+)
+
+
+def ler_ancoras(texto: str) -> Dict[str, str]:
+    """Primeira ocorrência (texto bruto) de cada âncora encontrada na página."""
+    achadas: Dict[str, str] = {}
+    for m in ANCORAS.finditer(texto):
+        ancora = m.lastgroup
+        if ancora not in achadas:
+            achadas[ancora] = m.group(ancora)
+            if len(achadas) == len(ANCORAS.groupindex):
+                break
+    return achadas
+
+
+def _limpar_linha(valor: str | None) -> str | None:
+    if valor is None:
+        return None
+    valor = valor.strip()
+    return valor.splitlines()[0].strip(" :-\u200b") if valor else ""
+
+
+def _empresa_das_ancoras(ancoras: Dict[str, str]) -> str | None:
+    return _limpar_linha(ancoras.get("empresa"))
+
+
+def _nome_das_ancoras(paginas: list[Dict[str, str]]) -> str | None:
+    """
+    1) Linha "NOME COMPLETO : <nome>"
+    2) No Aviso: linha com "Ilmo Sr(a)." seguida do nome antes de "Código:"
+    """
+    for ancoras in paginas:
+        nome = _limpar_linha(ancoras.get("nome_completo"))
+        if nome:
+            return nome
+
+    for ancoras in paginas:
+        nome = ancoras.get("ilmo")
+        if nome is not None:
+            nome = nome.strip().replace("\n", " ").strip(" :-\u200b")
+            if nome:
+                return nome
+
+    return None
+
+
 def encontrar_empresa(texto: str) -> str | None:
     """
     Tenta localizar o nome da empresa em padrões do tipo:
     EMPRESA : <nome> ou Empresa : <nome>
     """
-    padroes = [
-        r"EMPRESA\s*:\s*(.+)",
-        r"Empresa\s*:\s*(.+)",
-    ]
-    for padrao in padroes:
-        m = re.search(padrao, texto, flags=re.IGNORECASE)
-        if m:
-            empresa = m.group(1).strip()
-            empresa = empresa.splitlines()[0].strip(" :-\u200b")
-            return empresa
-    return None
+    return _empresa_das_ancoras(ler_ancoras(texto))
 
 
 def encontrar_nome_funcionario(textos: list[str]) -> str | None:
+    """Tenta achar o nome do funcionário nos textos das páginas do bloco."""
+    return _nome_das_ancoras([ler_ancoras(t) for t in textos])
+
+
+class VarreduraPaginas:
+    """
+    Lê cada página do documento uma vez só e guarda as âncoras encontradas;
+    a busca da empresa e a dos nomes por bloco consultam o mesmo resultado.
     """
-    Tenta achar o nome do funcionário nos textos das páginas do bloco.
 
-    1) Linha "NOME COMPLETO : <nome>"
-    2) No Aviso: linha com "Ilmo Sr(a)." seguida do nome antes de "Código:"
+    def __init__(self, doc: extracao_texto.DocumentoTexto) -> None:
+        self.doc = doc
+        # lido já na criação: as consultas seguintes não dependem do documento
+        # continuar aberto (as âncoras podem vir todas de outros processos)
+        self.total = len(doc)
+        self.lidas = 0
+        self._ancoras: Dict[int, Dict[str, str]] = {}
+
+    def ancoras(self, idx: int) -> Dict[str, str]:
+        if idx not in self._ancoras:
+            self._ancoras[idx] = ler_ancoras(self.doc.texto(idx))
+            self.lidas += 1
+        return self._ancoras[idx]
+
+    def registrar(self, inicio: int, ancoras: list[Dict[str, str]]) -> None:
+        """Âncoras de páginas lidas em outro processo (ver _ancoras_lote)."""
+        for idx, achadas in enumerate(ancoras, start=inicio):
+            self._ancoras[idx] = achadas
+        self.lidas += len(ancoras)
+
+    def empresa(self, limite: int = 6) -> tuple[str | None, int]:
+        """Procura a empresa nas primeiras páginas; devolve (empresa, páginas consultadas)."""
+        for idx in range(min(limite, self.total)):
+            empresa = _empresa_das_ancoras(self.ancoras(idx))
+            if empresa:
+                return empresa, idx + 1
+        return None, min(limite, self.total)
+
+    def nome_funcionario(self, paginas: range | list[int]) -> str | None:
+        return _nome_das_ancoras([self.ancoras(i) for i in paginas])
+
+
+def agrupar_blocos(ancoras: list[Dict[str, str]]) -> tuple[list[tuple[int, int]], list[int]]:
     """
-    # 1) NOME COMPLETO :
-    for t in textos:
-        m = re.search(r"NOME\s+COMPLETO\s*:\s*(.+)", t, flags=re.IGNORECASE)
-        if m:
-            nome = m.group(1).strip()
-            nome = nome.splitlines()[0].strip(" :-\u200b")
-            if nome:
-                return nome
+    Agrupa as páginas em blocos [inicio, fim) por funcionário, numa passada
+    pelo índice de âncoras (uma entrada por página):
+
+    - o Aviso de Férias (título no topo ou "Ilmo Sr(a).") abre um bloco;
+    - "NOME COMPLETO" (recibo) entra no bloco aberto, ou abre outro se o
+      bloco já tem um recibo ou se ainda não há bloco;
+    - as demais páginas entram no bloco aberto enquanto ele não tem recibo
+      (avisos de 3+ páginas); depois do recibo o bloco está fechado.
+
+    Devolve (blocos, páginas órfãs): as órfãs são as páginas sem âncora que
+    vêm antes do primeiro bloco ou depois do recibo de um bloco. Sem nenhuma âncora no documento (ex.: PDF escaneado),
+    volta aos blocos fixos de 2 páginas, com a última órfã se a conta for
+    ímpar.
+    """
+    if not any(ancoras):
+        return blocos_fixos(len(ancoras))
+
+    blocos: list[tuple[int, int]] = []
+    orfas: list[int] = []
+    tem_recibo = False
+    for idx, achadas in enumerate(ancoras):
+        aviso = "aviso" in achadas or "ilmo" in achadas
+        recibo = "nome_completo" in achadas
+        if aviso or (recibo and (not blocos or tem_recibo)):
+            blocos.append((idx, idx + 1))
+            tem_recibo = recibo
+        elif blocos and not tem_recibo:
+            blocos[-1] = (blocos[-1][0], idx + 1)
+            tem_recibo = recibo
+        else:
+            orfas.append(idx)
+    return blocos, orfas
 
-    # 2) Ilmo Sr(a). <nome> Código:
-    for t in textos:
-        m = re.search(
-            r"Ilmo\s*Sr\(a\)\.\s*(.+?)\s+Código\s*:",
-            t,
-            flags=re.IGNORECASE | re.DOTALL,
-        )
-        if m:
-            nome = m.group(1).strip()
-            nome = nome.replace("\n", " ").strip(" :-\u200b")
-            if nome:
-                return nome
 
-    return None
+def blocos_fixos(total_paginas: int) -> tuple[list[tuple[int, int]], list[int]]:
+    """Layout antigo: 2 páginas por funcionário; se for ímpar, a última fica de fora."""
+    blocos = [(i, i + 2) for i in range(0, total_paginas - 1, 2)]
+    orfas = [total_paginas - 1] if total_paginas % 2 else []
+    return blocos, orfas
 
 
 def sanitizar_para_arquivo(nome: str) -> str:
@@ -75,23 +184,102 @@ def sanitizar_para_arquivo(nome: str) -> str:
     return nome
 
 
-def caminho_unico(base_dir: Path, base_nome: str, ext: str = ".pdf") -> Path:
+def caminho_unico(
+    base_dir: Path, base_nome: str, ext: str = ".pdf", nomes: RegistroNomes | None = None
+) -> Path:
     """
     Gera um caminho único no formato:
     base_nome + ext
     base_nome + " 2" + ext
     base_nome + " 3" + ext
     ...
+    Com `nomes` (registro da execução), a reserva é feita só em memória; sem
+    ele, a pasta é listada uma vez para saber o que já existe.
     """
-    n = 1
-    while True:
-        if n == 1:
-            candidato = base_dir / f"{base_nome}{ext}"
-        else:
-            candidato = base_dir / f"{base_nome} {n}{ext}"
-        if not candidato.exists():
-            return candidato
-        n += 1
+    if nomes is None:
+        nomes = RegistroNomes.da_pasta(base_dir)
+    return base_dir / nomes.reservar(base_nome, ext)
+
+
+def detectar_empresa(doc: extracao_texto.DocumentoTexto) -> tuple[str | None, int]:
+  """Procura a empresa nas primeiras páginas (até 6); devolve (empresa, páginas lidas)."""
+  return VarreduraPaginas(doc).empresa()
+
+
+def dividir_blocos(varredura: VarreduraPaginas, total_paginas: int) -> tuple[list[tuple[int, int]], list[int]]:
+  """Blocos por funcionário e páginas órfãs, conforme PY_FERIAS_MODO_BLOCOS."""
+  if FERIAS_MODO_BLOCOS == "fixo":
+    return blocos_fixos(total_paginas)
+  return agrupar_blocos([varredura.ancoras(i) for i in range(total_paginas)])
+
+
+def classificar_blocos(doc: extracao_texto.DocumentoTexto) -> list[str | None]:
+  """Empresa, nome de cada bloco e páginas órfãs (comparação entre motores de texto)."""
+  varredura = VarreduraPaginas(doc)
+  empresa, _ = varredura.empresa()
+  blocos, orfas = dividir_blocos(varredura, len(doc))
+  nomes = [varredura.nome_funcionario(range(inicio, fim)) for inicio, fim in blocos]
+  return [empresa] + nomes + [f"órfãs: {orfas}"]
+
+
+def _ancoras_lote(
+  caminho: str, motor: str, documento: str | None, inicio: int, fim: int
+) -> list[Dict[str, str]]:
+  """
+  Roda num processo de paralelo.mapear_lotes: âncoras das páginas [inicio, fim).
+  `documento` é o hash já calculado pelo processo principal (None = sem cache
+  de texto): cada lote usa o cache sem reler o PDF inteiro para a chave.
+  """
+  with extracao_texto.abrir(caminho, motor, usar_cache=documento is not None, documento=documento) as doc:
+    return [ler_ancoras(doc.texto(idx)) for idx in range(inicio, fim)]
+
+
+def montar_bloco(reader: PdfReader, inicio: int, fim: int) -> PdfWriter:
+  writer = PdfWriter()
+  for p in range(inicio, fim):
+    writer.add_page(reader.pages[p])
+  return writer
+
+
+def _blocos_em_serie(reader: PdfReader, blocos: list[tuple[int, int]]) -> Iterator[PdfWriter]:
+  for inicio, fim in blocos:
+    yield montar_bloco(reader, inicio, fim)
+
+
+def _renderizar_lote(caminho: str, blocos: list[tuple[int, int]]) -> list[bytes]:
+  """Roda num processo de paralelo.mapear: PDF serializado de cada bloco do lote."""
+  reader = PdfReader(caminho)
+  return [pdf_compacto.bytes_do_writer(montar_bloco(reader, inicio, fim)) for inicio, fim in blocos]
+
+
+def _lotes_de_blocos(blocos: list[tuple[int, int]], paginas_por_lote: int) -> list[list[tuple[int, int]]]:
+  """Blocos consecutivos agrupados até somar ~paginas_por_lote páginas."""
+  lotes: list[list[tuple[int, int]]] = []
+  paginas = paginas_por_lote
+  for inicio, fim in blocos:
+    if paginas >= paginas_por_lote:
+      lotes.append([])
+      paginas = 0
+    lotes[-1].append((inicio, fim))
+    paginas += fim - inicio
+  return lotes
+
+
+def _blocos_em_paralelo(caminho: Path, blocos: list[tuple[int, int]]) -> Iterator[bytes]:
+  """
+  Mesmos PDFs de _blocos_em_serie, com os lotes de blocos repartidos entre
+  processos. Os lotes voltam na ordem dos blocos.
+  """
+  lotes = _lotes_de_blocos(blocos, FERIAS_PAGINAS_POR_LOTE)
+  resultados = paralelo.mapear(_renderizar_lote, [(str(caminho), lote) for lote in lotes], FERIAS_WORKERS)
+  try:
+    for lote in lotes:
+      # tempo de espera pelo lote montado no outro processo
+      with etapa("write", somar=True):
+        feitos = next(resultados)
+      yield from feitos
+  finally:
+    resultados.close()
 
 
 def processar_ferias_por_funcionario(pdf_path: Path | str) -> Dict:
@@ -106,106 +294,112 @@ def processar_ferias_por_funcionario(pdf_path: Path | str) -> Dict:
       "pasta_saida": str,
       "zip_path": str,
       "arquivos": [str, ...],
+      "paginas_orfas": [int, ...],   # 1-based, fora de qualquer bloco
     }
   """
   pdf_path = Path(pdf_path)
   if not pdf_path.exists():
     raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
 
-  reader = PdfReader(str(pdf_path))
+  with etapa("open"):
+    reader = PdfReader(str(pdf_path))
+    motor = extracao_texto.motor_da_ferramenta("ferias-funcionario")
+    doc = extracao_texto.abrir(pdf_path, motor, reader=reader)
+    # cada página é lida uma vez: empresa, blocos e nomes saem do mesmo índice
+    varredura = VarreduraPaginas(doc)
 
-  # Detecta a empresa nas primeiras páginas (até 6)
-  empresa = None
-  for idx in range(min(6, len(reader.pages))):
-    texto = extrair_texto(reader.pages[idx])
-    empresa = encontrar_empresa(texto)
-    if empresa:
-      break
+  total_paginas = len(reader.pages)
+  em_paralelo = paralelo.vale_paralelizar(total_paginas, FERIAS_PAGINAS_POR_LOTE, FERIAS_WORKERS)
+
+  # Índice de âncoras de todas as páginas (no modo "fixo" também: os nomes
+  # dos blocos vêm dele). Empresa e blocos saem do índice ainda com o
+  # documento aberto.
+  with doc:
+    with etapa("extract", itens=total_paginas):
+      if em_paralelo:
+        documento = doc.documento if isinstance(doc, extracao_texto.DocumentoEmCache) else None
+        lotes = paralelo.mapear_lotes(
+          _ancoras_lote, total_paginas, FERIAS_PAGINAS_POR_LOTE, FERIAS_WORKERS, str(pdf_path), motor, documento
+        )
+        for inicio, fim, ancoras in lotes:
+          varredura.registrar(inicio, ancoras)
+          progresso.publicar("extract", fim, total_paginas)
+      else:
+        for idx in range(total_paginas):
+          varredura.ancoras(idx)
+          progresso.publicar("extract", idx + 1, total_paginas)
+
+    # Detecta a empresa nas primeiras páginas (até 6) e monta os blocos
+    with etapa("classify") as e:
+      empresa, _ = varredura.empresa()
+      blocos, orfas = dividir_blocos(varredura, total_paginas)
+      e.itens = len(blocos)
+
+  if orfas:
+    print(
+      f"[ferias-funcionario] {pdf_path.name}: {len(orfas)} página(s) fora de qualquer bloco: "
+      + ", ".join(str(p + 1) for p in orfas)
+    )
 
   if not empresa:
     empresa = "sem_empresa"
 
   # Pasta da empresa (nível 1)
   pasta_empresa = pdf_path.parent / f"FERIAS - {sanitizar_para_arquivo(empresa)}"
-  pasta_empresa.mkdir(exist_ok=True)
 
   # Subpasta por execução / por arquivo de origem (nível 2)
   # ex: FERIAS - MINHA EMPRESA/1764938570212-FERIAS TAXCO/
+  # As pastas existem só dentro do ZIP: os PDFs não passam pelo disco.
   nome_lote = sanitizar_para_arquivo(pdf_path.stem)
   pasta_saida = pasta_empresa / nome_lote
-  pasta_saida.mkdir(exist_ok=True)
-
-  total_paginas = len(reader.pages)
-  if total_paginas % 2 != 0:
-    # se for ímpar, ignora a última página
-    total_blocos = total_paginas // 2
-  else:
-    total_blocos = total_paginas // 2
 
+  total_blocos = len(blocos)
   arquivos_gerados: List[Path] = []
+  # a pasta de saída só existe dentro do ZIP: os nomes são reservados em memória
+  nomes = RegistroNomes()
 
-  for bloco in range(total_blocos):
-    i = bloco * 2
-    paginas_bloco = [reader.pages[i], reader.pages[i + 1]]
-    textos_bloco = [extrair_texto(p) for p in paginas_bloco]
-
-    nome = encontrar_nome_funcionario(textos_bloco)
-    if not nome:
-      nome = f"funcionario_{bloco+1:03d}"
-
-    base_nome = f"FERIAS - {sanitizar_para_arquivo(nome)}"
-    caminho_saida = caminho_unico(pasta_saida, base_nome, ext=".pdf")
-
-    writer = PdfWriter()
-    writer.add_page(paginas_bloco[0])
-    writer.add_page(paginas_bloco[1])
+  if em_paralelo:
+    montados = _blocos_em_paralelo(pdf_path, blocos)
+  else:
+    montados = _blocos_em_serie(reader, blocos)
 
-    with open(caminho_saida, "wb") as f:
-      writer.write(f)
+  # Cada PDF por funcionário vai direto para o ZIP consolidado
+  zip_path = pdf_path.parent / f"{pdf_path.stem}_FERIAS_POR_FUNCIONARIO.zip"
+  with SaidaZip(zip_path) as zip_saida, closing(montados):
+    for bloco, ((inicio, fim), pdf) in enumerate(zip(blocos, montados)):
+      nome = varredura.nome_funcionario(range(inicio, fim))
+      if not nome:
+        nome = f"funcionario_{bloco+1:03d}"
+
+      base_nome = f"FERIAS - {sanitizar_para_arquivo(nome)}"
+      caminho_saida = caminho_unico(pasta_saida, base_nome, ext=".pdf", nomes=nomes)
+
+      with etapa("write", itens=1, somar=True):
+        arcname = caminho_saida.relative_to(pdf_path.parent).as_posix()
+        if isinstance(pdf, PdfWriter):
+          zip_saida.adicionar_pdf(arcname, pdf)
+        else:
+          zip_saida.adicionar(arcname, pdf)
 
-    arquivos_gerados.append(caminho_saida)
+      arquivos_gerados.append(caminho_saida)
+      progresso.publicar("split", bloco + 1, total_blocos, empresa=empresa, arquivo=caminho_saida.name)
 
-  # Cria ZIP consolidando todos os PDFs gerados
-  zip_path = pdf_path.parent / f"{pdf_path.stem}_FERIAS_POR_FUNCIONARIO.zip"
-  with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-    for arq in arquivos_gerados:
-      arcname = arq.relative_to(pdf_path.parent)
-      zf.write(arq, arcname.as_posix())
+    with etapa("zip", itens=len(arquivos_gerados)):
+      zip_saida.fechar()
 
   # ---------------------- BLOCO DE FAXINA ----------------------
-  try:
-    # Apaga cada PDF individual gerado
-    for arq in arquivos_gerados:
+  with etapa("cleanup"):
+    try:
+      # Apaga o PDF original de entrada (os individuais nunca foram para o disco)
       try:
-        if arq.exists():
-          arq.unlink()
+        if pdf_path.exists():
+          pdf_path.unlink()
       except Exception as e:
-        print(f"[ferias-funcionario] Erro ao apagar arquivo {arq}: {e}")
+        print(f"[ferias-funcionario] Erro ao apagar PDF original {pdf_path}: {e}")
 
-    # Tenta remover a pasta do lote (pasta_saida) se estiver vazia
-    try:
-      pasta_saida.rmdir()
-    except Exception:
-      # se não estiver vazia ou der erro, apenas ignora
-      pass
-
-    # Se quiser, tenta remover a pasta da empresa se ficar vazia
-    try:
-      if not any(pasta_empresa.iterdir()):
-        pasta_empresa.rmdir()
-    except Exception:
-      pass
-
-    # Apaga também o PDF original de entrada
-    try:
-      if pdf_path.exists():
-        pdf_path.unlink()
     except Exception as e:
-      print(f"[ferias-funcionario] Erro ao apagar PDF original {pdf_path}: {e}")
-
-  except Exception as e:
-    # qualquer erro na limpeza não impede o retorno da função
-    print(f"[ferias-funcionario] Erro na rotina de limpeza: {e}")
+      # qualquer erro na limpeza não impede o retorno da função
+      print(f"[ferias-funcionario] Erro na rotina de limpeza: {e}")
   # -------------------- FIM BLOCO DE FAXINA --------------------
 
   return {
@@ -215,4 +409,5 @@ def processar_ferias_por_funcionario(pdf_path: Path | str) -> Dict:
     "pasta_saida": str(pasta_saida),
     "zip_path": str(zip_path),
     "arquivos": [p.name for p in arquivos_gerados],
+    "paginas_orfas": [p + 1 for p in orfas],
   }
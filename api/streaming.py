@@ -0,0 +1,121 @@
+# api/streaming.py
+"""
+Resposta HTTP gerada enquanto o core ainda está processando.
+
+O core roda numa thread própria e escreve num CanoBytes como se fosse um
+arquivo (ex.: o ZipFile da SaidaZip). Os blocos seguem por uma fila limitada
+até o gerador assíncrono entregue ao StreamingResponse:
+
+    cano = CanoBytes()
+    corpo = await cano.iniciar(gerar)     # gerar(cano) roda na thread
+    return StreamingResponse(corpo, media_type="application/zip")
+
+- Backpressure: com a fila cheia (cliente lento), a thread do core espera.
+- iniciar() só devolve quando o primeiro bloco fica pronto. Erros antes disso
+  (429 da admissão, PDF inválido, cancelamento) viram a resposta de erro
+  normal; depois do primeiro byte o status já foi enviado e a conexão é
+  apenas encerrada.
+- Se o cliente desconectar, a próxima escrita do core levanta
+  ConexaoEncerrada e o processamento para.
+
+A thread roda no processo da API (não no worker_pool): os bytes precisam
+sair daqui, e repassar cada bloco entre processos custaria mais que o ganho.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from typing import AsyncIterator, Callable, Optional
+
+# Tamanho dos blocos enviados ao cliente e nº de blocos em espera na fila
+BLOCO_BYTES = 256 * 1024
+BLOCOS_NA_FILA = 8
+
+_FIM = object()
+
+
+class ConexaoEncerrada(Exception):
+    """O cliente desconectou antes do fim da resposta."""
+
+    def __init__(self, mensagem: str = "Cliente desconectou antes do fim da resposta.") -> None:
+        super().__init__(mensagem)
+
+
+class CanoBytes:
+    def __init__(self, bloco_bytes: int = BLOCO_BYTES, blocos_na_fila: int = BLOCOS_NA_FILA) -> None:
+        self.bloco_bytes = bloco_bytes
+        self.total = 0
+        self._buffer = bytearray()
+        self._fila: asyncio.Queue = asyncio.Queue(maxsize=blocos_na_fila)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._abandonado = False
+
+    # --- lado da thread (o core enxerga um arquivo só de escrita) ---
+
+    def write(self, dados: bytes) -> int:
+        if self._abandonado:
+            raise ConexaoEncerrada()
+        self._buffer += dados
+        self.total += len(dados)
+        if len(self._buffer) >= self.bloco_bytes:
+            self._enviar(bytes(self._buffer))
+            self._buffer.clear()
+        return len(dados)
+
+    def flush(self) -> None:
+        pass
+
+    def _enviar(self, item) -> None:
+        asyncio.run_coroutine_threadsafe(self._fila.put(item), self._loop).result()
+
+    def _produzir(self, gerar: Callable[["CanoBytes"], None]) -> None:
+        try:
+            gerar(self)
+            if self._buffer:
+                self._enviar(bytes(self._buffer))
+                self._buffer.clear()
+        except BaseException as e:  # noqa: BLE001 - repassada para quem consome
+            if not self._abandonado:
+                self._enviar(e)
+            return
+        self._enviar(_FIM)
+
+    # --- lado assíncrono (endpoint) ---
+
+    async def iniciar(self, gerar: Callable[["CanoBytes"], None]) -> AsyncIterator[bytes]:
+        """
+        Roda gerar(self) numa thread (com uma cópia do contexto atual) e espera
+        o primeiro bloco. Levanta a exceção do core se ela vier antes dele.
+        """
+        self._loop = asyncio.get_running_loop()
+        contexto = contextvars.copy_context()
+        threading.Thread(
+            target=contexto.run, args=(self._produzir, gerar), daemon=True, name="integra-stream"
+        ).start()
+
+        primeiro = await self._fila.get()
+        if isinstance(primeiro, BaseException):
+            raise primeiro
+        return self._corpo(primeiro)
+
+    async def _corpo(self, primeiro) -> AsyncIterator[bytes]:
+        item = primeiro
+        try:
+            while item is not _FIM:
+                if isinstance(item, BaseException):
+                    # status 200 já foi enviado: só resta encerrar a conexão
+                    print(f"[streaming] Erro após o início da resposta: {item}")
+                    raise item
+                yield item
+                item = await self._fila.get()
+        finally:
+            if item is not _FIM:
+                self._abandonar()
+
+    def _abandonar(self) -> None:
+        # libera a thread se ela estiver presa na fila cheia; a próxima
+        # escrita dela levanta ConexaoEncerrada
+        self._abandonado = True
+        while not self._fila.empty():
+            self._fila.get_nowait()
@@ -0,0 +1,122 @@
+# api/tempos.py
+"""
+Tempos por etapa dos cores (open, extract, classify, write, zip, cleanup).
+
+Os cores marcam as etapas do pipeline:
+
+    with etapa("extract") as e:
+        ...
+        e.itens = len(paginas)
+
+Cada etapa guarda o tempo de relógio, o tempo de CPU da thread e a contagem
+de itens no coletor ativo (contextvar). Sem coletor ativo, etapa() não mede
+nada. O worker_pool coleta as etapas dentro do processo de trabalho e as
+devolve junto com o resultado, então o endpoint enxerga o mesmo detalhamento
+rodando com ou sem pool.
+
+Toda execução de ferramenta registra uma linha "[timings] {json}" no log
+(ver metricas.medir_ferramenta); o campo "timings" na resposta é opcional
+(?timings=true).
+"""
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+Etapas = List[Dict[str, Any]]
+
+_coletor: ContextVar[Optional[Etapas]] = ContextVar("integra_tempos", default=None)
+
+
+class Etapa:
+    """Etapa em andamento; o core pode ajustar `itens` antes de sair do bloco."""
+
+    __slots__ = ("nome", "itens")
+
+    def __init__(self, nome: str, itens: Optional[int] = None) -> None:
+        self.nome = nome
+        self.itens = itens
+
+
+@contextmanager
+def etapa(nome: str, itens: Optional[int] = None, somar: bool = False) -> Iterator[Etapa]:
+    """
+    Mede o bloco como uma etapa. Com somar=True, repetições da etapa (ex.: uma
+    por funcionário dentro de um laço) acumulam numa única entrada.
+    """
+    atual = Etapa(nome, itens)
+    etapas = _coletor.get()
+    if etapas is None:
+        yield atual
+        return
+
+    inicio = time.perf_counter()
+    inicio_cpu = time.thread_time()
+    try:
+        yield atual
+    finally:
+        registro: Dict[str, Any] = {
+            "etapa": nome,
+            "ms": round((time.perf_counter() - inicio) * 1000, 2),
+            "cpu_ms": round((time.thread_time() - inicio_cpu) * 1000, 2),
+        }
+        if atual.itens is not None:
+            registro["itens"] = int(atual.itens)
+        if not (somar and _somar(etapas, registro)):
+            etapas.append(registro)
+
+
+def _somar(etapas: Etapas, registro: Dict[str, Any]) -> bool:
+    for existente in reversed(etapas):
+        if existente["etapa"] == registro["etapa"]:
+            existente["ms"] = round(existente["ms"] + registro["ms"], 2)
+            existente["cpu_ms"] = round(existente["cpu_ms"] + registro["cpu_ms"], 2)
+            if "itens" in registro:
+                existente["itens"] = existente.get("itens", 0) + registro["itens"]
+            return True
+    return False
+
+
+@contextmanager
+def coletar() -> Iterator[Etapas]:
+    """
+    Abre um coletor de etapas. Coletores aninhados repassam o que mediram
+    para o de fora ao terminar (ex.: requisição -> ferramenta -> core).
+    """
+    externo = _coletor.get()
+    etapas: Etapas = []
+    token = _coletor.set(etapas)
+    try:
+        yield etapas
+    finally:
+        _coletor.reset(token)
+        if externo is not None:
+            externo.extend(etapas)
+
+
+def anexar(etapas: Iterable[Dict[str, Any]]) -> None:
+    """Junta ao coletor ativo etapas medidas em outro processo."""
+    atual = _coletor.get()
+    if atual is not None:
+        atual.extend(etapas)
+
+
+def registrar_log(tool: str, total_ms: float, etapas: Etapas) -> None:
+    print("[timings] " + json.dumps(
+        {"tool": tool, "total_ms": round(total_ms, 2), "etapas": etapas},
+        ensure_ascii=False,
+    ))
+
+
+def server_timing(etapas: Etapas) -> str:
+    """Etapas no formato do header Server-Timing (respostas binárias)."""
+    partes = []
+    for e in etapas:
+        desc = f'cpu={e["cpu_ms"]}ms'
+        if "itens" in e:
+            desc += f' itens={e["itens"]}'
+        partes.append(f'{e["etapa"]};dur={e["ms"]};desc="{desc}"')
+    return ", ".join(partes)
@@ -0,0 +1,90 @@
+# api/uploads.py
+"""
+Gravação de arquivos enviados (UploadFile) em disco, em blocos.
+
+Evita o padrão `f.write(await arquivo.read())`, que carrega o upload inteiro
+na memória antes de gravar: aqui a memória por requisição fica limitada ao
+tamanho do bloco, independente do tamanho do PDF.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from api.config import UPLOAD_CHUNK_BYTES, UPLOAD_MAX_BYTES
+
+
+def nome_seguro(nome: str | None, padrao: str) -> str:
+    """Usa só o nome do arquivo enviado (sem diretórios vindos do cliente)."""
+    nome = Path(nome or "").name.strip()
+    return nome or padrao
+
+
+async def _gravar_blocos(
+    blocos: AsyncIterator[bytes],
+    destino: Path,
+    max_bytes: int,
+    hasher=None,
+) -> int:
+    total = 0
+
+    with open(destino, "wb") as f:
+        async for bloco in blocos:
+            if not bloco:
+                continue
+            total += len(bloco)
+            if max_bytes and total > max_bytes:
+                break
+            if hasher is not None:
+                hasher.update(bloco)
+            await run_in_threadpool(f.write, bloco)
+
+    if max_bytes and total > max_bytes:
+        destino.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=413,
+            detail=f"Arquivo maior que o limite permitido ({max_bytes} bytes).",
+        )
+
+    return total
+
+
+async def salvar_upload(
+    arquivo: UploadFile,
+    destino: Path,
+    chunk_bytes: int = UPLOAD_CHUNK_BYTES,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    hasher=None,
+) -> int:
+    """
+    Copia o upload para `destino` em blocos de `chunk_bytes` e devolve o total
+    de bytes gravados. Se passar de `max_bytes`, apaga o parcial e responde 413.
+    Se `hasher` (ex.: hashlib.sha256()) for informado, é atualizado com cada
+    bloco, para calcular o hash sem reler o arquivo.
+    """
+    chunk_bytes = max(64 * 1024, chunk_bytes)
+
+    async def blocos():
+        while True:
+            bloco = await arquivo.read(chunk_bytes)
+            if not bloco:
+                return
+            yield bloco
+
+    return await _gravar_blocos(blocos(), destino, max_bytes, hasher)
+
+
+async def salvar_corpo(
+    request: Request,
+    destino: Path,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    hasher=None,
+) -> int:
+    """
+    Igual a salvar_upload, para requisições application/octet-stream:
+    grava o corpo cru à medida que chega, sem montar o arquivo em memória.
+    """
+    return await _gravar_blocos(request.stream(), destino, max_bytes, hasher)
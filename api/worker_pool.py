@@ -0,0 +1,175 @@
+# api/worker_pool.py
+"""
+Pool de processos para as funções pesadas dos cores (split de PDF, compressão,
+ajuste de planilhas...).
+
+Os endpoints continuam síncronos (rodam no threadpool do Starlette), mas em vez
+de executar o core na própria thread eles despacham a chamada para um processo
+separado e só aguardam o resultado. Assim o GIL deixa de serializar os jobs e
+um PDF grande não degrada as demais requisições.
+
+Configuração (variáveis de ambiente):
+  PY_WORKERS                -> nº de processos (0 = executa na própria thread)
+  PY_WORKER_MAX_TAREFAS     -> recicla o processo após N chamadas (0 = nunca)
+  PY_WORKER_WARM_IMPORTS    -> módulos importados ao subir cada processo
+  PY_WORKER_PREAQUECER      -> 1 = sobe os processos junto com a API
+"""
+from __future__ import annotations
+
+import importlib
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+from api import progresso, tempos
+from api.aquecimento import aquecer
+from api.config import WORKERS, WORKER_MAX_TAREFAS, WORKER_WARM_IMPORTS
+
+# função ou caminho "modulo:funcao"
+Alvo = Union[Callable[..., Any], str]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _aquecer(modulos: tuple[str, ...]) -> None:
+    """Initializer de cada processo: importa os cores antes da primeira tarefa."""
+    aquecer(modulos, origem="worker")
+
+
+def _resolver(alvo: Alvo) -> Callable[..., Any]:
+    """Aceita a função ou o caminho "modulo:funcao" (importado só aqui)."""
+    if callable(alvo):
+        return alvo
+    modulo, _, nome = alvo.partition(":")
+    return getattr(importlib.import_module(modulo), nome)
+
+
+def _chamar(
+    alvo: Alvo,
+    args: tuple,
+    kwargs: dict,
+    canal: Optional[progresso.Canal] = None,
+) -> tuple[Any, tempos.Etapas]:
+    """Roda no processo de trabalho; devolve o resultado e as etapas medidas lá."""
+    with progresso.usar_canal(canal), tempos.coletar() as etapas:
+        resultado = _resolver(alvo)(*args, **kwargs)
+    return resultado, etapas
+
+
+def _nada() -> None:
+    return None
+
+
+def _criar_pool() -> ProcessPoolExecutor:
+    # "spawn" funciona igual no Windows e no Linux e é exigido pelo max_tasks_per_child
+    return ProcessPoolExecutor(
+        max_workers=WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_aquecer,
+        initargs=(tuple(WORKER_WARM_IMPORTS),),
+        max_tasks_per_child=WORKER_MAX_TAREFAS or None,
+    )
+
+
+def obter_pool() -> Optional[ProcessPoolExecutor]:
+    """Devolve o pool (criado na primeira chamada) ou None se desabilitado."""
+    global _pool
+    if WORKERS <= 0:
+        return None
+    with _lock:
+        if _pool is None:
+            _pool = _criar_pool()
+        return _pool
+
+
+def _descartar_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def executar(fn: Alvo, *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa fn(*args, **kwargs) num processo do pool e devolve o resultado.
+
+    fn pode ser uma função de nível de módulo (picklable) ou o caminho
+    "api.modulo_core:funcao"; nesse caso o core só é importado dentro do
+    processo que executa, e a API não precisa carregá-lo. Argumentos e retorno
+    precisam ser serializáveis. Exceções do core são propagadas como estão.
+    Sem pool configurado, a função roda na thread atual. As etapas medidas
+    pelo core (api/tempos.py) entram no coletor de quem chamou, e o canal de
+    progresso ativo (api/progresso.py) segue junto para o processo.
+    """
+    pool = obter_pool()
+    if pool is None:
+        return _resolver(fn)(*args, **kwargs)
+
+    try:
+        futuro = pool.submit(_chamar, fn, args, kwargs, progresso.canal_atual())
+        resultado, etapas = futuro.result()
+    except BrokenProcessPool:
+        # um processo morreu (ex.: OOM); o próximo pedido recria o pool
+        _descartar_pool(pool)
+        raise RuntimeError("Processo de trabalho encerrado inesperadamente durante o processamento.")
+
+    tempos.anexar(etapas)
+    return resultado
+
+
+def mapear(fn: Alvo, tarefas: Iterable[tuple], em_voo: int) -> Iterator[Any]:
+    """
+    executar(fn, *tarefa) para cada tarefa, com até `em_voo` chamadas
+    submetidas ao mesmo tempo, e os resultados na ordem das tarefas (como
+    paralelo.mapear, mas nos processos deste pool). A janela limita quantos
+    processos uma requisição ocupa e quantos resultados ficam na memória
+    esperando a vez. Se quem consome parar no meio, as tarefas que ainda não
+    começaram são canceladas.
+    """
+    pool = obter_pool()
+    if pool is None:
+        for tarefa in tarefas:
+            yield _resolver(fn)(*tarefa)
+        return
+
+    canal = progresso.canal_atual()
+    restantes = iter(tarefas)
+    pendentes: deque = deque()
+    try:
+        for tarefa in islice(restantes, max(1, em_voo)):
+            pendentes.append(pool.submit(_chamar, fn, tarefa, {}, canal))
+        while pendentes:
+            resultado, etapas = pendentes.popleft().result()
+            for tarefa in islice(restantes, 1):
+                pendentes.append(pool.submit(_chamar, fn, tarefa, {}, canal))
+            tempos.anexar(etapas)
+            yield resultado
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        raise RuntimeError("Processo de trabalho encerrado inesperadamente durante o processamento.")
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
+
+
+def preaquecer() -> None:
+    """Sobe todos os processos do pool (com o warm-up dos cores) sem esperar por eles."""
+    pool = obter_pool()
+    if pool is None:
+        return
+    for _ in range(WORKERS):
+        pool.submit(_nada)
+
+
+def encerrar() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -92,6 +92,10 @@ document.addEventListener('DOMContentLoaded', function () {
 
       resultadoCard.style.display = 'block';
       statusEl.textContent = data.message || 'Processamento concluído com sucesso.';
+      if (Array.isArray(data.paginas_orfas) && data.paginas_orfas.length) {
+        statusEl.textContent +=
+          ` Páginas sem funcionário identificado (fora do ZIP): ${data.paginas_orfas.join(', ')}.`;
+      }
     } catch (err) {
       console.error('Erro na chamada /api/separador-ferias-funcionario/process:', err);
       statusEl.textContent = 'Erro de comunicação com o servidor.';
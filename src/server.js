@@ -1872,6 +1872,7 @@ app.post(
         total_paginas: data.total_paginas,
         total_funcionarios: data.total_funcionarios,
         arquivos: data.arquivos || [],
+        paginas_orfas: data.paginas_orfas || [],
         download_url: downloadUrl,
       });
     } catch (err) {
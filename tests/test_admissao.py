@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from api import admissao
+
+
+def test_espera_somada_entre_ferramentas_tem_teto(monkeypatch):
+    monkeypatch.setattr(admissao, "FILA_MAX_TOTAL", 1)
+    a = admissao.Limitador("a", 1, 8, 5.0)
+    b = admissao.Limitador("b", 1, 8, 5.0)
+    a.entrar(1, None)
+    b.entrar(1, None)
+
+    # um só aguardando, na ferramenta "a"
+    esperando = threading.Thread(target=a.entrar, args=(1, 5.0))
+    esperando.start()
+    while not a._fila:
+        time.sleep(0.01)
+
+    # "b" tem fila livre, mas o teto global já foi atingido
+    with pytest.raises(HTTPException) as e:
+        b.entrar(1, 5.0)
+    assert e.value.status_code == 429
+    assert not b._fila
+
+    # jobs (sem prazo) não entram na conta
+    job = threading.Thread(target=b.entrar, args=(1, admissao.SEM_PRAZO))
+    job.start()
+    while not b._fila:
+        time.sleep(0.01)
+
+    a.sair(1)
+    b.sair(1)
+    esperando.join(5)
+    job.join(5)
+    assert a.em_uso == 1 and b.em_uso == 1
+    assert admissao._esperando == 0
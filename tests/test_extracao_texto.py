@@ -0,0 +1,82 @@
+import fitz
+import pytest
+
+from api import extracao_texto
+from api.cache_texto import CacheTexto
+
+
+def _pdf(caminho, textos):
+    doc = fitz.open()
+    for texto in textos:
+        doc.new_page().insert_text((40, 40), texto, fontsize=10)
+    doc.save(caminho)
+
+
+# Um PDF pequeno por ferramenta, no layout que o classificador procura
+LAYOUTS = {
+    "separador-pdf-relatorio-de-ferias": [
+        "ALFA COMERCIO LTDA Página: 1\nFuncionário ANA",
+        "ALFA COMERCIO LTDA Página: 2\nFuncionário BIA",
+        "Resumo\nBETA SERVICOS\nFolha de Pagamento",
+    ],
+    "ferias-funcionario": [
+        "AVISO DE FÉRIAS\nEMPRESA : ACME LTDA\nIlmo Sr(a). ANA Código: 1",
+        "RECIBO DE FÉRIAS\nNOME COMPLETO : ANA",
+        "AVISO DE FÉRIAS\nEMPRESA : ACME LTDA\nIlmo Sr(a). BIA Código: 2",
+        "RECIBO DE FÉRIAS\nNOME COMPLETO : BIA",
+    ],
+    "importador-recebimentos-madre-scp": [
+        "01/02/2025 CLIENTE A 1.000,00 2,00 3,00 4,00 5,00 6,00\n"
+        "02/02/2025 CLIENTE B 10,00 20,00 30,00 40,00 50,00 60,00\n"
+        "Total do cliente 1.010,00",
+    ],
+    "holerites-por-empresa": [
+        "0001 ALFA COMERCIO LTDA\nFuncionário: ANA",
+        "0002 BETA SERVICOS\nFuncionário: BIA",
+    ],
+}
+
+
+def test_todas_as_ferramentas_tem_layout():
+    assert set(LAYOUTS) == set(extracao_texto.CLASSIFICADORES)
+    assert set(extracao_texto.MOTOR_PADRAO) == set(extracao_texto.CLASSIFICADORES)
+
+
+@pytest.mark.parametrize("tool", sorted(LAYOUTS))
+def test_motores_compativeis(tmp_path, tool):
+    pdf = tmp_path / f"{tool}.pdf"
+    _pdf(pdf, LAYOUTS[tool])
+
+    resultados = extracao_texto.comparar_motores(tool, pdf)
+
+    assert set(resultados) == set(extracao_texto.MOTORES_PROPRIOS.get(tool, extracao_texto.MOTORES))
+    for motor, r in resultados.items():
+        assert r["identico"], (motor, r["diferencas"])
+    assert extracao_texto.main([tool, str(pdf)]) == 0
+
+
+def test_motor_incompleto_nao_instancia():
+    class SemTexto(extracao_texto.DocumentoTexto):
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        SemTexto()
+
+
+def test_cache_grava_ao_fechar_e_atende_sem_abrir_o_motor(tmp_path, monkeypatch):
+    monkeypatch.setattr(extracao_texto, "cache_texto", CacheTexto(tmp_path / "texto.db", 0))
+    pdf = tmp_path / "doc.pdf"
+    _pdf(pdf, ["primeira", "segunda"])
+
+    with extracao_texto.abrir(pdf, "pymupdf") as doc:
+        textos = [doc.texto(i) for i in range(len(doc))]
+    assert textos == ["primeira", "segunda"]
+
+    def sem_motor(*args, **kwargs):
+        raise AssertionError("o motor não deveria abrir o PDF")
+
+    monkeypatch.setitem(extracao_texto.MOTORES, "pymupdf", sem_motor)
+    with extracao_texto.abrir(pdf, "pymupdf") as doc:
+        assert len(doc) == 2
+        assert [doc.texto(i) for i in range(len(doc))] == textos
@@ -0,0 +1,88 @@
+import io
+import zipfile
+
+import fitz
+import pytest
+from PyPDF2 import PdfReader, PdfWriter
+
+from api import extracao_texto
+from api import holerites_core as core
+
+
+def _pdf(caminho, paginas):
+    """Cada página: lista de (x, y, texto); a empresa é a linha mais alta."""
+    doc = fitz.open()
+    for linhas in paginas:
+        page = doc.new_page()
+        for x, y, texto in linhas:
+            page.insert_text((x, y), texto, fontsize=10)
+    doc.save(caminho)
+
+
+@pytest.fixture
+def holerites(tmp_path):
+    pdf = tmp_path / "holerites.pdf"
+    _pdf(pdf, [
+        [(40, 40, "0001 ALFA COMÉRCIO LTDA"), (40, 80, "Funcionário: ANA")],
+        [(40, 40, "0001 ALFA"), (120, 41, "COMÉRCIO LTDA"), (40, 80, "Funcionário: BIA")],
+        [(40, 40, "0002 BETA & FILHOS S/A"), (300, 40, "Competência 01/2025")],
+        [(40, 300, "sem cabeçalho no topo")],
+        [],
+    ])
+    return pdf
+
+
+@pytest.mark.parametrize("modo", ["faixa", "pagina"])
+def test_motores_classificam_igual(holerites, monkeypatch, modo):
+    monkeypatch.setattr(core, "HOLERITES_MODO_EXTRACAO", modo)
+
+    esperado = [
+        "0001 ALFA COMERCIO LTDA",
+        "0001 ALFA COMERCIO LTDA",
+        "0002 BETA E FILHOS S A COMPETENCIA 01 2025",
+        "SEM CABECALHO NO TOPO",
+        "DESCONHECIDO",
+    ]
+    assert core.chaves_por_pagina(holerites, "pymupdf") == esperado
+    assert core.chaves_por_pagina(holerites, "pdfplumber") == esperado
+
+    resultados = extracao_texto.comparar_motores("holerites-por-empresa", holerites)
+    assert set(resultados) == {"pymupdf", "pdfplumber"}
+    assert all(r["identico"] for r in resultados.values())
+
+
+@pytest.mark.parametrize("motor", ["pymupdf", "pdfplumber"])
+def test_split_com_cada_motor(holerites, tmp_path, monkeypatch, motor):
+    monkeypatch.setitem(extracao_texto.MOTORES_TEXTO, "holerites-por-empresa", motor)
+
+    zip_path = core.split_pdf_holerites(holerites, tmp_path / "saida", "01-2025")
+
+    with zipfile.ZipFile(zip_path) as z:
+        paginas = {n: len(fitz.open(stream=z.read(n), filetype="pdf")) for n in z.namelist()}
+    assert paginas == {
+        "0001 ALFA COMERCIO LTDA 01-2025.pdf": 2,
+        "0002 BETA E FILHOS S A COMPETENCIA 01 2025 01-2025.pdf": 1,
+        "SEM CABECALHO NO TOPO 01-2025.pdf": 1,
+        "DESCONHECIDO 01-2025.pdf": 1,
+    }
+
+
+def test_padrao_grava_como_antes(holerites, tmp_path):
+    # motor padrão: cada entrada é o PdfWriter de sempre, byte a byte
+    zip_path = core.split_pdf_holerites(holerites, tmp_path / "saida", "01-2025")
+
+    reader = PdfReader(str(holerites))
+    with zipfile.ZipFile(zip_path) as z:
+        for nome, paginas in zip(z.namelist(), [[0, 1], [2], [3], [4]]):
+            writer = PdfWriter()
+            for p in paginas:
+                writer.add_page(reader.pages[p])
+            esperado = io.BytesIO()
+            writer.write(esperado)
+            assert z.read(nome) == esperado.getvalue(), nome
+
+
+def test_motor_invalido(monkeypatch):
+    monkeypatch.setitem(extracao_texto.MOTORES_TEXTO, "holerites-por-empresa", "pypdf2")
+    with pytest.raises(ValueError, match="pypdf2"):
+        core.motor_holerites()
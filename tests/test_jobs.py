@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+from api import jobs
+
+
+def _pid_morto():
+    processo = subprocess.Popen([sys.executable, "-c", "pass"])
+    processo.wait()
+    return processo.pid
+
+
+def test_recuperar_interrompidos(tmp_path):
+    store = jobs.JobStore(tmp_path)
+    orfao = store.criar("holerites-por-empresa", {})
+    store.atualizar(orfao["id"], status=jobs.STATUS_EXECUTANDO, processo={"host": jobs._HOST, "pid": _pid_morto()})
+    antigo = store.criar("holerites-por-empresa", {})
+    store.atualizar(antigo["id"], processo=None)  # gravado antes do campo existir
+    vivo = store.criar("holerites-por-empresa", {})
+    store.atualizar(vivo["id"], processo={"host": jobs._HOST, "pid": os.getppid()})
+    remoto = store.criar("holerites-por-empresa", {})
+    store.atualizar(remoto["id"], processo={"host": "outra-maquina", "pid": 1})
+    concluido = store.criar("holerites-por-empresa", {})
+    store.atualizar(concluido["id"], status=jobs.STATUS_CONCLUIDO, processo={"host": jobs._HOST, "pid": _pid_morto()})
+
+    assert store.recuperar_interrompidos() == 2
+
+    for job in (orfao, antigo):
+        atual = store.obter(job["id"])
+        assert atual["status"] == jobs.STATUS_ERRO
+        assert atual["erro"] == jobs.ERRO_INTERROMPIDO
+        assert atual["finalizado_em"]
+    assert store.obter(vivo["id"])["status"] == jobs.STATUS_PENDENTE
+    assert store.obter(remoto["id"])["status"] == jobs.STATUS_PENDENTE
+    assert store.obter(concluido["id"])["status"] == jobs.STATUS_CONCLUIDO
@@ -0,0 +1,26 @@
+from api import nomes_arquivos
+from api.nomes_arquivos import RegistroNomes
+
+
+def test_homonimos_continuam_a_contagem():
+    nomes = RegistroNomes(["base.pdf", "base 2.pdf"])
+    assert [nomes.reservar("base", ".pdf") for _ in range(3)] == ["base 3.pdf", "base 4.pdf", "base 5.pdf"]
+
+
+def test_caixa_distinta_quando_o_sistema_distingue():
+    nomes = RegistroNomes(["A.pdf"], ignorar_caixa=False)
+    assert "a.pdf" not in nomes
+    assert nomes.reservar("a", ".pdf") == "a.pdf"
+
+
+def test_caixa_ignorada_como_no_windows():
+    nomes = RegistroNomes(["A.pdf"], ignorar_caixa=True)
+    assert "a.PDF" in nomes
+    assert nomes.reservar("a", ".pdf") == "a 2.pdf"
+
+
+def test_padrao_segue_o_sistema_de_arquivos(tmp_path):
+    (tmp_path / "A.pdf").write_bytes(b"x")
+    nomes = RegistroNomes.da_pasta(tmp_path)
+    assert ("a.pdf" in nomes) == nomes_arquivos.CAIXA_IGNORADA
+    assert nomes.tamanho("A.pdf") == 1
@@ -0,0 +1,55 @@
+import os
+import time
+
+from api import progresso
+
+
+def test_id_reaproveitado_comeca_limpo(tmp_path):
+    pasta = tmp_path / "abc"
+    assert progresso.iniciar_requisicao(pasta)
+    canal = progresso.Canal(pasta)
+    progresso.pedir_cancelamento(pasta)
+    canal.finalizar(progresso.STATUS_CANCELADO)
+    progresso.encerrar_requisicao(pasta)
+
+    assert progresso.iniciar_requisicao(pasta)
+    assert not canal.cancelado()
+    assert progresso.ler(pasta) is None
+
+
+def test_id_em_andamento_e_recusado(tmp_path):
+    pasta = tmp_path / "abc"
+    assert progresso.iniciar_requisicao(pasta)
+    assert not progresso.iniciar_requisicao(pasta)
+
+    progresso.encerrar_requisicao(pasta)
+    assert progresso.iniciar_requisicao(pasta)
+
+
+def test_marca_abandonada_e_retomada(tmp_path):
+    pasta = tmp_path / "abc"
+    assert progresso.iniciar_requisicao(pasta)
+    antigo = time.time() - 2 * 3600
+    os.utime(pasta / progresso.FLAG_EM_ANDAMENTO, (antigo, antigo))
+
+    assert progresso.iniciar_requisicao(pasta)
+    assert not progresso.iniciar_requisicao(pasta)
+
+
+def test_publicar_renova_marca_e_limpeza_respeita(tmp_path, monkeypatch):
+    monkeypatch.setattr(progresso, "PROGRESSO_DIR", tmp_path)
+    antigo = time.time() - 2 * 3600
+    ativa, morta = tmp_path / "ativa", tmp_path / "morta"
+    for pasta in (ativa, morta):
+        assert progresso.iniciar_requisicao(pasta)
+        os.utime(pasta / progresso.FLAG_EM_ANDAMENTO, (antigo, antigo))
+
+    # execução longa: publica, e a pasta em si continua velha
+    progresso.Canal(ativa).publicar("extract", 1, 1)
+    os.utime(ativa, (antigo, antigo))
+    os.utime(morta, (antigo, antigo))
+
+    assert not progresso.iniciar_requisicao(ativa)
+    progresso.limpar_antigos()
+    assert ativa.is_dir()
+    assert not morta.exists()
@@ -0,0 +1,51 @@
+import pytest
+
+from api import relatorio_ferias_core as core
+
+
+class Paginas:
+    """Só o que a busca usa de DocumentoTexto; conta as extrações."""
+
+    def __init__(self, empresas):
+        self.empresas = empresas
+        self.extraidas = 0
+
+    def __len__(self):
+        return len(self.empresas)
+
+    def texto(self, idx):
+        self.extraidas += 1
+        return f"{self.empresas[idx]} Página: {idx + 1}"
+
+
+def _esperado(empresas):
+    grupos = {}
+    for idx, empresa in enumerate(empresas):
+        grupos.setdefault(empresa, []).append(idx)
+    return grupos
+
+
+def test_fronteiras_em_relatorio_ordenado():
+    empresas = ["A"] * 40 + ["B"] * 3 + ["C"] * 57
+    doc = Paginas(empresas)
+    lidas = {}
+
+    assert core._busca_fronteiras(doc, 16, lidas) == _esperado(empresas)
+    assert doc.extraidas == len(lidas) < len(empresas)
+
+
+@pytest.mark.parametrize("empresas", [
+    # troca A/B/A dentro de um passo, junto da fronteira achada
+    ["A", "B", "A", "B"] + ["B"] * 12,
+    ["A"] * 10 + ["B", "A"] + ["B"] * 20,
+    # empresa em dois trechos separados
+    ["A"] * 16 + ["B"] * 16 + ["A"] * 16,
+])
+def test_fronteiras_desconfiaveis_voltam_a_leitura_completa(empresas):
+    doc = Paginas(empresas)
+    lidas = {}
+
+    assert core._busca_fronteiras(doc, 16, lidas) is None
+    assert core._varredura_completa(doc, lidas) == _esperado(empresas)
+    # cada página é extraída uma vez, mesmo depois da busca
+    assert doc.extraidas == len(lidas) == len(empresas)
@@ -0,0 +1,101 @@
+import zipfile
+
+import fitz
+import pytest
+
+from api import extracao_texto
+from api import separador_ferias_funcionario_core as core
+from api.cache_texto import CacheTexto, cache_texto
+
+AVISO = {"aviso": "AVISO DE FÉRIAS", "ilmo": "ANA"}
+RECIBO = {"nome_completo": "ANA"}
+SEM_ANCORA = {}
+
+
+@pytest.mark.parametrize(
+    "ancoras, blocos, orfas",
+    [
+        # layout de sempre: aviso + recibo
+        ([AVISO, RECIBO, AVISO, RECIBO], [(0, 2), (2, 4)], []),
+        # capa antes do primeiro aviso
+        ([SEM_ANCORA, AVISO, RECIBO], [(1, 3)], [0]),
+        # aviso de 2 páginas antes do recibo
+        ([AVISO, SEM_ANCORA, RECIBO, AVISO, RECIBO], [(0, 3), (3, 5)], []),
+        # recibo sem aviso abre um bloco próprio
+        ([AVISO, RECIBO, RECIBO], [(0, 2), (2, 3)], []),
+        # página solta depois de um bloco completo não entra nele
+        ([AVISO, RECIBO, SEM_ANCORA], [(0, 2)], [2]),
+        ([AVISO, RECIBO, SEM_ANCORA, AVISO, RECIBO], [(0, 2), (3, 5)], [2]),
+        # aviso sem recibo fica aberto até a próxima âncora
+        ([AVISO, SEM_ANCORA, SEM_ANCORA, AVISO, RECIBO], [(0, 3), (3, 5)], []),
+        # sem nenhuma âncora: blocos fixos de 2, última órfã se ímpar
+        ([SEM_ANCORA] * 5, [(0, 2), (2, 4)], [4]),
+        ([], [], []),
+    ],
+)
+def test_agrupar_blocos(ancoras, blocos, orfas):
+    assert core.agrupar_blocos(ancoras) == (blocos, orfas)
+
+
+def test_ler_ancoras_aviso_so_no_topo():
+    assert "aviso" in core.ler_ancoras("  AVISO DE FÉRIAS\nEMPRESA : X")
+    assert "aviso" not in core.ler_ancoras("RECIBO\nconforme AVISO DE FÉRIAS")
+
+
+def _pdf(caminho, textos):
+    doc = fitz.open()
+    for texto in textos:
+        doc.new_page().insert_text((40, 40), texto, fontsize=10)
+    doc.save(caminho)
+
+
+@pytest.mark.parametrize("motor", ["pypdf2", "pymupdf"])
+@pytest.mark.parametrize("modo", ["fixo", "ancoras"])
+def test_processar_layout_misto(tmp_path, monkeypatch, motor, modo):
+    monkeypatch.setattr(cache_texto, "ativo", False)
+    monkeypatch.setitem(extracao_texto.MOTORES_TEXTO, "ferias-funcionario", motor)
+    monkeypatch.setattr(core, "FERIAS_MODO_BLOCOS", modo)
+    pdf = tmp_path / "ferias.pdf"
+    _pdf(pdf, [
+        "CAPA DO LOTE",
+        "AVISO DE FÉRIAS\nEMPRESA : ACME LTDA\nIlmo Sr(a). ANA Código: 1",
+        "continuação do aviso",
+        "RECIBO DE FÉRIAS\nNOME COMPLETO : ANA",
+        "AVISO DE FÉRIAS\nEMPRESA : ACME LTDA\nIlmo Sr(a). BIA Código: 2",
+        "RECIBO DE FÉRIAS\nNOME COMPLETO : BIA",
+        "página solta",
+    ])
+
+    r = core.processar_ferias_por_funcionario(pdf)
+
+    assert r["empresa"] == "ACME LTDA"
+    with zipfile.ZipFile(r["zip_path"]) as z:
+        paginas = [len(fitz.open(stream=z.read(n), filetype="pdf")) for n in z.namelist()]
+    if modo == "ancoras":
+        assert r["arquivos"] == ["FERIAS - ANA.pdf", "FERIAS - BIA.pdf"]
+        assert paginas == [3, 2]
+        assert r["paginas_orfas"] == [1, 7]
+    else:
+        assert r["total_funcionarios"] == 3
+        assert paginas == [2, 2, 2]
+        assert r["paginas_orfas"] == [7]
+
+
+def test_ancoras_lote_usa_o_hash_do_processo_principal(tmp_path, monkeypatch):
+    cache = CacheTexto(tmp_path / "texto.db", 0)
+    monkeypatch.setattr(extracao_texto, "cache_texto", cache)
+
+    def sem_hash(*args, **kwargs):
+        raise AssertionError("o lote não deveria reler o PDF para a chave do cache")
+
+    monkeypatch.setattr(extracao_texto, "sha256_arquivo", sem_hash)
+    pdf = tmp_path / "ferias.pdf"
+    _pdf(pdf, ["AVISO DE FÉRIAS\nIlmo Sr(a). ANA Código: 1", "RECIBO DE FÉRIAS\nNOME COMPLETO : ANA"])
+
+    ancoras = core._ancoras_lote(str(pdf), "pymupdf", "hash-do-pai", 0, 2)
+
+    assert [sorted(a) for a in ancoras] == [["aviso", "ilmo"], ["nome_completo"]]
+    total, textos = cache.carregar("hash-do-pai", f"pymupdf:{extracao_texto.VERSAO_MOTOR['pymupdf']}")
+    assert total == 2 and sorted(textos) == [0, 1]
+    # sem hash (cache desligado no processo principal) o lote também não usa o cache
+    assert core._ancoras_lote(str(pdf), "pymupdf", None, 0, 1) == ancoras[:1]